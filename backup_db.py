@@ -1,17 +1,25 @@
 #!/usr/bin/env python3
-"""Safely backup SQLite database using VACUUM INTO."""
+"""Safely backup SQLite database, and every game shard next to it, using VACUUM INTO."""
 
 import sqlite3
 import sys
+from pathlib import Path
 
 def main() -> None:
-    db_path = sys.argv[1] if len(sys.argv) > 1 else '/chess/data/db.sqlite3'
-    backup_path = sys.argv[2] if len(sys.argv) > 2 else '/chess/data/backup.db'
+    db_path = Path(sys.argv[1] if len(sys.argv) > 1 else '/chess/data/db.sqlite3')
+    backup_dir = Path(sys.argv[2] if len(sys.argv) > 2 else '/chess/data/backup')
 
-    conn = sqlite3.connect(db_path)
-    conn.execute(f"VACUUM INTO '{backup_path}'")
-    conn.close()
-    print(f'Backup created successfully: {backup_path}')
+    backup_dir.mkdir(parents=True, exist_ok=True)
+
+    # Game shards (see django_chess/app/sharding.py) live beside the main database.
+    for path in [db_path, *sorted(db_path.parent.glob('games*.sqlite3'))]:
+        backup_path = backup_dir / path.name
+        backup_path.unlink(missing_ok=True)  # VACUUM INTO won't overwrite
+
+        conn = sqlite3.connect(path)
+        conn.execute(f"VACUUM INTO '{backup_path}'")
+        conn.close()
+        print(f'Backup created successfully: {backup_path}')
 
 if __name__ == '__main__':
     main()
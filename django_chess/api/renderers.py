@@ -0,0 +1,161 @@
+"""
+JSON rendering and parsing through orjson, when it's installed, and MessagePack rendering.
+
+orjson encodes and decodes several times faster than the json module behind DRF's own
+JSONRenderer and JSONParser, which shows on long game listings and long games' details.  It
+comes with the "fast-json" extra; without it, these classes are DRF's, unchanged.  Either way
+the output is the same compact UTF-8 JSON, down to escaping U+2028 and U+2029.
+
+MessagePackRenderer is for the mobile client: see its docstring for how its payloads differ
+from the JSON ones.  It comes with the "msgpack" extra; without it, the API speaks only JSON.
+"""
+import functools
+import struct
+from typing import IO, Any, Callable, Mapping
+
+import chess
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # no "fast-json" extra
+    orjson = None  # type: ignore[assignment]
+
+try:
+    import msgpack  # type: ignore[import-untyped]
+except ImportError:  # no "msgpack" extra
+    msgpack = None
+
+MSGPACK_INSTALLED = msgpack is not None
+
+_encoder = JSONEncoder()
+
+
+def _default(value: Any) -> Any:
+    """Whatever orjson can't encode natively (Decimals, lazy strings, ...), the way DRF would."""
+    return _encoder.default(value)
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(
+        self,
+        data: Any,
+        accepted_media_type: str | None = None,
+        renderer_context: Mapping[str, Any] | None = None,
+    ) -> bytes:
+        # orjson can only indent by two, so an ?indent=4 (or similar) is left to DRF.
+        if orjson is None or self.get_indent(accepted_media_type or "", renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b""
+
+        # Dates and times go to DRF's encoder too, which formats them its own way.
+        rendered = orjson.dumps(data, default=_default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+        # Like DRF: keep the output a strict subset of JavaScript.  Looking for the first byte
+        # alone is a memchr(); the search for all three is many times slower.
+        if b"\xe2" in rendered:
+            rendered = rendered.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+        return rendered
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(
+        self, stream: IO[Any], media_type: str | None = None, parser_context: Mapping[str, Any] | None = None
+    ) -> Any:
+        encoding = (parser_context or {}).get("encoding", settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace("-", "") != "utf8":
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
+
+
+@functools.cache  # there are fewer than 2,000 different moves
+def pack_move(uci: str) -> int:
+    """
+    A move as an int: the from-square in bits 0-5, the to-square in bits 6-11 (squares
+    numbered as python-chess does, a1 = 0 to h8 = 63) and the promotion piece in bits 12-14
+    (0 for none, else 2 = knight to 5 = queen).
+    """
+    move = chess.Move.from_uci(uci)
+    return move.from_square | move.to_square << 6 | (move.promotion or 0) << 12
+
+
+def pack_moves(moves: list[str]) -> bytes:
+    """Moves as pack_move()s, two big-endian bytes apiece."""
+    return struct.pack(f">{len(moves)}H", *map(pack_move, moves))
+
+
+def legal_move_masks(moves: list[str]) -> dict[int, int]:
+    """
+    Legal moves as {from-square: bitmask of to-squares}, bit n set for square n.  A pawn
+    move to the last rank stands for its four promotions.
+    """
+    masks: dict[int, int] = {}
+    for packed in map(pack_move, moves):
+        from_square, to_square = packed & 63, packed >> 6 & 63
+        masks[from_square] = masks.get(from_square, 0) | 1 << to_square
+    return masks
+
+
+# The JSON fields that MessagePackRenderer sends compactly, wherever they appear: the moves
+# endpoint's "moves" is a list of UCI strings, like a game's "move_uci".
+_COMPACT: dict[str, Callable[[list[str]], Any]] = {
+    "move_uci": pack_moves,
+    "moves": pack_moves,
+    "legal_moves": legal_move_masks,
+}
+
+
+def compact(data: Any) -> Any:
+    """
+    ``data`` with its lists of UCI moves made compact (see MessagePackRenderer), in it or in
+    the dicts within it.  Lists aren't looked into: the game listing's entries have no moves,
+    and there are thousands of them.
+    """
+    if not isinstance(data, dict):
+        return data
+    return {
+        key: _COMPACT[key](value)
+        if key in _COMPACT and isinstance(value, list) and all(isinstance(uci, str) for uci in value)
+        else compact(value)
+        for key, value in data.items()
+    }
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    application/msgpack: the JSON payload in MessagePack, with moves made compact.
+
+    - "move_uci", and the moves endpoint's "moves", are binary: two bytes per move, each a
+      big-endian pack_move().
+    - "legal_moves" is a map of from-square to a 64-bit mask of to-squares; see
+      legal_move_masks().
+
+    Everything else (SAN included: ask for ?omit=move_san if you can do without) is as in JSON.
+    GameViewSet lists it after JSON, so a client gets it only by asking for it.
+    """
+
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(
+        self,
+        data: Any,
+        accepted_media_type: str | None = None,
+        renderer_context: Mapping[str, Any] | None = None,
+    ) -> bytes:
+        if data is None:
+            return b""
+        rendered: bytes = msgpack.packb(compact(data), default=_default)
+        return rendered
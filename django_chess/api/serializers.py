@@ -1,15 +1,16 @@
 import json
-from typing import Any
+from typing import Any, Iterable
 
 import chess
 from rest_framework import serializers
 
-from django_chess.app.models import Game
-from django_chess.app.utils import load_board
+from django_chess.app.models import Game, PositionMove
+from django_chess.app.timing import timed
+from django_chess.app.utils import describe_outcome, load_board
 
 
 class GameListSerializer(serializers.ModelSerializer[Game]):
-    """Lightweight serializer for listing games."""
+    """Lightweight serializer for listing games; it replays only games without a stored result."""
 
     move_count = serializers.SerializerMethodField()
     whose_turn = serializers.SerializerMethodField()
@@ -20,6 +21,10 @@ class GameListSerializer(serializers.ModelSerializer[Game]):
         fields = ['id', 'name', 'in_progress', 'move_count', 'black_smartness', 'whose_turn', 'outcome']
         read_only_fields = ['id', 'name', 'move_count', 'whose_turn', 'outcome']
 
+    @timed('serialize')
+    def to_representation(self, instance: Game) -> dict[str, Any]:
+        return super().to_representation(instance)
+
     def get_move_count(self, obj: Game) -> int:
         """Return the number of moves made in the game."""
         if obj.moves is None:
@@ -31,15 +36,19 @@ class GameListSerializer(serializers.ModelSerializer[Game]):
         if not obj.in_progress:
             return ""
 
-        board = load_board(game=obj)
-        return "white" if board.turn else "black"
+        return "white" if self.get_move_count(obj) % 2 == 0 else "black"
 
     def get_outcome(self, obj: Game) -> str | None:
         """Return the game outcome if the game is finished."""
         if obj.in_progress:
             return None
 
-        board = load_board(game=obj)
+        # Stored by record_position, so most games needn't be replayed; but a game that
+        # predates the stored columns, or ended without a chess outcome, says "*".
+        if obj.result != "*":
+            return {"1-0": "White won", "0-1": "Black won"}.get(obj.result, "Draw")
+
+        board = load_board(game=obj, annotate=False)
         outcome = board.outcome()
 
         if outcome is None:
@@ -54,7 +63,14 @@ class GameListSerializer(serializers.ModelSerializer[Game]):
 
 
 class GameDetailSerializer(serializers.ModelSerializer[Game]):
-    """Detailed serializer for individual game with full board state."""
+    """
+    Detailed serializer for individual game with full board state.
+
+    Pass ``fields`` and/or ``omit`` (iterables of field names) to trim the output.  Fields that
+    aren't included are never computed.  ``board_fen`` and ``whose_turn`` come from the stored
+    position; the board is replayed, at most once per game, only for the fields that need it --
+    with SAN rendering only if ``move_san`` or ``captured_pieces`` is wanted.
+    """
 
     move_uci = serializers.SerializerMethodField()
     move_san = serializers.SerializerMethodField()
@@ -64,6 +80,9 @@ class GameDetailSerializer(serializers.ModelSerializer[Game]):
     captured_pieces = serializers.SerializerMethodField()
     outcome = serializers.SerializerMethodField()
 
+    # Fields that need the board's SAN/captured-pieces annotations
+    ANNOTATED_FIELDS = {'move_san', 'captured_pieces'}
+
     class Meta:
         model = Game
         fields = [
@@ -75,6 +94,39 @@ class GameDetailSerializer(serializers.ModelSerializer[Game]):
             'legal_moves', 'captured_pieces', 'outcome'
         ]
 
+    def __init__(
+        self,
+        *args: Any,
+        fields: Iterable[str] | None = None,
+        omit: Iterable[str] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(*args, **kwargs)
+
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+        for name in omit or ():
+            self.fields.pop(name, None)
+
+        self._annotate = bool(self.ANNOTATED_FIELDS & set(self.fields))
+        self._boards: dict[Any, chess.Board] = {}
+
+    @timed('serialize')
+    def to_representation(self, instance: Game) -> dict[str, Any]:
+        return super().to_representation(instance)
+
+    @classmethod
+    def unknown_fields(cls, names: Iterable[str]) -> list[str]:
+        """Return the names that aren't fields of this serializer."""
+        return sorted(set(names) - set(cls.Meta.fields))
+
+    def _board(self, obj: Game) -> chess.Board:
+        """Replay the game once per serializer, however many fields need the board."""
+        if (board := self._boards.get(obj.pk)) is None:
+            board = self._boards[obj.pk] = load_board(game=obj, annotate=self._annotate)
+        return board
+
     def get_move_uci(self, obj: Game) -> list[str]:
         """Return moves in UCI format."""
         if obj.moves is None:
@@ -84,32 +136,30 @@ class GameDetailSerializer(serializers.ModelSerializer[Game]):
 
     def get_move_san(self, obj: Game) -> list[str]:
         """Return moves in Standard Algebraic Notation."""
-        board = load_board(game=obj)
+        board = self._board(obj)
         sans: list[str] = getattr(board, 'sans', [])
         return sans
 
     def get_board_fen(self, obj: Game) -> str:
-        """Return current board position in FEN notation."""
-        board = load_board(game=obj)
-        return board.fen()
+        """Return current board position in FEN notation, as stored (see Game.record_position)."""
+        return obj.fen
 
     def get_whose_turn(self, obj: Game) -> str:
-        """Return whose turn it is ('white' or 'black')."""
+        """Return whose turn it is ('white' or 'black'), from the stored FEN."""
         if not obj.in_progress:
             return ""
-        board = load_board(game=obj)
-        return "white" if board.turn else "black"
+        return "white" if obj.fen.split()[1] == "w" else "black"
 
     def get_legal_moves(self, obj: Game) -> list[str]:
         """Return all legal moves in UCI format."""
         if not obj.in_progress:
             return []
-        board = load_board(game=obj)
+        board = self._board(obj)
         return [move.uci() for move in board.legal_moves]
 
     def get_captured_pieces(self, obj: Game) -> dict[str, list[str]]:
         """Return captured pieces for both sides."""
-        board = load_board(game=obj)
+        board = self._board(obj)
         captured = getattr(board, 'captured_pieces', [[], []])
         return {
             "white": captured[chess.WHITE],
@@ -121,18 +171,15 @@ class GameDetailSerializer(serializers.ModelSerializer[Game]):
         if obj.in_progress:
             return None
 
-        board = load_board(game=obj)
+        board = self._board(obj)
         outcome = board.outcome()
 
         if outcome is None:
             return None
 
-        if outcome.winner is None:
-            return "Draw"
-        elif outcome.winner:
-            return "White won by checkmate" if outcome.termination == chess.Termination.CHECKMATE else "White won"
-        else:
-            return "Black won by checkmate" if outcome.termination == chess.Termination.CHECKMATE else "Black won"
+        return describe_outcome(
+            winner=outcome.winner, checkmate=outcome.termination == chess.Termination.CHECKMATE
+        )
 
 
 class CreateGameSerializer(serializers.ModelSerializer[Game]):
@@ -154,6 +201,11 @@ class MoveSerializer(serializers.Serializer[Any]):
     """Serializer for making a move."""
 
     move = serializers.CharField(max_length=10, help_text="Move in UCI format (e.g., 'e2e4')")
+    ply = serializers.IntegerField(
+        required=False,
+        min_value=0,
+        help_text="Number of plies the client has seen; the move is rejected if the game has moved on",
+    )
 
     def validate_move(self, value: str) -> str:
         """Validate move is in UCI format."""
@@ -171,8 +223,34 @@ class UpdateGameSerializer(serializers.ModelSerializer[Game]):
         model = Game
         fields = ['black_smartness']
 
+    def update(self, instance: Game, validated_data: dict[str, Any]) -> Game:
+        """Write only the settings, so a move saved since ``instance`` was read isn't undone."""
+        for name, value in validated_data.items():
+            setattr(instance, name, value)
+        instance.save(update_fields=[*validated_data, 'modified'])
+        return instance
+
     def validate_black_smartness(self, value: int) -> int:
         """Validate AI difficulty is in valid range."""
         if not 0 <= value <= 10:
             raise serializers.ValidationError("black_smartness must be between 0 and 10")
         return value
+
+
+class PositionMoveSerializer(serializers.ModelSerializer[PositionMove]):
+    """Serializer for one opening-explorer row; expects the position's board in the context."""
+
+    uci = serializers.CharField(source='move')
+    san = serializers.SerializerMethodField()
+    white = serializers.IntegerField(source='white_wins')
+    black = serializers.IntegerField(source='black_wins')
+
+    class Meta:
+        model = PositionMove
+        fields = ['uci', 'san', 'games', 'white', 'draws', 'black']
+        read_only_fields = fields
+
+    def get_san(self, obj: PositionMove) -> str:
+        """Return the move in Standard Algebraic Notation."""
+        board: chess.Board = self.context['board']
+        return board.san(chess.Move.from_uci(obj.move))
@@ -1,11 +1,23 @@
 import json
 from typing import Any
 
+import chess
 import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client
 from rest_framework.test import APIClient
 
+from django_chess.app.explorer import record_games
 from django_chess.app.models import Game
-from django_chess.api.serializers import GameListSerializer
+from django_chess.app.utils import save_board
+from django_chess.api.serializers import GameDetailSerializer, GameListSerializer
+
+
+def _played(*ucis: str) -> chess.Board:
+    board = chess.Board()
+    for uci in ucis:
+        board.push_uci(uci)
+    return board
 
 
 @pytest.fixture
@@ -18,8 +30,8 @@ def api_client() -> APIClient:
 def sample_game() -> Game:
     """Fixture to create a sample game with some moves."""
     game = Game.objects.create(black_smartness=7)
-    # Add some moves (e4 e5 Nf3 Nc6)
-    game.moves = json.dumps(["e2e4", "e7e5", "g1f3", "b8c6"])
+    # Add some moves (e4 e5 Nf3 Nc6), and the position they lead to
+    game.record_position(_played("e2e4", "e7e5", "g1f3", "b8c6"))
     game.save()
     return game
 
@@ -29,7 +41,7 @@ def completed_game() -> Game:
     """Fixture to create a completed game."""
     game = Game.objects.create(black_smartness=10, in_progress=False)
     # Scholar's mate
-    game.moves = json.dumps(["e2e4", "e7e5", "f1c4", "b8c6", "d1h5", "g8f6", "h5f7"])
+    game.record_position(_played("e2e4", "e7e5", "f1c4", "b8c6", "d1h5", "g8f6", "h5f7"))
     game.save()
     return game
 
@@ -745,3 +757,251 @@ def test_game_name_in_detail_response(api_client: APIClient, sample_game: Game)
     assert "name" in data, "Game detail should have a name field"
     assert data["name"], "Game name should not be empty"
     assert data["name"] == sample_game.name, "API should return the correct game name"
+
+
+# Opening explorer endpoint tests
+
+
+@pytest.mark.django_db
+def test_api_position_moves_start_position(api_client: APIClient, completed_game: Game) -> None:
+    """Test the explorer lists moves from the starting position with results."""
+    record_games([(json.loads(completed_game.moves or "[]"), "1-0"), (["d2d4"], "0-1")])
+
+    response = api_client.get("/api/positions/rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1/moves")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["games"] == 2
+    assert {m["uci"] for m in data["moves"]} == {"e2e4", "d2d4"}
+    e4 = next(m for m in data["moves"] if m["uci"] == "e2e4")
+    assert e4 == {"uci": "e2e4", "san": "e4", "games": 1, "white": 1, "draws": 0, "black": 0}
+
+
+@pytest.mark.django_db
+def test_api_position_moves_accepts_underscores(api_client: APIClient) -> None:
+    """Test that underscores can stand in for spaces in the FEN."""
+    record_games([(["e2e4", "c7c5"], "1/2-1/2")])
+
+    response = api_client.get(
+        "/api/positions/rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR_b_KQkq_-_0_1/moves"
+    )
+
+    assert response.status_code == 200
+    assert response.json()["moves"] == [
+        {"uci": "c7c5", "san": "c5", "games": 1, "white": 0, "draws": 1, "black": 0}
+    ]
+
+
+@pytest.mark.django_db
+def test_api_position_moves_unknown_position(api_client: APIClient) -> None:
+    """Test that a position nobody has reached returns an empty list."""
+    response = api_client.get("/api/positions/8/8/8/8/8/8/8/K6k_w_-_-_0_1/moves")
+
+    assert response.status_code == 200
+    assert response.json()["moves"] == []
+
+
+@pytest.mark.django_db
+def test_api_position_moves_invalid_fen(api_client: APIClient) -> None:
+    """Test that a malformed FEN is rejected."""
+    response = api_client.get("/api/positions/not-a-fen/moves")
+
+    assert response.status_code == 400
+    assert "error" in response.json()
+
+
+@pytest.mark.django_db
+def test_api_import_pgn_feeds_explorer() -> None:
+    """Test that importing a PGN updates the explorer."""
+    pgn = b'[Result "0-1"]\n\n1. f3 e5 2. g4 Qh4# 0-1\n'
+    response = Client().post(
+        "/pgn/", {"imported_pgn": SimpleUploadedFile("fools.pgn", pgn)}
+    )
+    assert response.status_code == 302
+
+    data = APIClient().get("/api/positions/rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR_w_KQkq_-_0_1/moves").json()
+    assert data["moves"] == [{"uci": "f2f3", "san": "f3", "games": 1, "white": 0, "draws": 0, "black": 1}]
+
+
+# Field selection tests
+
+
+@pytest.mark.django_db
+def test_api_get_game_detail_fields(api_client: APIClient, sample_game: Game) -> None:
+    """Test that ?fields= limits the detail response to the named fields."""
+    response = api_client.get(f"/api/games/{sample_game.id}/?fields=board_fen,whose_turn")
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "board_fen": "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3",
+        "whose_turn": "white",
+    }
+
+
+@pytest.mark.django_db
+def test_api_get_game_detail_omit(api_client: APIClient, sample_game: Game) -> None:
+    """Test that ?omit= drops the named fields."""
+    response = api_client.get(f"/api/games/{sample_game.id}/?omit=legal_moves,move_san")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert "legal_moves" not in data
+    assert "move_san" not in data
+    assert data["move_uci"] == ["e2e4", "e7e5", "g1f3", "b8c6"]
+
+
+@pytest.mark.django_db
+def test_api_get_game_detail_unknown_field(api_client: APIClient, sample_game: Game) -> None:
+    """Test that asking for a nonexistent field is a 400."""
+    response = api_client.get(f"/api/games/{sample_game.id}/?fields=board_fen,bogus")
+
+    assert response.status_code == 400
+    assert "bogus" in response.json()["error"]
+
+
+@pytest.mark.django_db
+def test_api_unrequested_fields_are_not_computed(
+    api_client: APIClient, sample_game: Game, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that legal moves and SAN aren't generated unless asked for."""
+    def explode(*args: Any, **kwargs: Any) -> Any:
+        raise AssertionError("SAN shouldn't be rendered")
+
+    monkeypatch.setattr(chess.Board, "san", explode)
+    monkeypatch.setattr(GameDetailSerializer, "get_legal_moves", explode)
+
+    response = api_client.get(f"/api/games/{sample_game.id}/?fields=board_fen,whose_turn,outcome")
+
+    assert response.status_code == 200
+    assert set(response.json()) == {"board_fen", "whose_turn", "outcome"}
+
+
+@pytest.mark.django_db
+def test_api_get_game_detail_position_fields_skip_the_replay(
+    api_client: APIClient, saved_game: Game, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that board_fen and whose_turn come from the stored position."""
+    from django_chess.api import serializers
+
+    def explode(*args: Any, **kwargs: Any) -> Any:
+        raise AssertionError("board_fen and whose_turn shouldn't replay the game")
+
+    monkeypatch.setattr(serializers, "load_board", explode)
+
+    response = api_client.get(f"/api/games/{saved_game.id}/?fields=board_fen,whose_turn")
+
+    assert response.status_code == 200
+    assert response.json()["whose_turn"] == "white"
+
+
+@pytest.mark.django_db
+def test_api_make_move_fields(api_client: APIClient) -> None:
+    """Test that the moves action applies ?fields= to game_state."""
+    game = Game.objects.create(black_smartness=0)
+
+    response = api_client.post(f"/api/games/{game.id}/moves/?fields=board_fen,whose_turn", {"move": "e2e4"})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert set(data["game_state"]) == {"board_fen", "whose_turn"}
+    assert data["game_state"]["whose_turn"] == "white"
+
+
+# Move delta tests
+
+
+@pytest.fixture
+def saved_game() -> Game:
+    """Fixture for a game written through save_board, so its stored position is current."""
+    game = Game.objects.create(black_smartness=0)
+    board = chess.Board()
+    for uci in ["e2e4", "e7e5", "g1f3", "b8c6"]:
+        board.push_uci(uci)
+    save_board(board=board, game=game)
+    return game
+
+
+@pytest.mark.django_db
+def test_api_moves_since(api_client: APIClient, saved_game: Game) -> None:
+    """Test that GET moves?since= returns only the newer plies."""
+    response = api_client.get(f"/api/games/{saved_game.id}/moves/?since=2")
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "since": 2,
+        "ply": 4,
+        "moves": ["g1f3", "b8c6"],
+        "board_fen": "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3",
+        "in_progress": True,
+        "outcome": None,
+        "version": "4",
+    }
+    assert response["ETag"] == '"4-json"'
+
+
+@pytest.mark.django_db
+def test_api_moves_since_does_not_replay(
+    api_client: APIClient, saved_game: Game, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that the delta is served from stored columns."""
+    def explode(*args: Any, **kwargs: Any) -> Any:
+        raise AssertionError("the delta endpoint shouldn't replay the game")
+
+    monkeypatch.setattr(chess.Board, "push", explode)
+
+    response = api_client.get(f"/api/games/{saved_game.id}/moves/?since=4")
+
+    assert response.status_code == 200
+    assert response.json()["moves"] == []
+
+
+@pytest.mark.django_db
+def test_api_moves_since_not_modified(api_client: APIClient, saved_game: Game) -> None:
+    """Test that a client already at the current version gets a 304."""
+    response = api_client.get(f"/api/games/{saved_game.id}/moves/?since=4", HTTP_IF_NONE_MATCH='"4-json"')
+
+    assert response.status_code == 304
+
+
+@pytest.mark.django_db
+def test_api_moves_since_out_of_range(api_client: APIClient, saved_game: Game) -> None:
+    """Test that a ply the game hasn't reached is a 400."""
+    assert api_client.get(f"/api/games/{saved_game.id}/moves/?since=5").status_code == 400
+    assert api_client.get(f"/api/games/{saved_game.id}/moves/?since=x").status_code == 400
+
+
+@pytest.mark.django_db
+def test_api_moves_since_finished_game(api_client: APIClient) -> None:
+    """Test that the stored outcome is reported."""
+    game = Game.objects.create()
+    board = chess.Board()
+    for uci in ["f2f3", "e7e5", "g2g4", "d8h4"]:
+        board.push_uci(uci)
+    save_board(board=board, game=game)
+
+    data = api_client.get(f"/api/games/{game.id}/moves/?since=3").json()
+
+    assert data["moves"] == ["d8h4"]
+    assert data["in_progress"] is False
+    assert data["outcome"] == "Black won by checkmate"
+
+
+@pytest.mark.django_db
+def test_api_make_move_with_current_ply(api_client: APIClient, saved_game: Game) -> None:
+    """Test that a move naming the current ply is accepted."""
+    response = api_client.post(f"/api/games/{saved_game.id}/moves/", {"move": "f1c4", "ply": 4})
+
+    assert response.status_code == 200
+    saved_game.refresh_from_db()
+    assert saved_game.ply == 6
+
+
+@pytest.mark.django_db
+def test_api_make_move_with_stale_ply(api_client: APIClient, saved_game: Game) -> None:
+    """Test that a move from a client that is behind is rejected."""
+    response = api_client.post(f"/api/games/{saved_game.id}/moves/", {"move": "e2e4", "ply": 2})
+
+    assert response.status_code == 409
+    assert response.json()["ply"] == 4
+    saved_game.refresh_from_db()
+    assert saved_game.ply == 4
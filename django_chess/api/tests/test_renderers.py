@@ -0,0 +1,108 @@
+import datetime
+import importlib
+import decimal
+import io
+import uuid
+
+import chess
+import pytest
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from django_chess.api import renderers
+from django_chess.app.models import Game
+
+PAYLOAD = {
+    "id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+    "name": "ünïcödé\u2028line\u2029separator",
+    "moves": ["e2e4", "e7e5"],
+    "modified": datetime.datetime(2025, 1, 2, 3, 4, 5, 678901, tzinfo=datetime.timezone.utc),
+    "rating": decimal.Decimal("1.5"),
+    "outcome": None,
+}
+
+
+@pytest.fixture(params=["orjson", "fallback"])
+def implementation(request: pytest.FixtureRequest, monkeypatch: pytest.MonkeyPatch) -> str:
+    if request.param == "orjson":
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(renderers, "orjson", None)
+    return str(request.param)
+
+
+def test_renders_exactly_what_drf_does(implementation: str) -> None:
+    expected = JSONRenderer().render(PAYLOAD, "application/json")
+
+    assert renderers.FastJSONRenderer().render(PAYLOAD, "application/json") == expected
+    assert renderers.FastJSONRenderer().render(None) == b""
+    indented = renderers.FastJSONRenderer().render(PAYLOAD, "application/json; indent=4")
+    assert indented == JSONRenderer().render(PAYLOAD, "application/json; indent=4")
+
+
+def test_parses_what_drf_does(implementation: str) -> None:
+    body = '{"move": "e2e4", "ply": 4, "name": "ünïcödé"}'.encode()
+
+    parsed = renderers.FastJSONParser().parse(io.BytesIO(body))
+    assert parsed == JSONParser().parse(io.BytesIO(body))
+
+    with pytest.raises(ParseError):
+        renderers.FastJSONParser().parse(io.BytesIO(b'{"move": '))
+    with pytest.raises(ParseError):
+        renderers.FastJSONParser().parse(io.BytesIO(b'{"ply": NaN}'))
+
+
+def test_production_has_no_browsable_api() -> None:
+    prod_settings = importlib.import_module("django_chess.prod_settings")
+
+    assert prod_settings.REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"] == ["django_chess.api.renderers.FastJSONRenderer"]
+
+
+def test_moves_pack_into_two_bytes_apiece() -> None:
+    assert renderers.pack_move("e2e4") == chess.E2 | chess.E4 << 6
+    assert renderers.pack_move("a7a8q") == chess.A7 | chess.A8 << 6 | chess.QUEEN << 12
+    assert renderers.pack_moves(["e2e4", "a7a8q"]) == bytes([0x07, 0x0C, 0x5E, 0x30])
+
+    masks = renderers.legal_move_masks([m.uci() for m in chess.Board().legal_moves])
+    assert len(masks) == 10
+    assert masks[chess.G1] == chess.BB_F3 | chess.BB_H3
+    assert masks[chess.E2] == chess.BB_E3 | chess.BB_E4
+
+
+@pytest.mark.django_db
+def test_game_api_speaks_msgpack_when_asked() -> None:
+    msgpack = pytest.importorskip("msgpack")
+    game = Game.objects.create(moves='["e2e4", "e7e5"]', ply=2)
+    client = APIClient()
+
+    response = client.get(f"/api/games/{game.pk}/", HTTP_ACCEPT="application/msgpack")
+    assert response["Content-Type"] == "application/msgpack"
+    detail = msgpack.unpackb(response.content, strict_map_key=False)
+    assert detail["move_uci"] == renderers.pack_moves(["e2e4", "e7e5"])
+    assert detail["move_san"] == ["e4", "e5"]
+    assert detail["legal_moves"][chess.G1] == chess.BB_E2 | chess.BB_F3 | chess.BB_H3
+    assert detail["board_fen"] == client.get(f"/api/games/{game.pk}/").json()["board_fen"]
+
+    response = client.get(f"/api/games/{game.pk}/moves/?since=1", HTTP_ACCEPT="application/msgpack")
+    assert msgpack.unpackb(response.content)["moves"] == renderers.pack_moves(["e7e5"])
+
+    # JSON stays the default
+    assert client.get(f"/api/games/{game.pk}/", HTTP_ACCEPT="*/*")["Content-Type"] == "application/json"
+
+
+@pytest.mark.django_db
+def test_a_json_etag_doesnt_match_the_msgpack_body() -> None:
+    pytest.importorskip("msgpack")
+    game = Game.objects.create(moves='["e2e4", "e7e5"]', ply=2)
+    client = APIClient()
+    url = f"/api/games/{game.pk}/moves/?since=1"
+
+    etag = client.get(url)["ETag"]
+    assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    response = client.get(url, HTTP_ACCEPT="application/msgpack", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response["Content-Type"] == "application/msgpack"
+    assert response["ETag"] != etag
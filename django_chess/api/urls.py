@@ -1,7 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
-from django_chess.api.views import GameViewSet
+from django_chess.api.views import GameViewSet, game_events, position_moves
 
 # Create a router and register our viewset
 router = DefaultRouter()
@@ -9,4 +9,6 @@ router.register(r'games', GameViewSet, basename='api-game')
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('games/<uuid:game_id>/events/', game_events, name='api-game-events'),
+    path('positions/<path:fen>/moves', position_moves, name='api-position-moves'),
 ]
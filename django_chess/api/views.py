@@ -1,69 +1,62 @@
-import os
-import pathlib
-import random
+import json
 from typing import Any
+from uuid import UUID
 
 import chess
-import chess.engine
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpRequest, HttpResponseBase, HttpResponseNotFound, StreamingHttpResponse
+from django.views.decorators.http import require_GET
 from rest_framework import status, viewsets
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import BaseRenderer
 from rest_framework.request import Request
 from rest_framework.response import Response
 
-from django_chess.app.models import Game
-from django_chess.app.utils import load_board, save_board
+from django_chess.app import sharding
+from django_chess.app.budgets import Budget, query_budget
+from django_chess.app.engine import get_black_move
+from django_chess.app.events import hub, move_event
+from django_chess.app.explorer import moves_from
+from django_chess.app.models import Game, StaleGameError
+from django_chess.app.utils import load_board, save_board, stored_outcome
+from django_chess.api.renderers import MSGPACK_INSTALLED, MessagePackRenderer
 from django_chess.api.serializers import (
     CreateGameSerializer,
     GameDetailSerializer,
     GameListSerializer,
     MoveSerializer,
+    PositionMoveSerializer,
     UpdateGameSerializer,
 )
 
 
-def _first_existing_executable(candidates: list[str]) -> pathlib.Path | None:
-    """Find first existing executable from a list of candidates."""
-    for c in candidates:
-        p = pathlib.Path(c)
-        if p.exists() and p.is_file() and os.access(p, os.X_OK):
-            return p
-    return None
-
-
-GNUCHESS_EXECUTABLE = _first_existing_executable(
-    [
-        "/usr/games/gnuchess",  # Debian/Ubuntu
-        "/opt/homebrew/bin/gnuchess",  # macOS Homebrew
-    ]
-)
-
+def _detail_field_options(request: Request) -> dict[str, list[str]]:
+    """
+    Parse ``?fields=a,b`` and ``?omit=c`` into GameDetailSerializer keyword arguments.
 
-def num_black_moves(board: chess.Board) -> int:
-    """Calculate number of black moves made."""
-    total_moves, _ = divmod(len(board.move_stack), 2)
-    return total_moves
+    Raises ValidationError (a 400) for names the serializer doesn't know.
+    """
+    options = {}
+    for param in ('fields', 'omit'):
+        if (value := request.query_params.get(param)) is not None:
+            options[param] = [name.strip() for name in value.split(',') if name.strip()]
 
+    unknown = GameDetailSerializer.unknown_fields(
+        name for names in options.values() for name in names
+    )
+    if unknown:
+        raise ValidationError({"error": f"Unknown field(s): {', '.join(unknown)}"})
 
-def get_black_move(board: chess.Board, smartness: int) -> chess.Move | None:
-    """Get black's move based on AI smartness level (0-10)."""
-    if not board.turn:  # It's black's turn
-        # Use GNU Chess engine if smartness threshold met and executable available
-        if num_black_moves(board) % 10 < smartness and GNUCHESS_EXECUTABLE is not None:
-            try:
-                with chess.engine.SimpleEngine.popen_uci([str(GNUCHESS_EXECUTABLE), "--uci"]) as engine:
-                    result = engine.play(board, chess.engine.Limit(time=0))
-                    if result.move is not None and result.move != chess.Move.null():
-                        return result.move
-            except Exception:
-                # Fall through to random move if engine fails
-                pass
+    return options
 
-        # Otherwise make a random legal move
-        legal_moves = list(board.legal_moves)
-        if legal_moves:
-            return random.choice(legal_moves)
 
-    return None
+def _stale_ply(ply: int) -> Response:
+    return Response(
+        {"error": "Stale ply; fetch the moves since your ply and retry", "ply": ply},
+        status=status.HTTP_409_CONFLICT
+    )
 
 
 class GameViewSet(viewsets.ModelViewSet[Game]):
@@ -74,14 +67,33 @@ class GameViewSet(viewsets.ModelViewSet[Game]):
     - list: GET /api/games/ - List completed games
     - create: POST /api/games/ - Create a new game
     - retrieve: GET /api/games/<uuid>/ - Get game detail with board state
+      (?fields=a,b or ?omit=c,d to choose which detail fields are computed)
     - partial_update: PATCH /api/games/<uuid>/ - Update game settings
     - destroy: DELETE /api/games/<uuid>/ - Delete a game
-    - moves: POST /api/games/<uuid>/moves/ - Make a move
+    - moves: GET /api/games/<uuid>/moves/?since=<ply> - The moves after a ply
+    - make_move: POST /api/games/<uuid>/moves/ - Make a move (same ?fields=/?omit= for game_state)
+
+    Each answers in JSON, or in MessagePack to "Accept: application/msgpack".
     """
 
     queryset = Game.objects.ordered_queryset()
     serializer_class = GameListSerializer
 
+    # Per action; see django_chess/app/budgets.py.  Lists read one row per game, from each shard.
+    query_budgets = {
+        'list': Budget(queries=len(settings.GAME_SHARDS)),
+        'create': Budget(queries=1, rows=1),
+        'retrieve': Budget(queries=1, rows=1),
+        'update': Budget(queries=2, rows=2),
+        'partial_update': Budget(queries=2, rows=2),
+        'destroy': Budget(queries=2, rows=2),
+        'moves': Budget(queries=1, rows=1),
+        # White's move and black's reply in one UPDATE; the move that ends the game also adds
+        # a row per position to the explorer, and one that loses a race rolls back and reads
+        # the current ply for its 409.
+        'make_move': Budget(queries=6),
+    }
+
     def get_queryset(self) -> Any:
         """Return queryset, filtering for completed games only in list action."""
         queryset = super().get_queryset()
@@ -89,6 +101,13 @@ class GameViewSet(viewsets.ModelViewSet[Game]):
             return queryset.filter(in_progress=False)
         return queryset
 
+    def get_renderers(self) -> list[BaseRenderer]:
+        """The default renderers, then MessagePack: JSON stays the default."""
+        renderers = super().get_renderers()
+        if MSGPACK_INSTALLED:
+            renderers.append(MessagePackRenderer())
+        return renderers
+
     def get_serializer_class(self) -> type[GameListSerializer] | type[GameDetailSerializer] | type[CreateGameSerializer] | type[UpdateGameSerializer]:
         """Return appropriate serializer based on action."""
         if self.action == 'retrieve':
@@ -103,8 +122,8 @@ class GameViewSet(viewsets.ModelViewSet[Game]):
         """
         Return completed games only.
         """
-        queryset = self.filter_queryset(self.get_queryset())
-        serializer = self.get_serializer(queryset, many=True)
+        games = sharding.fan_out(self.filter_queryset(self.get_queryset()))
+        serializer = self.get_serializer(games, many=True)
         return Response(serializer.data)
 
     def create(self, request: Request, *args: Any, **kwargs: Any) -> Response:
@@ -123,8 +142,9 @@ class GameViewSet(viewsets.ModelViewSet[Game]):
         """
         Get detailed game state including board position and legal moves.
         """
+        options = _detail_field_options(request)
         instance = self.get_object()
-        serializer = self.get_serializer(instance)
+        serializer = self.get_serializer(instance, **options)
         return Response(serializer.data)
 
     def partial_update(self, request: Request, *args: Any, **kwargs: Any) -> Response:
@@ -145,29 +165,73 @@ class GameViewSet(viewsets.ModelViewSet[Game]):
         instance.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
-    @action(detail=True, methods=['post'])
+    @action(detail=True, methods=['get'])
     def moves(self, request: Request, pk: str | None = None) -> Response:
+        """
+        The plies after ?since=<ply>, served from stored columns without a replay.
+        """
+        game = self.get_object()
+
+        try:
+            since = int(request.query_params.get('since', 0))
+        except ValueError:
+            since = -1
+        if not 0 <= since <= game.ply:
+            return Response(
+                {"error": f"since must be between 0 and {game.ply}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # One ETag per representation: a client holding the JSON body mustn't get a 304 for msgpack.
+        etag = f'"{game.ply}-{request.accepted_renderer.format}"'
+        headers = {'ETag': etag, 'Vary': 'Accept'}
+        if request.headers.get('If-None-Match') == etag:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        moves: list[str] = json.loads(game.moves) if game.moves is not None else []
+        return Response(
+            {
+                "since": since,
+                "ply": game.ply,
+                "moves": moves[since:],
+                "board_fen": game.fen,
+                "in_progress": game.in_progress,
+                "outcome": stored_outcome(game),
+                "version": str(game.ply),
+            },
+            headers=headers,
+        )
+
+    @moves.mapping.post
+    def make_move(self, request: Request, pk: str | None = None) -> Response:
         """
         Make a move in the game.
 
-        Request body: {"move": "e2e4"}
+        Request body: {"move": "e2e4", "ply": 4}
+        "ply" is optional; if given and the game is no longer at that ply, the move is
+        rejected with a 409 so the client can catch up first.  The same 409 comes back if
+        another request saves a move in this game while this one is working.
         Returns updated game state including AI response if applicable.
         """
+        options = _detail_field_options(request)
         game = self.get_object()
 
+        move_serializer = MoveSerializer(data=request.data)
+        move_serializer.is_valid(raise_exception=True)
+
+        if (client_ply := move_serializer.validated_data.get('ply')) is not None and client_ply != game.ply:
+            return _stale_ply(game.ply)
+
         if not game.in_progress:
             return Response(
                 {"error": "Game is already finished"},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Validate the move
-        move_serializer = MoveSerializer(data=request.data)
-        move_serializer.is_valid(raise_exception=True)
         move_uci = move_serializer.validated_data['move']
 
         # Load board and validate move is legal
-        board = load_board(game=game)
+        board = load_board(game=game, annotate=False)
 
         try:
             move = chess.Move.from_uci(move_uci)
@@ -185,7 +249,6 @@ class GameViewSet(viewsets.ModelViewSet[Game]):
 
         # Make the move
         game.promoting_push(board, move)
-        save_board(board=board, game=game)
 
         ai_response = None
 
@@ -195,10 +258,16 @@ class GameViewSet(viewsets.ModelViewSet[Game]):
             if black_move:
                 ai_response = black_move.uci()
                 game.promoting_push(board, black_move)
-                save_board(board=board, game=game)
+
+        # Both moves in one write, so nobody ever sees the game waiting on black's reply
+        try:
+            save_board(board=board, game=game)
+        except StaleGameError:
+            # Someone else moved while we were working; this move was for the old position.
+            return _stale_ply(Game.objects.values_list('ply', flat=True).get(pk=game.pk))
 
         # Return updated game state
-        detail_serializer = GameDetailSerializer(game)
+        detail_serializer = GameDetailSerializer(game, **options)
         response_data = {
             "move_made": move_uci,
             "ai_response": ai_response,
@@ -206,3 +275,66 @@ class GameViewSet(viewsets.ModelViewSet[Game]):
         }
 
         return Response(response_data)
+
+
+@query_budget(queries=1)
+@api_view(['GET'])
+def position_moves(request: Request, fen: str) -> Response:
+    """
+    Opening explorer: the moves played from a position across all games, with results.
+
+    GET /api/positions/<fen>/moves
+    Spaces in the FEN may be written as underscores, e.g.
+    /api/positions/rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR_b_KQkq_-_0_1/moves
+    """
+    try:
+        board = chess.Board(fen.replace('_', ' '))
+    except ValueError as e:
+        return Response(
+            {"error": f"Invalid FEN: {e}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    # A Zobrist collision could hand us another position's moves; drop anything illegal here.
+    rows = [row for row in moves_from(board) if chess.Move.from_uci(row.move) in board.legal_moves]
+    serializer = PositionMoveSerializer(rows, many=True, context={'board': board})
+
+    return Response({
+        "fen": board.fen(),
+        "games": sum(row.games for row in rows),
+        "moves": serializer.data,
+    })
+
+
+@query_budget(queries=1, rows=1)
+@require_GET
+async def game_events(request: HttpRequest, game_id: UUID) -> HttpResponseBase:
+    """
+    Server-Sent Events stream of moves in one game.
+
+    GET /api/games/<uuid>/events/
+    The first event is the current position; after that, one "move" event per saved move, e.g.
+    {"ply":2,"uci":"e7e5","fen":"...","in_progress":true,"result":null}.
+    """
+    # Subscribe first, so that a move saved while we read the game is queued, not lost.
+    subscription = hub.subscribe(game_id)
+    game = await Game.objects.filter(pk=game_id).afirst()
+    if game is None:
+        hub.unsubscribe(game_id, subscription)
+        return HttpResponseNotFound()
+
+    board = await sync_to_async(load_board)(game=game, annotate=False)
+
+    if settings.GAME_EVENTS_POLL_SECONDS:
+        hub.start_polling(settings.GAME_EVENTS_POLL_SECONDS)
+    response = StreamingHttpResponse(
+        hub.stream(
+            game.pk,
+            subscription=subscription,
+            initial=move_event(board=board, in_progress=game.in_progress),
+        ),
+        content_type="text/event-stream",
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class AppConfig(AppConfig):  # type: ignore [no-redef]
     default_auto_field = "django.db.models.BigAutoField"
     name = "django_chess.app"
+
+    def ready(self) -> None:
+        from django_chess.app import database  # noqa: F401 -- connects the pragma receiver
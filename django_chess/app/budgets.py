@@ -0,0 +1,137 @@
+"""
+Per-view query budgets: how many SQL statements a view may run, and how many rows it may
+read or write, per request.
+
+Function views declare theirs with the ``query_budget`` decorator; viewsets map action names to
+``Budget``s in a ``query_budgets`` class attribute.  ``track()`` counts what a block of code
+actually does, through a connection execute wrapper.  Two things check the counts against the
+budgets:
+
+- ``assert_within_budget``, for tests: makes a request with the test client and fails if the
+  view went over.
+- QueryBudgetMiddleware (in middleware.py), when QUERY_BUDGETS_ENABLED is on: logs a warning
+  and counts django_chess_query_budget_violations_total for each request over budget, so that
+  regressions show up in production without failing anybody's request.
+
+Rows are what the statements return (counted as they're fetched) plus what they change
+(the cursor's rowcount).  ``None`` means no limit.
+"""
+import contextlib
+from typing import Any, Callable, Iterator, NamedTuple, TypeVar
+
+from django.db import connections
+from django.http import HttpResponseBase
+from django.urls import ResolverMatch
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+class Budget(NamedTuple):
+    queries: int
+    rows: int | None = None
+
+
+def query_budget(*, queries: int, rows: int | None = None) -> Callable[[F], F]:
+    """Declare a function view's budget; apply it outside any other decorators."""
+    def declare(view: F) -> F:
+        setattr(view, "query_budget", Budget(queries, rows))
+        return view
+
+    return declare
+
+
+def budget_for(match: ResolverMatch | None, method: str) -> Budget | None:
+    """The budget of the view that ``match`` resolved to, for an HTTP ``method`` request."""
+    if match is None:
+        return None
+
+    budget: Budget | None = getattr(match.func, "query_budget", None)
+    if budget is None:
+        # A viewset's as_view() records the class and its method -> action mapping on the view.
+        budgets = getattr(getattr(match.func, "cls", None), "query_budgets", {})
+        budget = budgets.get(getattr(match.func, "actions", {}).get(method.lower()))
+    return budget
+
+
+class Usage:
+    """The statements a block of code ran, and the rows they read or changed."""
+
+    def __init__(self) -> None:
+        self.statements: list[str] = []
+        self.rows = 0
+
+    @property
+    def queries(self) -> int:
+        return len(self.statements)
+
+    def over(self, budget: Budget) -> list[str]:
+        """Describe how this usage exceeds ``budget``, if it does."""
+        problems = []
+        if self.queries > budget.queries:
+            problems.append(f"{self.queries} queries (budget {budget.queries})")
+        if budget.rows is not None and self.rows > budget.rows:
+            problems.append(f"{self.rows} rows (budget {budget.rows})")
+        return problems
+
+    def _counting(self, fetch: Callable[..., Any]) -> Callable[..., Any]:
+        def counted(*args: Any, **kwargs: Any) -> Any:
+            result = fetch(*args, **kwargs)
+            if isinstance(result, list):
+                self.rows += len(result)
+            elif result is not None:
+                self.rows += 1
+            return result
+
+        return counted
+
+    def __call__(
+        self, execute: Callable[..., Any], sql: str, params: Any, many: bool, context: dict[str, Any]
+    ) -> Any:
+        self.statements.append(sql)
+        result = execute(sql, params, many, context)
+
+        cursor = context["cursor"]
+        if cursor.description is None:
+            self.rows += max(cursor.rowcount, 0)
+        else:
+            # Count the rows as the caller fetches them.  Instance attributes take precedence
+            # over the wrapper's __getattr__ delegation to the database cursor; several Usages
+            # (say the middleware's and a test's) may each wrap the same cursor, once apiece.
+            counted_by = vars(cursor).setdefault("_counted_by", set())
+            if id(self) not in counted_by:
+                counted_by.add(id(self))
+                for name in ("fetchone", "fetchmany", "fetchall"):
+                    setattr(cursor, name, self._counting(getattr(cursor, name)))
+
+        return result
+
+
+@contextlib.contextmanager
+def track() -> Iterator[Usage]:
+    """Count the statements run, and rows touched, on every connection within this block."""
+    usage = Usage()
+    with contextlib.ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(usage))
+        yield usage
+
+
+def assert_within_budget(
+    send: Callable[..., HttpResponseBase], path: str, *args: Any, **kwargs: Any
+) -> Any:
+    """
+    Call a test client method, e.g. ``assert_within_budget(client.get, "/")``, and return the
+    response.  Fails if the view has no budget or went over it.
+    """
+    with track() as usage:
+        response: Any = send(path, *args, **kwargs)
+
+    method = response.request["REQUEST_METHOD"]
+    budget = budget_for(response.resolver_match, method)
+    assert budget is not None, f"{method} {path} has no query budget"
+
+    problems = usage.over(budget)
+    assert not problems, f"{method} {path} ran {' and '.join(problems)}:\n" + "\n".join(usage.statements)
+
+    return response
+
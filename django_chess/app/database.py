@@ -0,0 +1,62 @@
+"""
+SQLite tuning, and separate connections for reads and writes.
+
+Every new SQLite connection gets the SQLITE_PRAGMAS from settings (WAL journal, relaxed fsync,
+a busy timeout, memory-mapped I/O and a bigger page cache) by way of the ``connection_created``
+signal.  In WAL mode readers work from a snapshot and never wait on the writer, but only if
+they're on a different connection from it; ``ReadWriteRouter`` sends ORM reads to the
+DATABASE_READ_ALIAS connection (the same file, opened read-only) and writes to "default".
+
+Reads made inside a transaction on "default" stay there, so that they see its writes.  So do
+all reads when the database is in memory, as pytest's is: a second connection to it buys
+nothing.
+"""
+from typing import Any
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+@receiver(connection_created)
+def apply_pragmas(sender: Any, connection: BaseDatabaseWrapper, **kwargs: Any) -> None:
+    if connection.vendor != "sqlite":
+        return
+
+    # On the sqlite3 connection itself, so that query budgets and Server-Timing don't count
+    # these against whichever request happened to open the connection.  They run in order, and
+    # query_only goes last: a read-only connection can't switch the journal to WAL.
+    for name, value in settings.SQLITE_PRAGMAS.items():
+        connection.connection.execute(f"PRAGMA {name} = {value}")
+    if connection.alias == settings.DATABASE_READ_ALIAS:
+        connection.connection.execute("PRAGMA query_only = ON")
+
+
+def read_alias() -> str:
+    """The connection that a read made right now should use."""
+    alias: str | None = settings.DATABASE_READ_ALIAS
+    writer = connections[DEFAULT_DB_ALIAS]
+    if (
+        alias is None
+        or writer.vendor != "sqlite"
+        or writer.is_in_memory_db()  # type: ignore[attr-defined]
+        or writer.in_atomic_block
+    ):
+        return DEFAULT_DB_ALIAS
+    return alias
+
+
+class ReadWriteRouter:
+    def db_for_read(self, model: Any, **hints: Any) -> str:
+        return read_alias()
+
+    def db_for_write(self, model: Any, **hints: Any) -> str:
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1: Any, obj2: Any, **hints: Any) -> bool:
+        return True  # both connections are the same database
+
+    def allow_migrate(self, db: str, app_label: str, model_name: str | None = None, **hints: Any) -> bool:
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,140 @@
+"""
+The UCI engine that plays black.
+
+Which engine runs is a setting, CHESS_ENGINE_COMMAND; when that's unset we look for gnuchess
+in the usual places.  django_chess/app/fake_engine.py is a stand-in with predictable timing
+and moves, for tests and benchmarks.
+
+Each process runs at most CHESS_ENGINE_MAX_CONCURRENT engines at a time; requests beyond that
+wait for a free slot, so that several server workers together don't start more engines than
+the host has cores.
+"""
+import contextlib
+import functools
+import os
+import pathlib
+import random
+import threading
+from typing import Iterator
+
+import chess
+import chess.engine
+
+from django.conf import settings
+
+from django_chess.app import metrics
+from django_chess.app.timing import timed
+
+
+def _first_existing_executable(candidates: list[str]) -> pathlib.Path | None:
+    """Find first existing executable from a list of candidates."""
+    for c in candidates:
+        p = pathlib.Path(c)
+        if p.exists() and p.is_file() and os.access(p, os.X_OK):
+            return p
+
+    return None
+
+
+GNUCHESS_EXECUTABLE = _first_existing_executable(
+    [
+        # This works on Debian 12 ("bookworm")
+        "/usr/games/gnuchess",
+        # This works on MacOS with homebrew
+        "/opt/homebrew/bin/gnuchess",
+    ]
+)
+
+
+def engine_command() -> list[str] | None:
+    """The argv that starts the engine, or None if there's no engine to be had."""
+    if settings.CHESS_ENGINE_COMMAND:
+        return list(settings.CHESS_ENGINE_COMMAND)
+
+    if GNUCHESS_EXECUTABLE is not None:
+        return [str(GNUCHESS_EXECUTABLE), "--uci"]
+
+    return None
+
+
+class EngineSlots:
+    """A limit on the engines running at once in this process, and a count of them."""
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.semaphore = threading.BoundedSemaphore(size)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+
+    @contextlib.contextmanager
+    def hold(self, *, timeout: float) -> Iterator[None]:
+        """Take a slot for the block, waiting at most ``timeout`` seconds for one."""
+        if not self.semaphore.acquire(timeout=timeout):
+            raise TimeoutError(f"All {self.size} engine slot(s) stayed busy for {timeout}s")
+        with self.lock:
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+            self.semaphore.release()
+
+
+@functools.cache
+def _slots(size: int) -> EngineSlots:
+    return EngineSlots(size)
+
+
+def engine_slots() -> EngineSlots:
+    """This process's engine slots, CHESS_ENGINE_MAX_CONCURRENT of them."""
+    return _slots(settings.CHESS_ENGINE_MAX_CONCURRENT)
+
+
+def engine_play(board: chess.Board, *, smartness: int) -> chess.engine.PlayResult | None:
+    """
+    Ask the engine for a move in ``board``; None if no engine is configured.
+
+    Waiting for an engine slot, startup and each move are each bounded by
+    CHESS_ENGINE_TIMEOUT_SECONDS, so a hung engine raises a TimeoutError rather than hanging
+    the request.  ``smartness`` only labels the metrics.
+    """
+    command = engine_command()
+    if command is None:
+        return None
+
+    timeout = settings.CHESS_ENGINE_TIMEOUT_SECONDS
+    with timed("engine"), engine_slots().hold(timeout=timeout), metrics.engines_in_flight.track():
+        with metrics.engine_spawn_seconds.time(smartness=smartness):
+            engine = chess.engine.SimpleEngine.popen_uci(command, timeout=timeout)
+
+        with engine, metrics.engine_think_seconds.time(smartness=smartness):
+            return engine.play(board, chess.engine.Limit(time=0))
+
+
+def num_black_moves(board: chess.Board) -> int:
+    """Calculate number of black moves made."""
+    # Remember, len(board.move_stack) == the number of "half-moves".
+    total_moves, _ = divmod(len(board.move_stack), 2)
+    return total_moves
+
+
+def get_black_move(board: chess.Board, smartness: int) -> chess.Move | None:
+    """Get black's move based on AI smartness level (0-10)."""
+    if not board.turn:  # It's black's turn
+        # Use the engine if smartness threshold met
+        if num_black_moves(board) % 10 < smartness:
+            try:
+                result = engine_play(board, smartness=smartness)
+                if result is not None and result.move is not None and result.move != chess.Move.null():
+                    return result.move
+            except Exception:
+                # Fall through to random move if engine fails
+                pass
+
+        # Otherwise make a random legal move
+        legal_moves = list(board.legal_moves)
+        if legal_moves:
+            return random.choice(legal_moves)
+
+    return None
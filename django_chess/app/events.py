@@ -0,0 +1,228 @@
+"""
+In-process fan-out of game updates to Server-Sent Events subscribers.
+
+save_board publishes a compact event once its transaction commits; each subscriber owns a
+small asyncio queue on its event loop, so idle subscribers cost a queue and nothing else --
+no per-client database polling.
+
+The hub lives in one process, and hears only of the moves that process saves.  With several
+server processes, each hub also polls the database, every GAME_EVENTS_POLL_SECONDS, for the
+games it has subscribers to -- one query per process, however many subscribers -- and
+publishes the latest position of those that moved elsewhere.  Those arrive up to that much
+later, and as one event even if several plies were played meanwhile.
+"""
+import asyncio
+import collections
+import json
+import logging
+import threading
+import time
+from typing import Any, AsyncIterator
+from uuid import UUID
+
+import chess
+from django.db import close_old_connections
+
+from django_chess.app import sharding
+from django_chess.app.models import Game
+
+logger = logging.getLogger(__name__)
+
+# Events carry the whole position, so a subscriber that falls behind only needs the latest few.
+QUEUE_SIZE = 8
+
+
+def move_event(*, board: chess.Board, in_progress: bool) -> dict[str, Any]:
+    """The compact payload sent to subscribers after a move is saved."""
+    return {
+        "ply": len(board.move_stack),
+        "uci": board.move_stack[-1].uci() if board.move_stack else None,
+        "fen": board.fen(),
+        "in_progress": in_progress,
+        "result": None if in_progress else board.result(),
+    }
+
+
+def move_events(*, board: chess.Board, since: int, in_progress: bool) -> list[dict[str, Any]]:
+    """
+    One ``move_event`` per ply after ``since``, oldest first -- a request that saves white's
+    move and black's reply together still tells subscribers about both.  Subscribers keep
+    only QUEUE_SIZE events, so that's all we make.
+    """
+    popped = []
+    try:
+        events = [move_event(board=board, in_progress=in_progress)]
+        while len(events) < min(len(board.move_stack) - since, QUEUE_SIZE):
+            popped.append(board.pop())
+            events.append(move_event(board=board, in_progress=True))
+    finally:
+        for move in reversed(popped):
+            board.push(move)
+    return events[::-1]
+
+
+def stored_event(game: Game) -> dict[str, Any]:
+    """``move_event`` for a Game's latest position, from its stored columns."""
+    moves = json.loads(game.moves) if game.moves else []
+    return {
+        "ply": game.ply,
+        "uci": moves[-1] if moves else None,
+        "fen": game.fen,
+        "in_progress": game.in_progress,
+        "result": None if game.in_progress else game.result,
+    }
+
+
+def format_sse(event: dict[str, Any]) -> str:
+    return f"id: {event['ply']}\nevent: move\ndata: {json.dumps(event, separators=(',', ':'))}\n\n"
+
+
+class Subscription:
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.loop = loop
+        # None, once queued, ends the stream.
+        self.queue: asyncio.Queue[dict[str, Any] | None] = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.ply = -1  # of the latest event queued
+
+    def deliver(self, event: dict[str, Any] | None) -> None:
+        """
+        Runs on the subscriber's loop; drops the oldest event rather than block the publisher.
+        Events for plies already delivered (say, polled after being published) are dropped.
+        """
+        if event is not None and event.get("ply") is not None:
+            if event["ply"] <= self.ply:
+                return
+            self.ply = event["ply"]
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+
+class GameEventHub:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._subscriptions: dict[UUID, set[Subscription]] = collections.defaultdict(set)
+        self._polled: dict[UUID, int] = {}  # game -> ply, as the last poll saw it
+        self._poller: threading.Thread | None = None
+
+    def subscriber_count(self, game_id: UUID | None = None) -> int:
+        with self._lock:
+            if game_id is not None:
+                return len(self._subscriptions.get(game_id, ()))
+            return sum(len(subs) for subs in self._subscriptions.values())
+
+    def subscribe(self, game_id: UUID) -> Subscription:
+        subscription = Subscription(asyncio.get_running_loop())
+        with self._lock:
+            self._subscriptions[game_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, game_id: UUID, subscription: Subscription) -> None:
+        with self._lock:
+            subs = self._subscriptions.get(game_id)
+            if subs is not None:
+                subs.discard(subscription)
+                if not subs:
+                    del self._subscriptions[game_id]
+
+    def publish(self, game_id: UUID, event: dict[str, Any]) -> None:
+        """Safe to call from any thread, e.g. a sync view running under sync_to_async."""
+        with self._lock:
+            subs = list(self._subscriptions.get(game_id, ()))
+
+        for subscription in subs:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:  # that subscriber's loop has closed
+                self.unsubscribe(game_id, subscription)
+
+    def close_all(self) -> None:
+        """
+        End every stream, e.g. when this server process is draining; browsers' EventSources
+        reconnect by themselves, to whichever process is still accepting connections.
+        """
+        with self._lock:
+            subs = [(game_id, sub) for game_id, game_subs in self._subscriptions.items() for sub in game_subs]
+
+        for game_id, subscription in subs:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, None)
+            except RuntimeError:  # that subscriber's loop has closed
+                self.unsubscribe(game_id, subscription)
+
+    def poll(self) -> None:
+        """Publish the latest position of each subscribed-to game that has moved since the last poll."""
+        with self._lock:
+            game_ids = list(self._subscriptions)
+        self._polled = {game_id: ply for game_id, ply in self._polled.items() if game_id in game_ids}
+        if not game_ids:
+            return
+
+        games = sharding.fan_out(
+            Game.objects.filter(pk__in=game_ids).only("id", "moves", "ply", "fen", "in_progress", "result")
+        )
+        for game in games:
+            if self._polled.get(game.pk) != game.ply:
+                self._polled[game.pk] = game.ply
+                self.publish(game.pk, stored_event(game))
+
+    def start_polling(self, interval: float) -> None:
+        """Call poll() every ``interval`` seconds, on a thread of its own, from now on."""
+        with self._lock:
+            if self._poller is not None:
+                return
+            self._poller = threading.Thread(
+                target=self._poll_forever, args=(interval,), name="game-events", daemon=True
+            )
+        self._poller.start()
+
+    def _poll_forever(self, interval: float) -> None:
+        while True:
+            time.sleep(interval)
+            close_old_connections()
+            try:
+                self.poll()
+            except Exception:
+                logger.exception("Couldn't poll for other processes' moves")
+            finally:
+                close_old_connections()
+
+    async def stream(
+        self,
+        game_id: UUID,
+        *,
+        subscription: Subscription | None = None,
+        initial: dict[str, Any] | None = None,
+        heartbeat: float = 15.0,
+    ) -> AsyncIterator[str]:
+        """
+        Yield SSE-formatted events for ``game_id`` until the client goes away, or close_all().
+
+        To miss nothing, subscribe before reading the game that ``initial`` comes from and pass
+        that ``subscription`` in; events it queued meanwhile that ``initial`` covers are skipped.
+        """
+        if subscription is None:
+            subscription = self.subscribe(game_id)
+        try:
+            latest = -1
+            if initial is not None:
+                latest = initial["ply"]
+                subscription.ply = max(subscription.ply, latest)
+                yield format_sse(initial)
+
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"  # an SSE comment; keeps proxies from timing us out
+                    continue
+
+                if event is None:
+                    return
+                if event.get("ply") is not None and event["ply"] <= latest:
+                    continue
+                yield format_sse(event)
+        finally:
+            self.unsubscribe(game_id, subscription)
+
+hub = GameEventHub()
@@ -0,0 +1,78 @@
+"""Opening explorer: aggregated statistics for the moves played from each position."""
+import collections
+from typing import Iterable, Sequence
+
+import chess
+import chess.polyglot
+
+from django.db import connection
+
+from django_chess.app.models import PositionMove
+
+# Index into the [games, white_wins, draws, black_wins] counters for each PGN result.
+RESULT_INDEX = {
+    "1-0": 1,
+    "1/2-1/2": 2,
+    "0-1": 3,
+}
+
+UPSERT_CHUNK = 1000
+
+
+def position_key(board: chess.Board) -> int:
+    """Return the board's polyglot Zobrist hash, folded into a signed 64-bit integer."""
+    h = chess.polyglot.zobrist_hash(board)
+    return h - (1 << 64) if h >= (1 << 63) else h
+
+
+def record_games(games: Iterable[tuple[Sequence[str], str]]) -> None:
+    """
+    Fold finished games into the PositionMove table.
+
+    Each element of ``games`` is a list of UCI move strings plus the PGN result ("1-0",
+    "0-1", "1/2-1/2" or "*").  A position/move pair counts at most once per game, even if
+    the position repeats.  All the increments land in a single upsert.
+    """
+    totals: dict[tuple[int, str], list[int]] = collections.defaultdict(lambda: [0, 0, 0, 0])
+
+    for ucis, result in games:
+        board = chess.Board()
+        seen = set()
+
+        for uci in ucis:
+            seen.add((position_key(board), uci))
+            board.push(chess.Move.from_uci(uci))
+
+        result_index = RESULT_INDEX.get(result)
+        for pair in seen:
+            row = totals[pair]
+            row[0] += 1
+            if result_index is not None:
+                row[result_index] += 1
+
+    if not totals:
+        return
+
+    table = connection.ops.quote_name(PositionMove._meta.db_table)
+    counters = ["games", "white_wins", "draws", "black_wins"]
+    updates = ", ".join(f"{c} = {table}.{c} + excluded.{c}" for c in counters)
+    rows: list[tuple[int | str, ...]] = [(key, uci, *counts) for (key, uci), counts in totals.items()]
+
+    # Multi-row VALUES rather than executemany: one statement per chunk, and it keeps
+    # debug-toolbar's SQL panel happy.  The chunk size stays under SQLite's variable limit.
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), UPSERT_CHUNK):
+            chunk = rows[start:start + UPSERT_CHUNK]
+            cursor.execute(
+                f"INSERT INTO {table} (zobrist_hash, move, {', '.join(counters)}) "
+                f"VALUES {', '.join(['(%s, %s, %s, %s, %s, %s)'] * len(chunk))} "
+                f"ON CONFLICT (zobrist_hash, move) DO UPDATE SET {updates}",
+                [value for row in chunk for value in row],
+            )
+
+
+def moves_from(board: chess.Board) -> list[PositionMove]:
+    """Return the explorer rows for ``board``, most popular first."""
+    return list(
+        PositionMove.objects.filter(zobrist_hash=position_key(board)).order_by("-games", "move")
+    )
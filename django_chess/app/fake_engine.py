@@ -0,0 +1,141 @@
+"""
+A stand-in UCI engine with predictable timing, for tests and benchmarks.
+
+It speaks just enough UCI for python-chess: "uci", "isready", "ucinewgame", "position" and
+"go", answering each "go" after a fixed think time with a move picked by hashing the
+position, so the same position always gets the same reply.  It can also be told to start
+slowly, or to crash or hang after a number of moves, to exercise the error handling.
+
+Point CHESS_ENGINE_COMMAND at it with ``command()``, e.g.
+
+    CHESS_ENGINE_COMMAND = fake_engine.command(think_time=0.05, hang_after=3)
+
+or from the shell:
+
+    CHESS_ENGINE_COMMAND="python django_chess/app/fake_engine.py --think-time 0.05"
+
+Deliberately imports nothing from Django, so that it starts quickly.
+"""
+import argparse
+import hashlib
+import sys
+import time
+from typing import Iterable, TextIO
+
+import chess
+
+NAME = "django-chess fake engine"
+
+
+def choose_move(board: chess.Board, *, seed: int = 0) -> chess.Move | None:
+    """The move the fake engine plays in ``board``; None if there are no legal moves."""
+    legal_moves = sorted(board.legal_moves, key=lambda m: m.uci())
+    if not legal_moves:
+        return None
+
+    digest = hashlib.sha256(f"{seed}:{board.fen()}".encode()).digest()
+    return legal_moves[int.from_bytes(digest[:8], "big") % len(legal_moves)]
+
+
+def command(
+    *,
+    startup_delay: float = 0.0,
+    think_time: float = 0.0,
+    crash_after: int | None = None,
+    hang_after: int | None = None,
+    seed: int = 0,
+) -> list[str]:
+    """The argv for running this engine with the given behaviour."""
+    argv = [
+        sys.executable,
+        __file__,
+        "--startup-delay", str(startup_delay),
+        "--think-time", str(think_time),
+        "--seed", str(seed),
+    ]
+    if crash_after is not None:
+        argv += ["--crash-after", str(crash_after)]
+    if hang_after is not None:
+        argv += ["--hang-after", str(hang_after)]
+    return argv
+
+
+def parse_position(tokens: list[str]) -> chess.Board:
+    """Parse the arguments of a UCI "position" command."""
+    if "moves" in tokens:
+        split = tokens.index("moves")
+        tokens, moves = tokens[:split], tokens[split + 1:]
+    else:
+        moves = []
+
+    board = chess.Board() if tokens[:1] == ["startpos"] else chess.Board(" ".join(tokens[1:]))
+    for uci in moves:
+        board.push_uci(uci)
+    return board
+
+
+def serve(options: argparse.Namespace, lines: Iterable[str], out: TextIO) -> int:
+    """Answer UCI commands from ``lines`` until "quit" or end of input; return the exit status."""
+
+    def send(line: str) -> None:
+        out.write(line + "\n")
+        out.flush()
+
+    board = chess.Board()
+    moves_played = 0
+
+    for line in lines:
+        tokens = line.split()
+        if not tokens:
+            continue
+
+        match tokens[0]:
+            case "uci":
+                send(f"id name {NAME}")
+                send("id author django-chess")
+                send("uciok")
+            case "isready":
+                send("readyok")
+            case "ucinewgame":
+                board = chess.Board()
+            case "position":
+                board = parse_position(tokens[1:])
+            case "go":
+                if options.crash_after is not None and moves_played >= options.crash_after:
+                    return 1
+                if options.hang_after is not None and moves_played >= options.hang_after:
+                    while True:
+                        time.sleep(3600)
+
+                time.sleep(options.think_time)
+                move = choose_move(board, seed=options.seed)
+                send(f"bestmove {move.uci() if move is not None else '0000'}")
+                moves_played += 1
+            case "quit":
+                return 0
+            case _:  # "setoption", "stop", "debug" and the like need no reply
+                pass
+
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--startup-delay', type=float, default=0.0,
+                        help='Seconds to sleep before reading any input')
+    parser.add_argument('--think-time', type=float, default=0.0,
+                        help='Seconds to sleep before answering each "go"')
+    parser.add_argument('--crash-after', type=int, default=None,
+                        help='Exit abruptly on the "go" after this many moves')
+    parser.add_argument('--hang-after', type=int, default=None,
+                        help='Stop answering on the "go" after this many moves')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Changes which move is picked in each position')
+    options = parser.parse_args(argv)
+
+    time.sleep(options.startup_delay)
+    return serve(options, sys.stdin, sys.stdout)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
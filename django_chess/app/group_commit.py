@@ -0,0 +1,146 @@
+"""
+Group commit: one writer thread that commits many requests' writes in each transaction.
+
+SQLite lets one connection write at a time, so at peak concurrent save_board calls queue on
+the database lock, each paying for its own BEGIN, COMMIT and WAL sync, and some give up with
+"database is locked".  With GROUP_COMMIT_ENABLED, save_board hands its writes to a
+``GroupCommitWriter`` instead.  The writer's thread takes the first write waiting, collects
+whatever else arrives within GROUP_COMMIT_WINDOW_SECONDS (up to GROUP_COMMIT_MAX_BATCH
+writes), and runs them all in one transaction, each in its own savepoint so that one write's
+failure (a StaleGameError, say) doesn't undo the others.  With several game shards, a batch
+gets a transaction per shard that its writes go to.  Each caller gets its result, or
+its exception, once the transaction has committed; if the commit itself fails, every caller
+in the batch gets that error, and the writer carries on with the next batch.  A caller whose
+write hasn't started within GROUP_COMMIT_TIMEOUT_SECONDS gets a TimeoutError, and the write
+is dropped.
+
+How durable "committed" is depends on the synchronous pragma; see SQLITE_PRAGMAS.
+"""
+import concurrent.futures
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, TypeVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from django_chess.app import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# func, the database it writes to, and its caller's future
+Write = tuple[Callable[[], Any], str, concurrent.futures.Future[Any]]
+
+
+class GroupCommitWriter:
+    def __init__(self, *, window: float, max_batch: int, timeout: float) -> None:
+        self.window = window
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self.queue: queue.SimpleQueue[Write] = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+        self.thread.start()
+
+    def submit(self, func: Callable[[], T], *, using: str = DEFAULT_DB_ALIAS) -> T:
+        """
+        Run ``func``, which writes to the ``using`` database, in the writer's next transaction
+        there; return its result once that commits.  Raises TimeoutError if the writer doesn't
+        start on it within ``timeout`` seconds, in which case it never will.
+        """
+        if threading.current_thread() is self.thread or connections[using].in_atomic_block:
+            # Already in a transaction, which the caller expects ``func`` to be part of.
+            return func()
+
+        future: concurrent.futures.Future[T] = concurrent.futures.Future()
+        self.queue.put((func, using, future))
+        try:
+            return future.result(timeout=self.timeout)
+        except concurrent.futures.TimeoutError:
+            if future.cancel():
+                raise TimeoutError(f"The group commit writer didn't get to this write in {self.timeout}s") from None
+        # It's in the transaction being committed now.
+        return future.result(timeout=self.timeout)
+
+    def _collect(self) -> list[Write]:
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch: list[Write] = []
+            try:
+                # Skip the writes whose callers gave up; the rest can't be cancelled from now on.
+                batch = [write for write in self._collect() if write[2].set_running_or_notify_cancel()]
+                by_database: dict[str, list[Write]] = {}
+                for write in batch:
+                    by_database.setdefault(write[1], []).append(write)
+                for using, writes in by_database.items():
+                    metrics.group_commit_batch_size.observe(len(writes))
+                    self._commit(using, writes)
+            except Exception as e:
+                # Fail this batch's callers, not every later one's: the writer thread lives on.
+                logger.exception("Group commit of %d write(s) failed", len(batch))
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _commit(self, using: str, batch: list[Write]) -> None:
+        results: list[tuple[concurrent.futures.Future[Any], Any, BaseException | None]] = []
+        try:
+            with transaction.atomic(using=using):
+                for func, _, future in batch:
+                    try:
+                        with transaction.atomic(using=using):
+                            results.append((future, func(), None))
+                    except Exception as e:
+                        results.append((future, None, e))
+        except Exception as e:
+            logger.exception("Group commit of %d write(s) to %s failed", len(batch), using)
+            # The writer otherwise keeps its connection for good; start the next batch afresh.
+            connections[using].close()
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+
+        for future, result, error in results:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+
+_writer: GroupCommitWriter | None = None
+_writer_lock = threading.Lock()
+
+
+def writer() -> GroupCommitWriter:
+    """This process's writer, started on first use."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = GroupCommitWriter(
+                window=settings.GROUP_COMMIT_WINDOW_SECONDS,
+                max_batch=settings.GROUP_COMMIT_MAX_BATCH,
+                timeout=settings.GROUP_COMMIT_TIMEOUT_SECONDS,
+            )
+        return _writer
+
+
+def run(func: Callable[[], T], *, using: str = DEFAULT_DB_ALIAS) -> T:
+    """Call ``func``, through the group commit writer if GROUP_COMMIT_ENABLED is on."""
+    if not settings.GROUP_COMMIT_ENABLED:
+        return func()
+    return writer().submit(func, using=using)
@@ -0,0 +1,93 @@
+"""Management command to run the benchmark suite and compare it against a baseline."""
+
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import (
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+
+from django_chess.benchmarks import runner
+
+
+class Command(BaseCommand):
+    help = "Time the request hot paths; fail if any got slower than the committed baseline"
+
+    def add_arguments(self, parser) -> None:  # type: ignore[no-untyped-def]
+        parser.add_argument(
+            '--filter',
+            default='',
+            help='Only run benchmarks whose name contains this string',
+        )
+        parser.add_argument(
+            '--min-time',
+            type=float,
+            default=0.2,
+            help='Seconds to spend timing each benchmark (default: 0.2)',
+        )
+        parser.add_argument(
+            '--output',
+            type=Path,
+            help='Write the results as JSON to this file',
+        )
+        parser.add_argument(
+            '--baseline',
+            type=Path,
+            default=runner.BASELINE,
+            help=f'Results to compare against (default: {runner.BASELINE})',
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.25,
+            help='Fail if a median is this fraction slower than the baseline (default: 0.25)',
+        )
+        parser.add_argument(
+            '--update-baseline',
+            action='store_true',
+            help='Overwrite the baseline with these results instead of comparing',
+        )
+
+    def handle(self, *args, **options) -> None:  # type: ignore[no-untyped-def]
+        # Imported here so that the cases register only when we're actually benchmarking.
+        from django_chess.benchmarks import suite  # noqa: F401
+
+        # Run against throwaway test databases, never the real ones, and with DEBUG off as in
+        # production (DEBUG records every query).
+        setup_test_environment(debug=False)
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            report = runner.run(
+                name_filter=options['filter'],
+                min_time=options['min_time'],
+                log=self.stdout.write,
+            )
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        if options['output']:
+            runner.save(report, options['output'])
+
+        if options['update_baseline']:
+            runner.save(report, options['baseline'])
+            self.stdout.write(self.style.SUCCESS(f"Wrote baseline {options['baseline']}"))
+            return
+
+        if not options['baseline'].exists():
+            self.stdout.write(self.style.WARNING(f"No baseline at {options['baseline']}"))
+            return
+
+        regressions, improvements = runner.compare(
+            report, runner.load(options['baseline']), threshold=options['threshold']
+        )
+        for line in improvements:
+            self.stdout.write(self.style.SUCCESS(f'Faster: {line}'))
+        for line in regressions:
+            self.stdout.write(self.style.ERROR(f'Slower: {line}'))
+
+        if regressions:
+            raise CommandError(f'{len(regressions)} benchmark(s) regressed')
@@ -0,0 +1,83 @@
+"""Management command to merge sampled request profiles into a flame graph."""
+
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from django_chess.app import profiling
+
+DEFAULT_FOCUS = ["django_chess.app.views", "django_chess.api.views", "django_chess.app.utils"]
+
+
+class Command(BaseCommand):
+    help = "Render the profiles written by ProfilingMiddleware as an SVG flame graph"
+
+    def add_arguments(self, parser) -> None:  # type: ignore[no-untyped-def]
+        parser.add_argument(
+            '--dir',
+            type=Path,
+            default=None,
+            help='Directory of .collapsed profiles (default: PROFILING_DIR)',
+        )
+        parser.add_argument(
+            '--match',
+            default='',
+            help='Only profiles whose file name contains this, e.g. a game id or "POST"',
+        )
+        parser.add_argument(
+            '--focus',
+            action='append',
+            default=None,
+            help=(
+                'Keep only stacks through this module, starting from its outermost frame; '
+                'may be repeated (default: the app and API views, and app.utils). '
+                'Pass "" to keep whole stacks'
+            ),
+        )
+        parser.add_argument(
+            '--output',
+            type=Path,
+            default=Path('flamegraph.svg'),
+            help='Where to write the graph; any suffix but .svg writes collapsed stacks instead '
+            '(default: flamegraph.svg)',
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=10,
+            help='Number of hottest functions to list (default: 10)',
+        )
+
+    def handle(self, *args, **options) -> None:  # type: ignore[no-untyped-def]
+        directory: Path = options['dir'] or Path(settings.PROFILING_DIR)
+        paths = sorted(p for p in directory.glob('*.collapsed') if options['match'] in p.name)
+        if not paths:
+            raise CommandError(f"No profiles matching {options['match']!r} in {directory}")
+
+        stacks = profiling.read_profiles(paths)
+        modules = [m for m in (options['focus'] or DEFAULT_FOCUS) if m]
+        if modules:
+            stacks = profiling.focus(stacks, modules)
+            if not stacks:
+                raise CommandError(f"No samples passed through {', '.join(modules)}")
+
+        output: Path = options['output']
+        if output.suffix == '.svg':
+            title = f"{len(paths)} profile(s) from {directory}"
+            if options['match']:
+                title += f" matching {options['match']!r}"
+            output.write_text(profiling.flamegraph_svg(stacks, title=title))
+        else:
+            output.write_text("".join(f"{stack} {count}\n" for stack, count in stacks.most_common()))
+
+        total = sum(stacks.values())
+        self.stdout.write(f"{total} samples from {len(paths)} profile(s) -> {output}")
+
+        # "Self" time: the samples in which each function was the innermost frame.
+        leaves: dict[str, int] = {}
+        for stack, count in stacks.items():
+            leaf = stack.rpartition(";")[2]
+            leaves[leaf] = leaves.get(leaf, 0) + count
+        for name, count in sorted(leaves.items(), key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f"{100 * count / total:6.1f}%  {name}")
@@ -0,0 +1,271 @@
+"""Management command to play many simultaneous games against the app and report capacity."""
+
+import asyncio
+import contextlib
+import json
+import os
+import shlex
+import socket
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.signals import got_request_exception
+from django.db import OperationalError, connections
+from django.test import override_settings
+from django.test.utils import (
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+
+from django_chess.app import fake_engine
+from django_chess.benchmarks import loadtest
+
+
+class Command(BaseCommand):
+    help = "Simulate concurrent players; report throughput, latency percentiles and lock errors"
+
+    def add_arguments(self, parser) -> None:  # type: ignore[no-untyped-def]
+        parser.add_argument(
+            '--players',
+            type=int,
+            default=10,
+            help='Number of simultaneous players (default: 10)',
+        )
+        parser.add_argument(
+            '--moves',
+            type=int,
+            default=20,
+            help='White moves each player makes, unless the game ends first (default: 20)',
+        )
+        parser.add_argument(
+            '--polls',
+            type=int,
+            default=1,
+            help='Polls of moves/?since= after each move (default: 1)',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=0.0,
+            help='Seconds between polls (default: 0)',
+        )
+        parser.add_argument(
+            '--think-time',
+            type=float,
+            default=0.0,
+            help='Seconds each player waits before moving (default: 0)',
+        )
+        parser.add_argument(
+            '--black-smartness',
+            type=int,
+            default=0,
+            help='black_smartness of the games created; 0 means black never asks the engine',
+        )
+        parser.add_argument(
+            '--fake-engine',
+            type=float,
+            metavar='THINK_TIME',
+            help='In-process only: play black with the fake UCI engine, thinking this many seconds',
+        )
+        parser.add_argument(
+            '--sqlite-profile',
+            choices=['tuned', 'stock'],
+            default='tuned',
+            help='In-process only: "stock" runs without SQLITE_PRAGMAS, the read connection and '
+                 'immediate transactions, for comparison (default: tuned)',
+        )
+        parser.add_argument(
+            '--group-commit',
+            action='store_true',
+            help='In-process only: save moves through the group commit writer (GROUP_COMMIT_ENABLED)',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Seed for the players\' move choices',
+        )
+        parser.add_argument(
+            '--url',
+            help='Load a running server at this base URL (e.g. http://localhost:8000) '
+                 'instead of the ASGI application in this process',
+        )
+        parser.add_argument(
+            '--serve-workers',
+            type=lambda value: [int(n) for n in value.split(',')],
+            metavar='N,N,...',
+            help='Start "manage.py serve" on a scratch database with each of these numbers of '
+                 'workers in turn (e.g. 1,2,4), load it, and compare throughput',
+        )
+        parser.add_argument(
+            '--output',
+            type=Path,
+            help='Write the summary as JSON to this file',
+        )
+
+    def handle(self, *args, **options) -> None:  # type: ignore[no-untyped-def]
+        player_options = {
+            'players': options['players'],
+            'seed': options['seed'],
+            'moves': options['moves'],
+            'polls': options['polls'],
+            'poll_interval': options['poll_interval'],
+            'think_time': options['think_time'],
+            'black_smartness': options['black_smartness'],
+        }
+
+        if options['serve_workers']:
+            summaries = {
+                workers: self.run_served(
+                    workers, player_options, fake_engine_think_time=options['fake_engine']
+                ).summary()
+                for workers in options['serve_workers']
+            }
+            self.report_scaling(summaries)
+            if options['output']:
+                options['output'].write_text(json.dumps({'workers': summaries}, indent=2) + "\n")
+            return
+
+        if options['url']:
+            recorder = asyncio.run(
+                loadtest.run(loadtest.HTTPTransport(options['url']), **player_options)
+            )
+        else:
+            recorder = self.run_in_process(
+                player_options,
+                fake_engine_think_time=options['fake_engine'],
+                stock_sqlite=options['sqlite_profile'] == 'stock',
+                group_commit=options['group_commit'],
+            )
+
+        summary = recorder.summary()
+        self.report(summary)
+
+        if options['output']:
+            options['output'].write_text(json.dumps(summary, indent=2) + "\n")
+
+    def run_in_process(
+        self,
+        player_options: dict[str, Any],
+        *,
+        fake_engine_think_time: float | None,
+        stock_sqlite: bool = False,
+        group_commit: bool = False,
+    ) -> loadtest.Recorder:
+        recorder = loadtest.Recorder()
+
+        def count_lock_errors(sender: Any, **kwargs: Any) -> None:
+            error = sys.exc_info()[1]
+            if isinstance(error, OperationalError) and "locked" in str(error):
+                recorder.note_db_locked()
+
+        settings_overrides: dict[str, Any] = {}
+        if fake_engine_think_time is not None:
+            settings_overrides['CHESS_ENGINE_COMMAND'] = fake_engine.command(think_time=fake_engine_think_time)
+        if stock_sqlite:
+            settings_overrides['SQLITE_PRAGMAS'] = {}
+            settings_overrides['DATABASE_READ_ALIAS'] = None
+        if group_commit:
+            settings_overrides['GROUP_COMMIT_ENABLED'] = True
+
+        with (
+            tempfile.TemporaryDirectory() as scratch,
+            override_settings(**settings_overrides),
+            contextlib.ExitStack() as restore,
+        ):
+            # Throwaway databases, never the real ones.  SQLite test databases default to
+            # in-memory, which would hide exactly the file locking we're here to measure.
+            for connection in connections.all():
+                test = connection.settings_dict.setdefault("TEST", {})
+                if connection.vendor == "sqlite" and not test.get("NAME") and not test.get("MIRROR"):
+                    test["NAME"] = str(Path(scratch) / f"loadtest-{connection.alias}.sqlite3")
+                if connection.vendor == "sqlite" and stock_sqlite:
+                    db_options = connection.settings_dict["OPTIONS"]
+                    restore.callback(db_options.update, dict(db_options))
+                    db_options.pop("transaction_mode", None)
+
+            setup_test_environment(debug=False)
+            old_config = setup_databases(verbosity=0, interactive=False)
+            got_request_exception.connect(count_lock_errors)
+            try:
+                from django_chess.asgi import application
+
+                asyncio.run(loadtest.run(loadtest.ASGITransport(application), recorder=recorder, **player_options))
+            finally:
+                got_request_exception.disconnect(count_lock_errors)
+                with contextlib.suppress(Exception):
+                    connections.close_all()
+                teardown_databases(old_config, verbosity=0)
+                teardown_test_environment()
+
+        return recorder
+
+    def run_served(
+        self, workers: int, player_options: dict[str, Any], *, fake_engine_think_time: float | None
+    ) -> loadtest.Recorder:
+        """Load "manage.py serve --workers ``workers``", serving a scratch database."""
+        manage = [sys.executable, str(settings.BASE_DIR / 'manage.py')]
+        with tempfile.TemporaryDirectory() as scratch:
+            env = dict(os.environ, SQLITE_DATA_DIR=scratch, METRICS_DIR=str(Path(scratch) / 'metrics'))
+            Path(env['METRICS_DIR']).mkdir()
+            if fake_engine_think_time is not None:
+                env['CHESS_ENGINE_COMMAND'] = shlex.join(fake_engine.command(think_time=fake_engine_think_time))
+            subprocess.run([*manage, 'migrate', '--noinput', '--verbosity', '0'], env=env, check=True)
+
+            with socket.socket() as s:
+                s.bind(('127.0.0.1', 0))
+                port = s.getsockname()[1]
+            server = subprocess.Popen(
+                [*manage, 'serve', '--workers', str(workers), '--port', str(port)],
+                env=env,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+            try:
+                assert server.stdout is not None
+                if not server.stdout.readline():  # "Serving on ...", once every worker is listening
+                    raise CommandError(f'"manage.py serve --workers {workers}" failed to start')
+                self.stdout.write(f'{workers} worker(s):')
+                recorder = asyncio.run(
+                    loadtest.run(loadtest.HTTPTransport(f'http://127.0.0.1:{port}'), **player_options)
+                )
+                self.report(recorder.summary())
+                return recorder
+            finally:
+                server.terminate()
+                server.wait()
+
+    def report_scaling(self, summaries: dict[int, dict[str, Any]]) -> None:
+        first = next(iter(summaries.values()))['requests_per_s']
+        self.stdout.write(f"{'workers':>7} {'requests/s':>10} {'speedup':>8}")
+        for workers, summary in summaries.items():
+            speedup = summary['requests_per_s'] / first if first else 0.0
+            self.stdout.write(f"{workers:>7} {summary['requests_per_s']:>10.1f} {speedup:>7.2f}x")
+        self.stdout.write(f'({os.cpu_count()} CPU(s) here)')
+
+    def report(self, summary: dict[str, Any]) -> None:
+        self.stdout.write(
+            f"{summary['games']} game(s), {summary['moves']} move(s), {summary['requests']} request(s) "
+            f"in {summary['elapsed_s']:.2f}s: {summary['requests_per_s']:.1f} requests/s"
+        )
+        self.stdout.write(f"{'endpoint':<40} {'requests':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+        for endpoint, stats in summary['endpoints'].items():
+            self.stdout.write(
+                f"{endpoint:<40} {stats['requests']:>8} {stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} "
+                f"{stats['p99_ms']:>9.1f} {stats['max_ms']:>9.1f}"
+            )
+
+        for error, count in summary['errors'].items():
+            self.stdout.write(self.style.ERROR(f'{count} x {error}'))
+
+        if summary['db_locked']:
+            self.stdout.write(self.style.ERROR(f"{summary['db_locked']} 'database is locked' error(s)"))
+        else:
+            self.stdout.write(self.style.SUCCESS("No 'database is locked' errors"))
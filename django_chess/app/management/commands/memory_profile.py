@@ -0,0 +1,118 @@
+"""Management command to report memory allocated by the request hot paths and held by caches."""
+
+import json
+from pathlib import Path
+from typing import Any
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import (
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+
+from django_chess.app.utils import board_cache
+from django_chess.benchmarks import memory
+
+
+def _kib(size: int) -> str:
+    return f"{size / 1024:,.1f} KiB"
+
+
+class Command(BaseCommand):
+    help = "Measure allocations per call site with tracemalloc, and the sizes of boards and cache entries"
+
+    def add_arguments(self, parser) -> None:  # type: ignore[no-untyped-def]
+        parser.add_argument(
+            '--games',
+            type=int,
+            default=20,
+            help='Games each workload loads, renders, serializes or imports (default: 20)',
+        )
+        parser.add_argument(
+            '--workload',
+            action='append',
+            choices=sorted(memory.WORKLOADS),
+            help='Only run this workload; may be repeated (default: all of them)',
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=10,
+            help='Call sites to list per workload (default: 10)',
+        )
+        parser.add_argument(
+            '--frames',
+            type=int,
+            default=1,
+            help='Stack frames to record per allocation; more than 1 groups by whole traceback (default: 1)',
+        )
+        parser.add_argument(
+            '--output',
+            type=Path,
+            help='Write the results as JSON to this file',
+        )
+
+    def handle(self, *args, **options) -> None:  # type: ignore[no-untyped-def]
+        if options['games'] < 1:
+            raise CommandError("--games must be at least 1")
+
+        group_by = "traceback" if options['frames'] > 1 else "lineno"
+
+        # As with "manage.py benchmark": throwaway test databases, and DEBUG off, since DEBUG
+        # keeps every query and would show up here as a leak.
+        setup_test_environment(debug=False)
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            sizes = memory.board_sizes()
+            workloads: dict[str, dict[str, Any]] = {}
+            for name in options['workload'] or memory.WORKLOADS:
+                board_cache.clear()
+                func = memory.WORKLOADS[name](options['games'])
+                func()  # warm up imports, template loading and the like
+                workloads[name] = memory.measure(
+                    func, frames=options['frames'], group_by=group_by, limit=options['top']
+                )
+                workloads[name]["board_cache"] = memory.cache_footprint()
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        self._print_sizes(sizes)
+        for name, result in workloads.items():
+            self._print_workload(name, result, games=options['games'])
+
+        if options['output']:
+            report = {"sizes": sizes, "workloads": workloads}
+            options['output'].write_text(json.dumps(report, indent=2) + "\n")
+
+    def _print_sizes(self, sizes: list[dict[str, Any]]) -> None:
+        self.stdout.write("Object sizes (deep, bytes):")
+        self.stdout.write(f"  {'plies':>5}  {'board':>9}  {'annotated':>9}  {'cache entry':>11}  {'per ply':>7}")
+        for row in sizes:
+            self.stdout.write(
+                f"  {row['plies']:>5}  {row['board']:>9,}  {row['annotated_board']:>9,}"
+                f"  {row['cache_entry']:>11,}  {row['bytes_per_ply']:>7,}"
+            )
+        largest = max(row['cache_entry'] for row in sizes)
+        if not settings.BOARD_CACHE_SIZE:
+            self.stdout.write(f"  The board cache is off; each entry would hold up to {_kib(largest)}")
+            return
+        self.stdout.write(
+            f"  A full board cache (BOARD_CACHE_SIZE={settings.BOARD_CACHE_SIZE}) of the longest games:"
+            f" {_kib(largest * settings.BOARD_CACHE_SIZE)}"
+        )
+
+    def _print_workload(self, name: str, result: dict[str, Any], *, games: int) -> None:
+        self.stdout.write("")
+        self.stdout.write(self.style.MIGRATE_HEADING(f"{name} x {games} game(s)"))
+        self.stdout.write(
+            f"  peak {_kib(result['peak_bytes'])}, still held afterwards {_kib(result['retained_bytes'])}"
+        )
+        cache = result['board_cache']
+        self.stdout.write(f"  board cache: {cache['entries']} entries, {_kib(cache['bytes'])}")
+
+        for site in result['top_retained']:
+            self.stdout.write(f"  {_kib(site['bytes']):>14}  {site['blocks']:>7,} blocks  {site['site']}")
@@ -0,0 +1,16 @@
+"""Management command to write the SVG sprite of chess pieces that the board draws from."""
+
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from django_chess.app.utils import PIECE_SPRITE, piece_sprite
+
+
+class Command(BaseCommand):
+    help = "Write the pieces' SVG sprite, from python-chess's drawings, into the app's static files"
+
+    def handle(self, *args, **options) -> None:  # type: ignore[no-untyped-def]
+        path = Path(__file__).resolve().parents[2] / 'static' / PIECE_SPRITE
+        path.write_text(piece_sprite())
+        self.stdout.write(self.style.SUCCESS(f'Wrote {path}'))
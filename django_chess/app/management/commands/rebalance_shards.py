@@ -0,0 +1,82 @@
+"""Management command to move games onto the shards that GAME_SHARDS now assigns them to."""
+
+import collections
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from django_chess.app import sharding
+from django_chess.app.models import Game
+
+
+class Command(BaseCommand):
+    help = "Create any missing game shards, then move every game to the shard its UUID maps to"
+
+    def add_arguments(self, parser) -> None:  # type: ignore[no-untyped-def]
+        parser.add_argument(
+            '--from-count',
+            type=int,
+            default=settings.GAME_SHARD_COUNT,
+            help='GAME_SHARD_COUNT before the change, if it went down: games on the shards '
+                 'beyond the current count are moved off them too',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Games moved per transaction (default: 500)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Count the games that would move, without moving them',
+        )
+
+    def handle(self, *args, **options) -> None:  # type: ignore[no-untyped-def]
+        # Run with the server stopped: a game written mid-move could be copied stale.
+        if not options['dry_run']:
+            for alias in settings.GAME_SHARDS:
+                call_command('migrate', database=alias, interactive=False, verbosity=0)
+
+        sources = list(settings.GAME_SHARDS)
+        for n in range(settings.GAME_SHARD_COUNT, options['from_count']):
+            alias = f'games{n}'
+            path = settings.SQLITE_DATA_DIR / f'{alias}.sqlite3'
+            if path.exists():
+                connections.settings[alias] = dict(connections.settings[DEFAULT_DB_ALIAS], NAME=path)
+                sources.append(alias)
+
+        moved: collections.Counter[tuple[str, str]] = collections.Counter()
+        for source in sources:
+            misplaced = [
+                game_id
+                for game_id in Game.objects.using(source).values_list('pk', flat=True)
+                if sharding.shard_for(game_id) != source
+            ]
+
+            for start in range(0, len(misplaced), options['batch_size']):
+                by_target = collections.defaultdict(list)
+                for game in Game.objects.using(source).filter(pk__in=misplaced[start:start + options['batch_size']]):
+                    game.update_modified = False  # keep "modified" as it was; see TimeStampedModel
+                    by_target[sharding.shard_for(game.pk)].append(game)
+
+                for target, games in by_target.items():
+                    moved[(source, target)] += len(games)
+                    if options['dry_run']:
+                        continue
+
+                    # Copy, then delete: if we're interrupted in between, running again redoes
+                    # the copy over the top of the first one.
+                    ids = [game.pk for game in games]
+                    with transaction.atomic(using=target):
+                        Game.objects.using(target).filter(pk__in=ids).delete()
+                        Game.objects.using(target).bulk_create(games)
+                    with transaction.atomic(using=source):
+                        Game.objects.using(source).filter(pk__in=ids).delete()
+
+        verb = 'Would move' if options['dry_run'] else 'Moved'
+        for (source, target), count in sorted(moved.items()):
+            self.stdout.write(f'{verb} {count} game(s) from {source} to {target}')
+        self.stdout.write(self.style.SUCCESS(f'{verb} {sum(moved.values())} game(s) in all.'))
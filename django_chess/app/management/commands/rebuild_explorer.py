@@ -0,0 +1,56 @@
+"""Management command to rebuild the opening explorer from every finished game."""
+
+import json
+
+import chess
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from django_chess.app import sharding
+from django_chess.app.explorer import record_games
+from django_chess.app.models import Game, PositionMove
+
+
+class Command(BaseCommand):
+    help = "Recompute the opening explorer's PositionMove table from all finished games"
+
+    def add_arguments(self, parser) -> None:  # type: ignore[no-untyped-def]
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of games folded into each upsert (default: 500)',
+        )
+
+    def handle(self, *args, **options) -> None:  # type: ignore[no-untyped-def]
+        batch_size = options['batch_size']
+        games_query = Game.objects.filter(in_progress=False).only('id', 'moves')
+
+        with sharding.atomic(*settings.GAME_SHARDS):
+            PositionMove.objects.all().delete()
+            for shard in sharding.each_shard(Game.objects.all()):
+                shard.update(in_explorer=False)
+
+            batch = []
+            count = 0
+            games = (game for shard in sharding.each_shard(games_query) for game in shard.iterator(chunk_size=batch_size))
+            for game in games:
+                ucis = json.loads(game.moves) if game.moves is not None else []
+                board = chess.Board()
+                for uci in ucis:
+                    board.push(chess.Move.from_uci(uci))
+                batch.append((ucis, board.result()))
+
+                if len(batch) >= batch_size:
+                    record_games(batch)
+                    count += len(batch)
+                    batch = []
+
+            record_games(batch)
+            count += len(batch)
+
+            for shard in sharding.each_shard(Game.objects.filter(in_progress=False)):
+                shard.update(in_explorer=True)
+
+        self.stdout.write(self.style.SUCCESS(f'Recorded {count} game(s) in the opening explorer.'))
@@ -0,0 +1,63 @@
+"""Management command to serve the app from several daphne worker processes."""
+
+import argparse
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from django_chess.app import serving
+
+
+class Command(BaseCommand):
+    help = "Serve the ASGI app from several daphne processes sharing one socket; SIGHUP restarts them one by one"
+
+    def add_arguments(self, parser) -> None:  # type: ignore[no-untyped-def]
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.SERVER_WORKERS,
+            help='Worker processes (default: SERVER_WORKERS)',
+        )
+        parser.add_argument(
+            '--bind',
+            default='127.0.0.1',
+            help='IPv4 address to listen on (default: 127.0.0.1)',
+        )
+        parser.add_argument(
+            '--port',
+            type=int,
+            default=8000,
+            help='Port to listen on (default: 8000)',
+        )
+        parser.add_argument(
+            '--proxy-headers',
+            action='store_true',
+            help='Trust X-Forwarded-For, -Port and -Proto, as daphne --proxy-headers does',
+        )
+        # How the supervisor starts each worker.
+        parser.add_argument('--worker-fd', type=int, help=argparse.SUPPRESS)
+        parser.add_argument('--ready-fd', type=int, help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options) -> None:  # type: ignore[no-untyped-def]
+        if options['worker_fd'] is not None:
+            serving.run_worker(
+                fd=options['worker_fd'], ready_fd=options['ready_fd'], proxy_headers=options['proxy_headers']
+            )
+            return
+
+        def ready() -> None:
+            self.stdout.write(
+                f"Serving on {options['bind']}:{options['port']} with {options['workers']} worker(s)"
+            )
+            self.stdout.flush()
+
+        supervisor = serving.Supervisor(
+            workers=options['workers'],
+            host=options['bind'],
+            port=options['port'],
+            proxy_headers=options['proxy_headers'],
+        )
+        try:
+            supervisor.run(on_ready=ready)
+        except serving.WorkerStartupError as e:
+            raise CommandError(str(e)) from e
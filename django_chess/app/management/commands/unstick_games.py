@@ -1,9 +1,16 @@
 """Management command to unstick games where AI hasn't moved."""
 
+import concurrent.futures
+import os
+import time
+
+import chess
+
 from django.core.management.base import BaseCommand
-from django_chess.app.models import Game
+from django_chess.app import sharding
+from django_chess.app.engine import get_black_move
+from django_chess.app.models import Game, StaleGameError
 from django_chess.app.utils import load_board, save_board
-from django_chess.api.views import get_black_move
 
 
 class Command(BaseCommand):
@@ -20,19 +27,27 @@ class Command(BaseCommand):
             action='store_true',
             help='Show what would be done without making changes',
         )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=min(4, os.cpu_count() or 1),
+            help='Maximum number of engine replies computed concurrently',
+        )
+        parser.add_argument(
+            '--time-budget',
+            type=float,
+            default=None,
+            help='Stop after this many seconds; unfinished games stay flagged for a later sweep',
+        )
 
     def handle(self, *args, **options) -> None:  # type: ignore[no-untyped-def]
-        # Find games where it's black's turn
-        games_query = Game.objects.filter(in_progress=True)
+        # Games waiting on black are flagged by save_board, so this is a single indexed query.
+        games_query = Game.objects.filter(in_progress=True, awaiting_ai=True)
 
         if options['game_id']:
             games_query = games_query.filter(id=options['game_id'])
 
-        stuck_games = []
-        for game in games_query:
-            board = load_board(game=game)
-            if not board.turn:  # False means black's turn
-                stuck_games.append(game)
+        stuck_games = sharding.fan_out(games_query)
 
         if not stuck_games:
             self.stdout.write(self.style.SUCCESS('No stuck games found.'))
@@ -40,28 +55,77 @@ class Command(BaseCommand):
 
         self.stdout.write(f'Found {len(stuck_games)} stuck game(s):')
 
-        for game in stuck_games:
-            self.stdout.write(f'  - {game.name} ({game.id})')
+        if options['dry_run']:
+            for game in stuck_games:
+                self.stdout.write(f'  - {game.name} ({game.id})')
+            self.stdout.write(
+                self.style.WARNING('Dry run complete - no changes made.')
+            )
+            return
 
-            if options['dry_run']:
-                continue
+        deadline = None
+        if options['time_budget'] is not None:
+            deadline = time.monotonic() + options['time_budget']
 
-            # Load board and make AI move
-            board = load_board(game=game)
-            black_move = get_black_move(board, game.black_smartness)
+        workers = max(1, options['workers'])
+        pending = iter(stuck_games)
+        in_flight: dict[concurrent.futures.Future[chess.Move | None], tuple[Game, chess.Board]] = {}
+        processed = 0
 
-            if black_move:
-                game.promoting_push(board, black_move)
-                save_board(board=board, game=game)
-                self.stdout.write(
-                    self.style.SUCCESS(f'    Made move: {black_move.uci()}')
-                )
-            else:
-                self.stdout.write(
-                    self.style.ERROR(f'    No legal moves available!')
+        # The engine work runs in the pool; every database read and write stays on this thread.
+        pool = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+        try:
+            while deadline is None or time.monotonic() < deadline:
+                while len(in_flight) < workers and (queued := next(pending, None)) is not None:
+                    board = load_board(game=queued, annotate=False)
+                    future = pool.submit(get_black_move, board.copy(), queued.black_smartness)
+                    in_flight[future] = (queued, board)
+
+                if not in_flight:
+                    break
+
+                timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+                done, _ = concurrent.futures.wait(
+                    in_flight, timeout=timeout, return_when=concurrent.futures.FIRST_COMPLETED
                 )
 
-        if options['dry_run']:
+                if not done:
+                    break
+
+                for future in done:
+                    game, board = in_flight.pop(future)
+                    processed += 1
+                    self.stdout.write(f'  - {game.name} ({game.id})')
+
+                    black_move = future.result()
+                    if black_move:
+                        game.promoting_push(board, black_move)
+                        try:
+                            save_board(board=board, game=game)
+                        except StaleGameError:
+                            # Somebody moved while the engine was thinking; if the game
+                            # still needs black's reply, the next run will pick it up.
+                            self.stdout.write(
+                                self.style.WARNING('    Game moved on meanwhile; skipped')
+                            )
+                            continue
+                        self.stdout.write(
+                            self.style.SUCCESS(f'    Made move: {black_move.uci()}')
+                        )
+                    else:
+                        self.stdout.write(
+                            self.style.ERROR('    No legal moves available!')
+                        )
+
+        finally:
+            # Out of time: don't wait for the engine calls still running, only to drop their
+            # moves.  Their threads finish by themselves, within the engine's timeout.
+            pool.shutdown(wait=not in_flight, cancel_futures=True)
+
+        if left := len(stuck_games) - processed:
             self.stdout.write(
-                self.style.WARNING('Dry run complete - no changes made.')
+                self.style.WARNING(
+                    f'Time budget exhausted; {left} game(s) left awaiting an AI move, for the'
+                    ' recovery sweeper or a later run.'
+                )
             )
@@ -0,0 +1,353 @@
+"""
+Prometheus metrics, served in the text exposition format at /metrics.
+
+With several daphne processes behind one port, a scrape lands on just one of them, so counts
+kept in that process alone would be a fraction of the truth.  When METRICS_DIR is set, each
+process instead keeps its samples in its own memory-mapped file there -- an append-only table
+of (key, float64) entries, so an observation is a dict lookup and a struct write -- and
+``exposition()`` sums the files of every process.  Gauges only count processes that are still
+alive; counters and histograms from exited processes keep counting, so they never go
+backwards.  Clear the directory when the server starts (start-daphne.sh does).
+
+Without METRICS_DIR the samples live in this process's memory, which is fine for runserver
+and tests.
+"""
+import bisect
+import contextlib
+import json
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from django.conf import settings
+
+# (metric name, label pairs in labelnames order, sample suffix), e.g.
+# ("django_chess_load_board_seconds", (("annotated", "true"),), "bucket:3")
+Key = tuple[str, tuple[tuple[str, str], ...], str]
+
+
+class _MemoryStore:
+    def __init__(self) -> None:
+        self.values: dict[Key, float] = {}
+
+    def add(self, key: Key, amount: float) -> None:
+        self.values[key] = self.values.get(key, 0.0) + amount
+
+    def close(self) -> None:
+        pass
+
+
+class _FileStore:
+    """This process's samples, in ``<METRICS_DIR>/<pid>.metrics``."""
+
+    INITIAL_SIZE = 1 << 16
+    HEADER = struct.Struct("<I4x")  # bytes in use, including this header
+    LENGTH = struct.Struct("<I")
+    VALUE = struct.Struct("<d")
+
+    def __init__(self, path: Path) -> None:
+        self.file = path.open("w+b")
+        self.file.truncate(self.INITIAL_SIZE)
+        self.map = mmap.mmap(self.file.fileno(), self.INITIAL_SIZE)
+        self.used = self.HEADER.size
+        self.HEADER.pack_into(self.map, 0, self.used)
+        self.offsets: dict[Key, int] = {}
+
+    def _append(self, key: Key) -> int:
+        encoded = json.dumps(key).encode()
+        padding = -(self.LENGTH.size + len(encoded)) % 8
+        value_offset = self.used + self.LENGTH.size + len(encoded) + padding
+        end = value_offset + self.VALUE.size
+
+        if end > len(self.map):
+            size = len(self.map)
+            while size < end:
+                size *= 2
+            self.map.close()
+            self.file.truncate(size)
+            self.map = mmap.mmap(self.file.fileno(), size)
+
+        self.LENGTH.pack_into(self.map, self.used, len(encoded))
+        self.map[self.used + self.LENGTH.size:self.used + self.LENGTH.size + len(encoded)] = encoded
+        self.VALUE.pack_into(self.map, value_offset, 0.0)
+        # Publish the entry only once it's complete, so a reader never sees half of one.
+        self.used = end
+        self.HEADER.pack_into(self.map, 0, self.used)
+
+        self.offsets[key] = value_offset
+        return value_offset
+
+    def add(self, key: Key, amount: float) -> None:
+        offset = self.offsets.get(key)
+        if offset is None:
+            offset = self._append(key)
+        (value,) = self.VALUE.unpack_from(self.map, offset)
+        self.VALUE.pack_into(self.map, offset, value + amount)
+
+    def close(self) -> None:
+        self.map.close()
+        self.file.close()
+
+    @classmethod
+    def read(cls, path: Path) -> Iterator[tuple[Key, float]]:
+        data = path.read_bytes()
+        if len(data) < cls.HEADER.size:
+            return
+
+        (used,) = cls.HEADER.unpack_from(data, 0)
+        offset = cls.HEADER.size
+        while offset < used:
+            (length,) = cls.LENGTH.unpack_from(data, offset)
+            offset += cls.LENGTH.size
+            name, labels, suffix = json.loads(data[offset:offset + length])
+            offset += length + (-(cls.LENGTH.size + length) % 8)
+            (value,) = cls.VALUE.unpack_from(data, offset)
+            offset += cls.VALUE.size
+            yield (name, tuple((k, v) for k, v in labels), suffix), value
+
+
+class Registry:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.metrics: list[Metric] = []
+        self._store: _MemoryStore | _FileStore | None = None
+        self._store_pid = 0
+        self._store_dir: str | None = None
+
+    def store(self) -> _MemoryStore | _FileStore:
+        """This process's store; call with ``lock`` held.  Reopened after a fork."""
+        directory = settings.METRICS_DIR
+        if self._store is None or self._store_pid != os.getpid() or self._store_dir != directory:
+            if self._store is not None and self._store_pid == os.getpid():
+                self._store.close()
+            if directory:
+                Path(directory).mkdir(parents=True, exist_ok=True)
+                self._store = _FileStore(Path(directory) / f"{os.getpid()}.metrics")
+            else:
+                self._store = _MemoryStore()
+            self._store_pid = os.getpid()
+            self._store_dir = directory
+        return self._store
+
+    def add(self, key: Key, amount: float) -> None:
+        with self.lock:
+            self.store().add(key, amount)
+
+    def samples(self) -> dict[Key, float]:
+        """Every process's samples, summed; gauges only from live processes."""
+        gauges = {metric.name for metric in self.metrics if metric.kind == "gauge"}
+
+        with self.lock:
+            store = self.store()
+            if isinstance(store, _MemoryStore):
+                return dict(store.values)
+            directory = Path(self._store_dir or "")
+
+        totals: dict[Key, float] = {}
+        for path in directory.glob("*.metrics"):
+            alive = _alive(int(path.stem)) if path.stem.isdigit() else False
+            for key, value in _FileStore.read(path):
+                if key[0] in gauges and not alive:
+                    continue
+                totals[key] = totals.get(key, 0.0) + value
+        return totals
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+REGISTRY = Registry()
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        REGISTRY.metrics.append(self)
+
+    def _labels(self, labels: dict[str, object]) -> tuple[tuple[str, str], ...]:
+        assert set(labels) == set(self.labelnames), f"{self.name} takes labels {self.labelnames}"
+        return tuple((name, str(labels[name])) for name in self.labelnames)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, /, **labels: object) -> None:
+        REGISTRY.add((self.name, self._labels(labels), ""), amount)
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def inc(self, amount: float = 1.0, /, **labels: object) -> None:
+        REGISTRY.add((self.name, self._labels(labels), ""), amount)
+
+    def dec(self, amount: float = 1.0, /, **labels: object) -> None:
+        self.inc(-amount, **labels)
+
+    @contextlib.contextmanager
+    def track(self, **labels: object) -> Iterator[None]:
+        """Count the block as in progress while it runs."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Iterable[str] = (), *, buckets: Iterable[float]
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = sorted(buckets)
+
+    def observe(self, value: float, **labels: object) -> None:
+        label_pairs = self._labels(labels)
+        index = bisect.bisect_left(self.buckets, value)  # len(buckets) means +Inf
+        with REGISTRY.lock:
+            store = REGISTRY.store()
+            store.add((self.name, label_pairs, f"bucket:{index}"), 1)
+            store.add((self.name, label_pairs, "sum"), value)
+            store.add((self.name, label_pairs, "count"), 1)
+
+    @contextlib.contextmanager
+    def time(self, **labels: object) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(pairs: Iterable[tuple[str, str]]) -> str:
+    formatted = [f'{name}="{_escape(value)}"' for name, value in pairs]
+    return "{" + ",".join(formatted) + "}" if formatted else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def exposition() -> str:
+    """All registered metrics in the Prometheus text format (version 0.0.4)."""
+    samples = REGISTRY.samples()
+    by_metric: dict[str, dict[tuple[tuple[str, str], ...], dict[str, float]]] = {}
+    for (name, labels, suffix), value in samples.items():
+        by_metric.setdefault(name, {}).setdefault(labels, {})[suffix] = value
+
+    lines = []
+    for metric in REGISTRY.metrics:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+
+        for labels, values in sorted(by_metric.get(metric.name, {}).items()):
+            if not isinstance(metric, Histogram):
+                lines.append(f"{metric.name}{_format_labels(labels)} {_format_value(values[''])}")
+                continue
+
+            cumulative = 0.0
+            for index, bound in enumerate([*metric.buckets, math.inf]):
+                cumulative += values.get(f"bucket:{index}", 0.0)
+                le = _format_value(bound) if math.isinf(bound) else repr(float(bound))
+                lines.append(
+                    f"{metric.name}_bucket{_format_labels([*labels, ('le', le)])} {_format_value(cumulative)}"
+                )
+            lines.append(f"{metric.name}_sum{_format_labels(labels)} {_format_value(values.get('sum', 0.0))}")
+            lines.append(f"{metric.name}_count{_format_labels(labels)} {_format_value(values.get('count', 0.0))}")
+
+    return "\n".join(lines) + "\n"
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+request_seconds = Histogram(
+    "django_chess_request_duration_seconds",
+    "Time to produce a response, by route and method.",
+    ["route", "method"],
+    buckets=LATENCY_BUCKETS,
+)
+requests_total = Counter(
+    "django_chess_requests_total",
+    "Responses sent, by route, method and status code.",
+    ["route", "method", "status"],
+)
+engine_spawn_seconds = Histogram(
+    "django_chess_engine_spawn_seconds",
+    "Time to start the UCI engine and finish its handshake, by black_smartness.",
+    ["smartness"],
+    buckets=LATENCY_BUCKETS,
+)
+engine_think_seconds = Histogram(
+    "django_chess_engine_think_seconds",
+    "Time the UCI engine took to choose a move, by black_smartness.",
+    ["smartness"],
+    buckets=LATENCY_BUCKETS,
+)
+engines_in_flight = Gauge(
+    "django_chess_engines_in_flight",
+    "UCI engine processes currently running.",
+)
+load_board_seconds = Histogram(
+    "django_chess_load_board_seconds",
+    "Time spent in load_board, by whether SAN annotations were wanted.",
+    ["annotated"],
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1),
+)
+load_board_plies = Histogram(
+    "django_chess_load_board_plies",
+    "Length, in plies, of the games load_board was asked for.",
+    buckets=(10, 20, 40, 80, 120, 160, 240, 320, 480),
+)
+pgn_import_games = Counter(
+    "django_chess_pgn_import_games_total",
+    "Games read by the PGN importer.",
+)
+pgn_import_plies = Counter(
+    "django_chess_pgn_import_plies_total",
+    "Plies read by the PGN importer.",
+)
+pgn_import_seconds = Histogram(
+    "django_chess_pgn_import_seconds",
+    "Time to import one uploaded PGN file.",
+    buckets=LATENCY_BUCKETS,
+)
+query_budget_violations = Counter(
+    "django_chess_query_budget_violations_total",
+    "Requests whose view ran more queries or touched more rows than its budget, by route.",
+    ["route"],
+)
+cache_requests = Counter(
+    "django_chess_cache_requests_total",
+    "Cache lookups, by cache and result (hit or miss).",
+    ["cache", "result"],
+)
+group_commit_batch_size = Histogram(
+    "django_chess_group_commit_batch_size",
+    "Writes committed together by the group commit writer, per transaction.",
+    buckets=(1, 2, 4, 8, 16, 32, 64),
+)
@@ -1,9 +1,23 @@
 """Custom middleware for the chess application."""
+import contextlib
+import logging
+import random
+import threading
+import time
+from pathlib import Path
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.handlers.exception import convert_exception_to_response
+from django.db import connections
 from django.http import HttpRequest, HttpResponse
-from typing import Callable
+from django.utils.module_loading import import_string
+from typing import Any, Callable, cast
 
+from django_chess.app import budgets, metrics, profiling, timing
 from django_chess.app.version import API_VERSION
 
+logger = logging.getLogger(__name__)
+
 
 class APIVersionMiddleware:
     """
@@ -23,3 +37,191 @@ class APIVersionMiddleware:
         response["X-Chess-API-Version"] = str(API_VERSION)
 
         return response
+
+
+def _time_query(execute: Callable[..., Any], sql: str, params: Any, many: bool, context: dict[str, Any]) -> Any:
+    with timing.timed("db"):
+        return execute(sql, params, many, context)
+
+
+class ServerTimingMiddleware:
+    """
+    Middleware that adds a Server-Timing header breaking the request's time down into
+    db, replay, render, serialize and engine spans (see timing.py), plus the total.
+
+    Removed from the stack entirely when SERVER_TIMING_ENABLED is off.
+    """
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]) -> None:
+        if not settings.SERVER_TIMING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        started = time.perf_counter()
+
+        with timing.collect() as timings, contextlib.ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(_time_query))
+            response = self.get_response(request)
+
+        response["Server-Timing"] = timings.header(total=time.perf_counter() - started)
+
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Middleware that records each request's latency and status for /metrics, labelled by the
+    URL pattern's name rather than the path, so that game IDs don't each get a series.
+    """
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]) -> None:
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        started = time.perf_counter()
+        response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        match = request.resolver_match
+        route = (match.view_name if match is not None else "") or "unmatched"
+        metrics.request_seconds.observe(elapsed, route=route, method=request.method)
+        metrics.requests_total.inc(route=route, method=request.method, status=response.status_code)
+
+        return response
+
+
+class PathScopedMiddleware:
+    """
+    Middleware that runs STATEFUL_MIDDLEWARE (sessions, CSRF, auth and so on) for every
+    request except those under STATELESS_PATH_PREFIXES, which skip them altogether.
+
+    Takes their place in MIDDLEWARE: builds their chain the way Django would, and passes on
+    their process_view, process_exception and process_template_response hooks.
+    """
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]) -> None:
+        self.get_response = get_response
+        self.prefixes = tuple(settings.STATELESS_PATH_PREFIXES)
+        self.view_hooks: list[Callable[..., HttpResponse | None]] = []
+        self.exception_hooks: list[Callable[..., HttpResponse | None]] = []
+        self.template_response_hooks: list[Callable[..., HttpResponse]] = []
+
+        handler = get_response
+        for name in reversed(settings.STATEFUL_MIDDLEWARE):
+            try:
+                middleware = import_string(name)(handler)
+            except MiddlewareNotUsed:
+                continue
+            if hasattr(middleware, "process_view"):
+                self.view_hooks.insert(0, middleware.process_view)
+            if hasattr(middleware, "process_exception"):
+                self.exception_hooks.append(middleware.process_exception)
+            if hasattr(middleware, "process_template_response"):
+                self.template_response_hooks.append(middleware.process_template_response)
+            # Sync all the way down: this middleware isn't async-capable.
+            handler = cast(Callable[[HttpRequest], HttpResponse], convert_exception_to_response(middleware))
+        self.stateful = handler
+
+    def stateless(self, request: HttpRequest) -> bool:
+        return request.path_info.startswith(self.prefixes)
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if self.stateless(request):
+            return self.get_response(request)
+        return self.stateful(request)
+
+    def process_view(
+        self, request: HttpRequest, view_func: Callable[..., Any], view_args: Any, view_kwargs: Any
+    ) -> HttpResponse | None:
+        if not self.stateless(request):
+            for hook in self.view_hooks:
+                if (response := hook(request, view_func, view_args, view_kwargs)) is not None:
+                    return response
+        return None
+
+    def process_exception(self, request: HttpRequest, exception: Exception) -> HttpResponse | None:
+        if not self.stateless(request):
+            for hook in self.exception_hooks:
+                if (response := hook(request, exception)) is not None:
+                    return response
+        return None
+
+    def process_template_response(self, request: HttpRequest, response: HttpResponse) -> HttpResponse:
+        if not self.stateless(request):
+            for hook in self.template_response_hooks:
+                response = hook(request, response)
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Middleware that runs the sampling profiler (see profiling.py) over a random
+    PROFILING_SAMPLE_RATE of requests, and over staff requests that send PROFILING_HEADER.
+    Those staff requests get the profile's file name back in an X-Profile-File header.
+
+    Must come after AuthenticationMiddleware; requests that skip it (see PathScopedMiddleware)
+    have no user, so they're only ever sampled.  Removed from the stack entirely when neither
+    trigger is configured.
+    """
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]) -> None:
+        if not settings.PROFILING_SAMPLE_RATE and not settings.PROFILING_HEADER:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        requested = (
+            bool(settings.PROFILING_HEADER)
+            and settings.PROFILING_HEADER in request.headers
+            and getattr(request, "user", None) is not None
+            and request.user.is_staff
+        )
+        if not requested and random.random() >= settings.PROFILING_SAMPLE_RATE:
+            return self.get_response(request)
+
+        sampler = profiling.Sampler(threading.get_ident(), interval=settings.PROFILING_INTERVAL_SECONDS)
+        sampler.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            stacks = sampler.stop()
+
+        path = profiling.write_profile(
+            stacks,
+            directory=Path(settings.PROFILING_DIR),
+            label=f"{request.method}{request.path}",
+            max_files=settings.PROFILING_MAX_FILES,
+        )
+        if requested:
+            response["X-Profile-File"] = path.name
+
+        return response
+
+
+class QueryBudgetMiddleware:
+    """
+    Middleware that compares each view's queries and rows against its budget (see budgets.py),
+    and logs the requests that go over.  Comes last, so that only the view's own work counts.
+
+    Removed from the stack entirely when QUERY_BUDGETS_ENABLED is off.
+    """
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]) -> None:
+        if not settings.QUERY_BUDGETS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        with budgets.track() as usage:
+            response = self.get_response(request)
+
+        budget = budgets.budget_for(request.resolver_match, request.method or "GET")
+        if budget is not None and (problems := usage.over(budget)):
+            match = request.resolver_match
+            route = (match.view_name if match is not None else "") or "unmatched"
+            metrics.query_budget_violations.inc(route=route)
+            logger.warning("%s %s ran %s", request.method, request.path, " and ".join(problems))
+
+        return response
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0011_alter_game_options'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='in_explorer',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='PositionMove',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('zobrist_hash', models.BigIntegerField()),
+                ('move', models.CharField(max_length=5)),
+                ('games', models.PositiveIntegerField(default=0)),
+                ('white_wins', models.PositiveIntegerField(default=0)),
+                ('draws', models.PositiveIntegerField(default=0)),
+                ('black_wins', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('zobrist_hash', 'move'), name='unique_position_move')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:01
+
+import json
+
+from django.apps.registry import Apps
+from django.db import migrations, models
+from django.db.backends.base.schema import BaseDatabaseSchemaEditor
+
+
+def flag_games_awaiting_ai(apps: Apps, schema_editor: BaseDatabaseSchemaEditor) -> None:
+    """Every game starts from the initial position, so an odd number of moves means black is to move."""
+    Game = apps.get_model('app', 'Game')
+    awaiting = [
+        game.pk
+        for game in Game.objects.filter(in_progress=True).only('id', 'moves').iterator()
+        if len(json.loads(game.moves or '[]')) % 2 == 1
+    ]
+    for start in range(0, len(awaiting), 500):
+        Game.objects.filter(pk__in=awaiting[start:start + 500]).update(awaiting_ai=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0012_game_in_explorer_positionmove'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='awaiting_ai',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+        migrations.RunPython(flag_games_awaiting_ai, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:06
+
+import json
+
+import chess
+from django.apps.registry import Apps
+from django.db import migrations, models
+from django.db.backends.base.schema import BaseDatabaseSchemaEditor
+
+
+def store_positions(apps: Apps, schema_editor: BaseDatabaseSchemaEditor) -> None:
+    """Replay every game once to fill in ply, fen, result and termination."""
+    Game = apps.get_model('app', 'Game')
+    batch = []
+
+    for game in Game.objects.exclude(moves=None).only('id', 'moves').iterator():
+        board = chess.Board()
+        for uci in json.loads(game.moves or '[]'):
+            board.push(chess.Move.from_uci(uci))
+
+        outcome = board.outcome()
+        game.ply = len(board.move_stack)
+        game.fen = board.fen()
+        game.result = board.result()
+        game.termination = outcome.termination.name if outcome is not None else ''
+        batch.append(game)
+
+        if len(batch) >= 500:
+            Game.objects.bulk_update(batch, ['ply', 'fen', 'result', 'termination'])
+            batch = []
+
+    Game.objects.bulk_update(batch, ['ply', 'fen', 'result', 'termination'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0013_game_awaiting_ai'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='fen',
+            field=models.CharField(default='rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='ply',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='result',
+            field=models.CharField(default='*', max_length=7),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='termination',
+            field=models.CharField(blank=True, max_length=30),
+        ),
+        migrations.RunPython(store_positions, migrations.RunPython.noop),
+    ]
@@ -1,15 +1,64 @@
+import json
 import uuid
+from typing import Any, Iterable
 
 import chess
 
 from django.db import models
+from django.utils import timezone
 from django_extensions.db.models import TimeStampedModel
+
+from django_chess.app import sharding
 from django_chess.name_generator import generate_game_name
 
 
+class StaleGameError(Exception):
+    """The game moved on (someone else saved a move) since we read it."""
+
+    def __init__(self, game_id: uuid.UUID, expected_ply: int) -> None:
+        super().__init__(f"Game {game_id} is no longer at ply {expected_ply}")
+        self.game_id = game_id
+        self.expected_ply = expected_ply
+
+
+class GameQuerySet(models.QuerySet["Game"]):
+    """Sends lookups by primary key, and new games, to the game's shard; see sharding.py."""
+
+    def filter(self, *args: Any, **kwargs: Any) -> "GameQuerySet":
+        clone = super().filter(*args, **kwargs)
+        if self._db is None:  # type: ignore[attr-defined]
+            for key in ("pk", "id", "pk__exact", "id__exact"):
+                if key in kwargs and (alias := sharding.shard_for_value(kwargs[key])) is not None:
+                    return clone.using(alias)
+        return clone
+
+    def create(self, **kwargs: Any) -> "Game":
+        if self._db is not None or not sharding.is_sharded():  # type: ignore[attr-defined]
+            return super().create(**kwargs)
+
+        # Without an instance, the router can't tell which shard; so choose the id here.
+        kwargs["id"] = kwargs.pop("pk", None) or kwargs.get("id") or uuid.uuid4()
+        return self.using(sharding.shard_for_value(kwargs["id"])).create(**kwargs)
+
+    def bulk_create(self, objs: Iterable["Game"], *args: Any, **kwargs: Any) -> list["Game"]:
+        if self._db is not None or not sharding.is_sharded():  # type: ignore[attr-defined]
+            return super().bulk_create(objs, *args, **kwargs)
+
+        objs = list(objs)
+        by_shard: dict[str, list[Game]] = {}
+        for obj in objs:
+            by_shard.setdefault(sharding.shard_for(obj.pk), []).append(obj)
+        for alias, shard_objs in by_shard.items():
+            self.using(alias).bulk_create(shard_objs, *args, **kwargs)
+        return objs
+
+
 class GameManager(models.Manager["Game"]):
     """Custom manager for Game model with shared query methods."""
 
+    def get_queryset(self) -> GameQuerySet:
+        return GameQuerySet(self.model, using=self._db)
+
     def ordered_queryset(self) -> models.QuerySet["Game"]:
         """Return games ordered by creation time (newest first), then by name."""
         return self.get_queryset().order_by('-created', 'name')
@@ -20,17 +69,62 @@ class Game(TimeStampedModel):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     name = models.CharField(max_length=100, blank=True)
     in_progress = models.BooleanField(default=True)
+    awaiting_ai = models.BooleanField(default=False, db_index=True)  # black to move, no reply yet
     moves = models.CharField(null=True) # JSON list of UCI strings
     black_smartness = models.PositiveSmallIntegerField(default=10)
+    # Derived from moves by record_position, so readers needn't replay the game
+    ply = models.PositiveIntegerField(default=0)
+    fen = models.CharField(max_length=100, default=chess.STARTING_FEN)
+    result = models.CharField(max_length=7, default="*")  # PGN result: 1-0, 0-1, 1/2-1/2 or *
+    termination = models.CharField(max_length=30, blank=True)  # chess.Termination name, if any
+    in_explorer = models.BooleanField(default=False)  # already counted in PositionMove
 
     def save(self, *args, **kwargs) -> None:  # type: ignore[no-untyped-def]
+        self.fill_in_name()
+        super().save(*args, **kwargs)  # type: ignore[no-untyped-call]
+
+    # What a move changes, and so what save_if_at writes.  Settings such as black_smartness
+    # are left alone, so that a change to them made while the engine thinks isn't undone.
+    MOVE_FIELDS = (
+        "name", "in_progress", "awaiting_ai", "moves", "ply", "fen", "result", "termination",
+        "in_explorer", "modified",
+    )
+
+    def save_if_at(self, ply: int) -> None:
+        """
+        Save the MOVE_FIELDS, but only if the stored game is still at ``ply`` -- that is, if
+        nobody else has saved a move since we read it.  Raises StaleGameError otherwise.
+
+        ``ply`` is the version: every move bumps it (there's no taking moves back), so one
+        conditional UPDATE is enough, and writers to different games never wait on each other.
+        """
+        self.fill_in_name()
+        self.modified = timezone.now()
+        fields = {name: getattr(self, name) for name in self.MOVE_FIELDS}
+        if not Game.objects.filter(pk=self.pk, ply=ply).update(**fields):
+            raise StaleGameError(self.pk, ply)
+
+    def fill_in_name(self) -> None:
         # Generate name from UUID on first save if not provided
         if not self.name:
             # Use UUID's integer representation as seed for deterministic names
             self.name = generate_game_name(seed=self.id.int)
-        super().save(*args, **kwargs)  # type: ignore[no-untyped-call]
+
+    def record_position(self, board: chess.Board) -> None:
+        """Store the board's moves, and the state derived from them, on this game (without saving)."""
+        outcome = board.outcome()
+
+        self.moves = json.dumps([m.uci() for m in board.move_stack])
+        self.ply = len(board.move_stack)
+        self.fen = board.fen()
+        self.result = board.result()
+        self.termination = outcome.termination.name if outcome is not None else ""
 
     def promoting_push(self, board: chess.Board, move: chess.Move) -> None:
+        """
+        Push ``move``, queening a pawn that reaches the last rank, and mark the game finished
+        if that ended it.  Doesn't save; callers save once, with save_board, when they're done.
+        """
         # unfortunately this is effectively a copy of some code in Board.is_pseudo_legal
         piece = board.piece_type_at(move.from_square)
 
@@ -43,4 +137,24 @@ class Game(TimeStampedModel):
 
         if board.outcome() is not None:
             self.in_progress = False
-            self.save()
+
+
+class PositionMove(models.Model):
+    """
+    How often a move was played from a position, and how those games ended.
+
+    This is the pre-aggregated table behind the opening explorer; positions are keyed by
+    their (signed) polyglot Zobrist hash, so lookups never need to touch Game.moves.
+    """
+
+    zobrist_hash = models.BigIntegerField()
+    move = models.CharField(max_length=5)  # UCI
+    games = models.PositiveIntegerField(default=0)
+    white_wins = models.PositiveIntegerField(default=0)
+    draws = models.PositiveIntegerField(default=0)
+    black_wins = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["zobrist_hash", "move"], name="unique_position_move"),
+        ]
@@ -0,0 +1,169 @@
+"""
+Opt-in sampling profiler for individual requests.
+
+``ProfilingMiddleware`` (in middleware.py) profiles a random PROFILING_SAMPLE_RATE of requests,
+plus any request from a staff user that carries the PROFILING_HEADER header.  While the view
+runs, a ``Sampler`` thread snapshots the request thread's stack every
+PROFILING_INTERVAL_SECONDS; nothing is traced, so the view runs at full speed apart from the
+sampler's share of the GIL.  Each profile is written to PROFILING_DIR in the collapsed-stack
+format ("outer;inner;leaf <samples>" per line), which speedscope and flamegraph.pl read
+directly, and only the newest PROFILING_MAX_FILES are kept.
+
+"manage.py flamegraph" merges the profiles into one SVG flame graph.
+"""
+import collections
+import datetime
+import os
+import re
+import sys
+import threading
+import zlib
+from pathlib import Path
+from types import FrameType
+
+
+def frame_name(frame: FrameType) -> str:
+    return f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_qualname}"
+
+
+def collapse(frame: FrameType | None) -> str:
+    """The stack ending at ``frame``, outermost first, joined with semicolons."""
+    names = []
+    while frame is not None:
+        names.append(frame_name(frame))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class Sampler(threading.Thread):
+    """Counts the stacks of one thread, sampled until ``stop()``."""
+
+    def __init__(self, thread_id: int, *, interval: float) -> None:
+        super().__init__(name=f"profiler-{thread_id}", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: collections.Counter[str] = collections.Counter()
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                break
+            self.stacks[collapse(frame)] += 1
+
+    def stop(self) -> collections.Counter[str]:
+        self._stopped.set()
+        self.join()
+        return self.stacks
+
+
+def write_profile(
+    stacks: collections.Counter[str], *, directory: Path, label: str, max_files: int
+) -> Path:
+    """Write ``stacks`` as a collapsed-stack file, then delete all but the newest ``max_files``."""
+    directory.mkdir(parents=True, exist_ok=True)
+    timestamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%S.%f")
+    safe_label = re.sub(r"[^A-Za-z0-9_.-]+", "_", label)[:80]
+    path = directory / f"{timestamp}-{os.getpid()}-{safe_label}.collapsed"
+
+    path.write_text("".join(f"{stack} {count}\n" for stack, count in stacks.most_common()))
+
+    profiles = sorted(directory.glob("*.collapsed"))  # the timestamp prefix sorts by age
+    for old in profiles[:max(0, len(profiles) - max_files)]:
+        old.unlink(missing_ok=True)
+
+    return path
+
+
+def read_profiles(paths: list[Path]) -> collections.Counter[str]:
+    """Merge collapsed-stack files."""
+    stacks: collections.Counter[str] = collections.Counter()
+    for path in paths:
+        for line in path.read_text().splitlines():
+            stack, _, count = line.rpartition(" ")
+            if stack and count.isdigit():
+                stacks[stack] += int(count)
+    return stacks
+
+
+def focus(stacks: collections.Counter[str], modules: list[str]) -> collections.Counter[str]:
+    """
+    Keep only stacks that pass through one of ``modules``, trimmed so each starts at the
+    outermost frame from those modules (e.g. the view, rather than daphne and asgiref).
+    """
+    focused: collections.Counter[str] = collections.Counter()
+    for stack, count in stacks.items():
+        frames = stack.split(";")
+        for index, frame in enumerate(frames):
+            module = frame.partition(":")[0]
+            if any(module == m or module.startswith(m + ".") for m in modules):
+                focused[";".join(frames[index:])] += count
+                break
+    return focused
+
+
+class _Node:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.value = 0
+        self.children: dict[str, _Node] = {}
+
+
+def _escape(text: str) -> str:
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;").replace('"', "&quot;")
+
+
+def flamegraph_svg(stacks: collections.Counter[str], *, title: str, width: int = 1200) -> str:
+    """Render collapsed stacks as a self-contained SVG flame graph (root at the bottom)."""
+    root = _Node("all")
+    for stack, count in stacks.items():
+        root.value += count
+        node = root
+        for name in stack.split(";"):
+            node = node.children.setdefault(name, _Node(name))
+            node.value += count
+
+    def depth(node: _Node) -> int:
+        return 1 + max((depth(child) for child in node.children.values()), default=0)
+
+    frame_height, top_margin, char_width = 16, 24, 7
+    height = top_margin + depth(root) * frame_height
+    scale = width / root.value if root.value else 0.0
+    rects = []
+
+    def draw(node: _Node, x: float, level: int) -> None:
+        w = node.value * scale
+        if w < 0.5:
+            return
+
+        y = height - (level + 1) * frame_height
+        # Our own code in reds, everything else in oranges and yellows; stable across runs.
+        module = node.name.partition(":")[0]
+        spread = zlib.crc32(module.encode())
+        hue = spread % 15 if module.startswith("django_chess") else 25 + spread % 30
+
+        label = node.name
+        max_chars = int((w - 6) / char_width)
+        if len(label) > max_chars:
+            label = label[:max_chars - 2] + ".." if max_chars > 3 else ""
+
+        rects.append(
+            f'<g><title>{_escape(node.name)} ({node.value} samples, {100 * node.value / root.value:.1f}%)</title>'
+            f'<rect x="{x:.1f}" y="{y}" width="{w:.1f}" height="{frame_height - 1}" fill="hsl({hue},85%,60%)"/>'
+            f'<text x="{x + 3:.1f}" y="{y + frame_height - 4}">{_escape(label)}</text></g>'
+        )
+
+        for child in sorted(node.children.values(), key=lambda c: c.name):
+            draw(child, x, level + 1)
+            x += child.value * scale
+
+    draw(root, 0.0, 0)
+
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}" font-family="monospace" font-size="11">'
+        f'<text x="{width / 2}" y="16" text-anchor="middle" font-size="14">{_escape(title)}</text>'
+        + "".join(rects)
+        + "</svg>\n"
+    )
@@ -0,0 +1,199 @@
+"""
+Background recovery of games stuck waiting for black's reply.
+
+Moves are saved together with black's reply, but games imported with black to move, and
+games saved by older versions that wrote white's move before asking the engine, are left
+flagged ``awaiting_ai``.  Rather than holding up startup until every such game has been
+answered, ``LifespanApp`` starts a ``RecoverySweeper`` alongside the server.  The sweeper
+works through stuck games one at a time on its own thread, rate limited so it never competes
+with live traffic for long, and publishes its progress for the readiness endpoint.
+"""
+import asyncio
+import concurrent.futures
+import datetime
+import logging
+from typing import Any, Awaitable, Callable, Mapping
+from uuid import UUID
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from django_chess.app import sharding
+from django_chess.app.engine import get_black_move
+from django_chess.app.models import Game
+from django_chess.app.utils import claim_game, load_board, retry_if_stale, save_board
+
+logger = logging.getLogger(__name__)
+
+Scope = dict[str, Any]
+Receive = Callable[[], Awaitable[Mapping[str, Any]]]
+Send = Callable[[Mapping[str, Any]], Awaitable[None]]
+ASGIApp = Callable[[Scope, Receive, Send], Awaitable[None]]
+
+
+class RecoveryProgress:
+    """What the sweeper has done so far; read by the readiness view."""
+
+    def __init__(self) -> None:
+        self.state = "idle"  # "idle" -> "recovering" -> "ready"
+        self.pending = 0
+        self.recovered = 0
+        self.failed = 0
+        self.last_sweep: datetime.datetime | None = None
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "state": self.state,
+            "pending": self.pending,
+            "recovered": self.recovered,
+            "failed": self.failed,
+            "last_sweep": self.last_sweep.isoformat() if self.last_sweep else None,
+        }
+
+
+progress = RecoveryProgress()
+
+
+def stuck_game_ids(*, grace: datetime.timedelta) -> list[UUID]:
+    """
+    Return games awaiting black's reply that nobody has touched for ``grace``.
+
+    The grace period keeps us from racing a live request that is still waiting on the engine.
+    """
+    return sharding.fan_out(
+        Game.objects.filter(
+            in_progress=True, awaiting_ai=True, modified__lt=timezone.now() - grace
+        ).values_list("id", flat=True)
+    )
+
+
+def recover_game(game_id: UUID) -> str | None:
+    """Make black's move in one stuck game; return the move played, if any."""
+    def attempt() -> str | None:
+        with claim_game(Game.objects.filter(pk=game_id, in_progress=True, awaiting_ai=True)) as game:
+            if game is None:  # someone else got there first
+                return None
+
+            board = load_board(game=game, annotate=False)
+            black_move = get_black_move(board, game.black_smartness)
+            if black_move is None:
+                return None
+
+            game.promoting_push(board, black_move)
+            save_board(board=board, game=game)
+            return black_move.uci()
+
+    return retry_if_stale(attempt)
+
+
+class RecoverySweeper:
+    """Periodically answers stuck games, at most ``games_per_second`` of them."""
+
+    def __init__(
+        self,
+        *,
+        interval: float,
+        grace: float,
+        games_per_second: float,
+    ) -> None:
+        self.interval = interval
+        self.grace = datetime.timedelta(seconds=grace)
+        self.delay = 1 / games_per_second if games_per_second > 0 else 0.0
+        # One thread, so recovery never occupies more than one slot's worth of CPU or DB.
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="recovery"
+        )
+
+    async def _in_thread(self, func: Callable[..., Any], *args: Any) -> Any:
+        def call() -> Any:
+            close_old_connections()
+            try:
+                return func(*args)
+            finally:
+                close_old_connections()
+
+        return await asyncio.get_running_loop().run_in_executor(self.executor, call)
+
+    async def sweep(self) -> None:
+        """Make one pass over every stuck game."""
+        game_ids = await self._in_thread(lambda: stuck_game_ids(grace=self.grace))
+        progress.pending = len(game_ids)
+
+        for game_id in game_ids:
+            try:
+                black_move = await self._in_thread(recover_game, game_id)
+            except Exception:
+                logger.exception("Couldn't recover game %s", game_id)
+                progress.failed += 1
+            else:
+                if black_move is not None:
+                    logger.info("Recovered game %s with %s", game_id, black_move)
+                    progress.recovered += 1
+
+            progress.pending -= 1
+            await asyncio.sleep(self.delay)
+
+        progress.last_sweep = timezone.now()
+
+    async def run(self) -> None:
+        progress.state = "recovering"
+        while True:
+            try:
+                await self.sweep()
+            except Exception:
+                logger.exception("Recovery sweep failed")
+            progress.state = "ready"
+            await asyncio.sleep(self.interval)
+
+
+class LifespanApp:
+    """
+    ASGI wrapper that runs a RecoverySweeper next to the Django application.
+
+    Servers that speak the ASGI lifespan protocol get the sweeper started at startup and
+    cancelled at shutdown.  Daphne doesn't send lifespan events, so there we start it on the
+    first request instead.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self.task: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        if self.task is not None or not settings.RECOVERY_SWEEPER_ENABLED:
+            return
+
+        sweeper = RecoverySweeper(
+            interval=settings.RECOVERY_SWEEP_INTERVAL_SECONDS,
+            grace=settings.RECOVERY_GRACE_SECONDS,
+            games_per_second=settings.RECOVERY_GAMES_PER_SECOND,
+        )
+        self.task = asyncio.get_running_loop().create_task(sweeper.run())
+
+    async def stop(self) -> None:
+        if self.task is None:
+            return
+
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "lifespan":
+            self.start()
+            await self.app(scope, receive, send)
+            return
+
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                self.start()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.stop()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
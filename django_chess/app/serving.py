@@ -0,0 +1,221 @@
+"""
+Several daphne processes serving on one socket.
+
+One daphne process runs the app's Python on one core, however many the host has.
+"manage.py serve --workers N" binds the listening socket itself and starts N worker processes
+that share it, each a daphne server adopting the socket by its file descriptor; the kernel
+gives each new connection to whichever worker accepts it first.  The ``Supervisor`` restarts
+any worker that dies, and
+
+- on SIGHUP, replaces the workers one at a time: it starts a new worker, waits until that's
+  listening, then drains the old one.  The socket stays open throughout, so connections
+  arriving mid-restart wait in its backlog rather than being refused.
+- on SIGTERM or SIGINT, drains every worker, then exits.
+
+A draining worker (``DrainingServer``) stops accepting connections and ends its Server-Sent
+Events streams, and stops once its in-flight requests and engine calls have finished, or after
+SERVER_DRAIN_TIMEOUT_SECONDS.  Each worker's events hub polls for the others' moves; see
+events.py.
+Daphne on its own cancels its in-flight requests as soon as it's told to stop, rather than
+waiting for them.
+
+Each worker is told SERVER_WORKERS and its SERVER_WORKER_INDEX through the environment, and
+sizes its caches and engine slots accordingly; see base_settings.py.
+"""
+# Imported first: it installs Twisted's asyncio reactor, which must happen before anything
+# else imports Twisted.
+from daphne.server import Server  # type: ignore[import-untyped]  # isort:skip
+
+import asyncio
+import logging
+import os
+import select
+import signal
+import socket
+import subprocess
+import sys
+import time
+from typing import Any, Callable
+
+from django.conf import settings
+
+from django_chess.app.engine import engine_slots
+from django_chess.app.events import hub
+
+logger = logging.getLogger(__name__)
+
+# How long a new worker gets to import the app and start listening.
+STARTUP_TIMEOUT_SECONDS = 60.0
+
+
+class DrainingServer(Server):  # type: ignore[misc]
+    """A daphne server that, on SIGTERM or SIGINT, finishes what it's doing before it stops."""
+
+    def __init__(self, *args: Any, drain_timeout: float, **kwargs: Any) -> None:
+        super().__init__(*args, signal_handlers=False, **kwargs)
+        self.drain_timeout = drain_timeout
+        self.ports: list[Any] = []
+        self.draining = False
+
+    def listen_success(self, port: Any) -> None:
+        self.ports.append(port)
+        super().listen_success(port)
+
+    def run(self) -> None:
+        from twisted.internet import reactor
+
+        def drain_soon(signum: int, frame: Any) -> None:
+            reactor.callFromThread(self.drain)
+
+        signal.signal(signal.SIGTERM, drain_soon)
+        signal.signal(signal.SIGINT, drain_soon)
+        super().run()
+
+    def busy(self) -> bool:
+        if engine_slots().in_flight:  # the recovery sweeper's calls, too
+            return True
+        return any(
+            details.get("application_instance") is not None and not details["application_instance"].done()
+            for details in self.connections.values()
+        )
+
+    def drain(self) -> None:
+        if self.draining:
+            return
+        self.draining = True
+        for port in self.ports:
+            port.stopListening()
+        # Event streams never finish by themselves; their browsers reconnect to another worker.
+        hub.close_all()
+        self._stop_when_idle(time.monotonic() + self.drain_timeout)
+
+    def _stop_when_idle(self, deadline: float) -> None:
+        if self.busy() and time.monotonic() < deadline:
+            asyncio.get_running_loop().call_later(0.1, self._stop_when_idle, deadline)
+            return
+        if self.busy():
+            logger.warning("Worker %d stopping with requests still in flight", os.getpid())
+        self.stop()
+
+
+def run_worker(*, fd: int, ready_fd: int | None, proxy_headers: bool) -> None:
+    """Serve the app on the already-listening socket ``fd`` until drained."""
+    from django_chess.asgi import application
+
+    def ready() -> None:
+        if ready_fd is not None:
+            os.write(ready_fd, b"\n")
+            os.close(ready_fd)
+
+    server = DrainingServer(
+        application=application,
+        endpoints=[f"fd:fileno={fd}"],  # an IPv4 socket: daphne's "fd" endpoints assume so
+        proxy_forwarded_address_header="X-Forwarded-For" if proxy_headers else None,
+        proxy_forwarded_port_header="X-Forwarded-Port" if proxy_headers else None,
+        proxy_forwarded_proto_header="X-Forwarded-Proto" if proxy_headers else None,
+        verbosity=0,
+        ready_callable=ready,
+        drain_timeout=settings.SERVER_DRAIN_TIMEOUT_SECONDS,
+    )
+    server.run()
+    if server.abort_start:
+        sys.exit(1)
+
+
+class WorkerStartupError(RuntimeError):
+    pass
+
+
+class Supervisor:
+    def __init__(self, *, workers: int, host: str, port: int, proxy_headers: bool) -> None:
+        self.workers = workers
+        self.host = host
+        self.port = port
+        self.proxy_headers = proxy_headers
+        self.processes: list[subprocess.Popen[bytes]] = []
+        self.restart_requested = False
+        self.stop_requested = False
+
+    def run(self, *, on_ready: Callable[[], None] | None = None) -> None:
+        """
+        Serve until SIGTERM or SIGINT; ``on_ready`` is called once every worker is listening.
+        Raises WorkerStartupError if the first workers can't start.
+        """
+        self.socket = socket.create_server((self.host, self.port), backlog=1024)
+        self.socket.set_inheritable(True)
+
+        signal.signal(signal.SIGHUP, self._request_restart)
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+
+        try:
+            self.processes = [self.start(index) for index in range(self.workers)]
+            if on_ready is not None:
+                on_ready()
+
+            while not self.stop_requested:
+                try:
+                    if self.restart_requested:
+                        self.restart_requested = False
+                        self.rolling_restart()
+                    for index, process in enumerate(self.processes):
+                        if process.poll() is not None and not self.stop_requested:
+                            logger.warning("Worker %d exited with %s; restarting it", process.pid, process.returncode)
+                            self.processes[index] = self.start(index)
+                except WorkerStartupError:
+                    logger.exception("Couldn't start a worker; trying again shortly")
+                    time.sleep(1)
+                time.sleep(0.2)
+        finally:
+            for process in self.processes:
+                process.send_signal(signal.SIGTERM)
+            for process in self.processes:
+                self.wait(process)
+            self.socket.close()
+
+    def _request_restart(self, signum: int, frame: Any) -> None:
+        self.restart_requested = True
+
+    def _request_stop(self, signum: int, frame: Any) -> None:
+        self.stop_requested = True
+
+    def start(self, index: int) -> subprocess.Popen[bytes]:
+        """Start worker number ``index``, and wait until it's listening."""
+        ready_read, ready_write = os.pipe()
+        fd = self.socket.fileno()
+        argv = [sys.executable, str(settings.BASE_DIR / "manage.py"), "serve", "--worker-fd", str(fd)]
+        argv += ["--ready-fd", str(ready_write)]
+        if self.proxy_headers:
+            argv.append("--proxy-headers")
+        process = subprocess.Popen(
+            argv,
+            cwd=settings.BASE_DIR,
+            env=dict(os.environ, SERVER_WORKERS=str(self.workers), SERVER_WORKER_INDEX=str(index)),
+            pass_fds=(fd, ready_write),
+        )
+        os.close(ready_write)
+
+        try:
+            readable, _, _ = select.select([ready_read], [], [], STARTUP_TIMEOUT_SECONDS)
+            if not readable or not os.read(ready_read, 1):
+                process.kill()
+                process.wait()
+                raise WorkerStartupError(f"Worker {index} didn't start listening")
+        finally:
+            os.close(ready_read)
+        return process
+
+    def wait(self, process: subprocess.Popen[bytes]) -> None:
+        try:
+            process.wait(timeout=settings.SERVER_DRAIN_TIMEOUT_SECONDS + 5)
+        except subprocess.TimeoutExpired:
+            logger.error("Worker %d didn't stop; killing it", process.pid)
+            process.kill()
+            process.wait()
+
+    def rolling_restart(self) -> None:
+        for index, old in enumerate(self.processes):
+            self.processes[index] = self.start(index)
+            old.send_signal(signal.SIGTERM)
+            self.wait(old)
+        logger.info("Restarted %d worker(s)", self.workers)
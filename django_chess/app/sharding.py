@@ -0,0 +1,119 @@
+"""
+Games spread over several SQLite files, so that moves in different games don't queue on one
+writer lock.
+
+GAME_SHARDS lists the database aliases that hold games; the first is always "default", so a
+single shard is exactly the unsharded setup.  A game lives on the shard picked by the first
+16 bits of its UUID: the prefix range is cut into len(GAME_SHARDS) equal slices, which keeps
+the mapping stable for a given count, and easy to reason about when the count changes.  Every
+other table (the explorer, sessions, auth) stays on "default".
+
+Routing:
+
+- ``GameShardRouter`` sends a game instance's saves and deletes to its shard.
+- ``GameQuerySet`` (models.py) sends lookups by primary key, ``Game.objects.filter(pk=...)``
+  and the like, to the right shard, and bulk_create()s to each game's shard.
+- Anything else -- listings, counts, bulk updates -- needs every shard: ``fan_out``,
+  ``count`` and ``each_shard`` do that.  A query across games that doesn't go through them
+  sees only the games on "default".
+
+After changing GAME_SHARD_COUNT, stop the server and run "manage.py rebalance_shards" to
+create any new shard files and move every game to the shard it now belongs on.
+"""
+import contextlib
+import operator
+import uuid
+from typing import Any, Iterator, TypeVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, models, transaction
+
+Row = TypeVar("Row")
+
+PREFIX_BITS = 16
+
+
+def is_sharded() -> bool:
+    return len(settings.GAME_SHARDS) > 1
+
+
+def shard_index(game_id: uuid.UUID, count: int) -> int:
+    return ((game_id.int >> (128 - PREFIX_BITS)) * count) >> PREFIX_BITS
+
+
+def shard_for(game_id: uuid.UUID) -> str:
+    """The alias of the database that holds (or will hold) this game."""
+    shards: list[str] = settings.GAME_SHARDS
+    return shards[shard_index(game_id, len(shards))]
+
+
+def shard_for_value(value: Any) -> str | None:
+    """shard_for, for a primary key lookup value; None if there's nothing to route."""
+    if not is_sharded():
+        return None
+    if isinstance(value, models.Model):
+        value = value.pk
+    try:
+        return shard_for(value if isinstance(value, uuid.UUID) else uuid.UUID(str(value)))
+    except ValueError:
+        return None  # the query will fail validation on its own
+
+
+def each_shard(queryset: models.QuerySet[Any, Row]) -> Iterator[models.QuerySet[Any, Row]]:
+    """The queryset, once per shard -- or just once, if it's already bound to a database."""
+    if queryset._db is not None or not is_sharded():  # type: ignore[attr-defined]
+        yield queryset
+        return
+    for alias in settings.GAME_SHARDS:
+        yield queryset.using(alias)
+
+
+def fan_out(queryset: models.QuerySet[Any, Row]) -> list[Row]:
+    """Evaluate the queryset on every shard, merged in the queryset's ordering."""
+    shards = list(each_shard(queryset))
+    if len(shards) == 1:
+        return list(shards[0])
+
+    rows = [row for shard in shards for row in shard]
+    # Stable sorts, least significant field first.
+    for field in reversed(queryset.query.order_by):
+        name = str(field)
+        rows.sort(key=operator.attrgetter(name.lstrip("-")), reverse=name.startswith("-"))
+    return rows
+
+
+def count(queryset: models.QuerySet[Any]) -> int:
+    return sum(shard.count() for shard in each_shard(queryset))
+
+
+@contextlib.contextmanager
+def atomic(*aliases: str) -> Iterator[None]:
+    """A transaction on each of these databases, committed in the reverse order of ``aliases``."""
+    with contextlib.ExitStack() as stack:
+        for alias in dict.fromkeys(aliases):
+            stack.enter_context(transaction.atomic(using=alias))
+        yield
+
+
+class GameShardRouter:
+    def _shard(self, model: Any, hints: dict[str, Any]) -> str | None:
+        if not is_sharded() or model._meta.label != "app.Game":
+            return None
+        instance = hints.get("instance")
+        return shard_for(instance.pk) if instance is not None else None
+
+    def db_for_read(self, model: Any, **hints: Any) -> str | None:
+        return self._shard(model, hints)
+
+    def db_for_write(self, model: Any, **hints: Any) -> str | None:
+        return self._shard(model, hints)
+
+    def allow_relation(self, obj1: Any, obj2: Any, **hints: Any) -> bool | None:
+        return None
+
+    def allow_migrate(self, db: str, app_label: str, model_name: str | None = None, **hints: Any) -> bool | None:
+        if app_label == "app" and model_name == "game":
+            return db in settings.GAME_SHARDS
+        if db != DEFAULT_DB_ALIAS and db in settings.GAME_SHARDS:
+            return False  # shards hold nothing else
+        return None
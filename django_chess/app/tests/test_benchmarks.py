@@ -0,0 +1,70 @@
+import io
+import json
+from pathlib import Path
+
+import pytest
+
+from django.core.management import CommandError, call_command
+
+from django_chess.benchmarks import corpus, runner
+
+
+def _report(**medians: float) -> dict[str, object]:
+    return {"results": {name: {"median_us": us} for name, us in medians.items()}}
+
+
+def test_compare_flags_regressions_and_improvements() -> None:
+    baseline = _report(a=100.0, b=100.0, c=100.0, gone=1.0)
+    current = _report(a=130.0, b=70.0, c=110.0, new=5.0)
+
+    regressions, improvements = runner.compare(current, baseline, threshold=0.25)
+
+    assert [line.split(":")[0] for line in regressions] == ["a"]
+    assert [line.split(":")[0] for line in improvements] == ["b"]
+
+
+def test_generated_games_are_deterministic_and_unfinished() -> None:
+    for plies in corpus.PLIES:
+        board = corpus.generated_game(plies)
+        assert len(board.move_stack) == plies
+        assert not board.is_game_over()
+        assert board.move_stack == corpus.generated_game(plies).move_stack
+
+
+@pytest.mark.django_db
+def test_suite_cases_run() -> None:
+    from django_chess.benchmarks import suite  # noqa: F401
+
+    report = runner.run(name_filter="plies=10]", min_time=0, log=lambda line: None)
+
+    assert "load_board[plies=10]" in report["results"]
+    assert "view:game[plies=10]" in report["results"]
+    assert "view:import_pgn[20 games, plies=10..300]" not in report["results"]
+    for result in report["results"].values():
+        assert result["runs"] >= 3
+        assert result["median_us"] > 0
+
+
+@pytest.mark.django_db
+def test_benchmark_command_fails_on_regression(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    # pytest-django has already set up the test environment and database.
+    from django_chess.app.management.commands import benchmark
+
+    for name in ["setup_test_environment", "setup_databases", "teardown_databases", "teardown_test_environment"]:
+        monkeypatch.setattr(benchmark, name, lambda *args, **kwargs: None)
+
+    baseline = tmp_path / "baseline.json"
+    output = tmp_path / "results.json"
+    baseline.write_text(json.dumps(_report(**{"save_board[plies=10]": 0.001})))
+
+    with pytest.raises(CommandError, match="1 benchmark"):
+        call_command(
+            "benchmark",
+            "--filter", "save_board[plies=10]",
+            "--min-time", "0",
+            "--baseline", str(baseline),
+            "--output", str(output),
+            stdout=io.StringIO(),
+        )
+
+    assert "save_board[plies=10]" in json.loads(output.read_text())["results"]
@@ -0,0 +1,155 @@
+import logging
+from typing import Any, Callable
+
+import chess
+import pytest
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client
+from django.urls import URLPattern, URLResolver, get_resolver
+
+from django_chess.app import budgets, metrics, views
+from django_chess.app.models import Game
+from django_chess.app.utils import board_cache, save_board
+from django_chess.benchmarks import corpus
+
+START = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR_w_KQkq_-_0_1"
+
+
+def _views(resolver: URLResolver) -> list[URLPattern]:
+    found = []
+    for pattern in resolver.url_patterns:
+        if isinstance(pattern, URLResolver):
+            found.extend(_views(pattern))
+        elif pattern.callback.__module__.startswith("django_chess."):
+            found.append(pattern)
+    return found
+
+
+def test_every_view_has_a_budget() -> None:
+    missing: list[str] = []
+    for pattern in _views(get_resolver()):
+        callback: Any = pattern.callback
+        if hasattr(callback, "query_budget"):
+            continue
+        # A viewset route: every action it maps to needs an entry.
+        actions = getattr(callback, "actions", {}).values()
+        budgeted = getattr(getattr(callback, "cls", None), "query_budgets", {})
+        missing.extend(f"{pattern.name}: {action}" for action in actions if action not in budgeted)
+        if not actions:
+            missing.append(str(pattern.name))
+
+    assert missing == []
+
+
+@pytest.mark.django_db
+def test_usage_counts_rows_read_and_written() -> None:
+    for _ in range(3):
+        Game.objects.create()
+
+    with budgets.track() as usage:
+        list(Game.objects.all())
+        Game.objects.update(black_smartness=3)
+
+    assert usage.queries == 2
+    assert usage.rows == 3 + 3
+    assert usage.over(budgets.Budget(queries=2, rows=5)) == ["6 rows (budget 5)"]
+
+
+def _saved(plies: int, **fields: Any) -> Game:
+    game = Game.objects.create(**fields)
+    save_board(board=corpus.generated_game(plies), game=game)
+    return game
+
+
+def _finished() -> Game:
+    board = chess.Board()
+    for uci in ["f2f3", "e7e5", "g2g4", "d8h4"]:
+        board.push_uci(uci)
+    game = Game.objects.create()
+    save_board(board=board, game=game)
+    return game
+
+
+Request = Callable[[Client], Any]
+
+ENDPOINTS: dict[str, Request] = {
+    "home": lambda c: budgets.assert_within_budget(c.get, "/"),
+    "new-game": lambda c: budgets.assert_within_budget(c.post, "/game/"),
+    "game": lambda c: budgets.assert_within_budget(c.get, f"/game/{_saved(40).pk}/"),
+    "pgn-game": lambda c: budgets.assert_within_budget(c.get, f"/pgn/{_saved(40).pk}/"),
+    "import-pgn": lambda c: budgets.assert_within_budget(
+        c.post, "/pgn/", {"imported_pgn": SimpleUploadedFile("x.pgn", corpus.pgn_text(
+            [corpus.generated_game(plies, seed=seed) for plies in corpus.PLIES for seed in range(10)]
+        ).encode())},
+    ),
+    "move": lambda c: budgets.assert_within_budget(c.post, f"/move/{_saved(0, black_smartness=0).pk}/", {"move": "e2e4"}),
+    "set-black-smartness": lambda c: budgets.assert_within_budget(
+        c.post, f"/set-black-smartness/{_saved(0).pk}/", {"smartness_tenths": 3}
+    ),
+    "ready": lambda c: budgets.assert_within_budget(c.get, "/ready/"),
+    "metrics": lambda c: budgets.assert_within_budget(c.get, "/metrics"),
+    "api list": lambda c: budgets.assert_within_budget(c.get, "/api/games/"),
+    "api create": lambda c: budgets.assert_within_budget(
+        c.post, "/api/games/", {"black_smartness": 0}, content_type="application/json"
+    ),
+    "api retrieve": lambda c: budgets.assert_within_budget(c.get, f"/api/games/{_saved(40).pk}/"),
+    "api update": lambda c: budgets.assert_within_budget(
+        c.put, f"/api/games/{_saved(0).pk}/", {"black_smartness": 2}, content_type="application/json"
+    ),
+    "api partial_update": lambda c: budgets.assert_within_budget(
+        c.patch, f"/api/games/{_saved(0).pk}/", {"black_smartness": 2}, content_type="application/json"
+    ),
+    "api destroy": lambda c: budgets.assert_within_budget(c.delete, f"/api/games/{_saved(0).pk}/"),
+    "api moves": lambda c: budgets.assert_within_budget(c.get, f"/api/games/{_saved(40).pk}/moves/?since=38"),
+    "api make_move": lambda c: budgets.assert_within_budget(
+        c.post, f"/api/games/{_saved(0, black_smartness=0).pk}/moves/", {"move": "e2e4"},
+        content_type="application/json",
+    ),
+    "api position moves": lambda c: budgets.assert_within_budget(c.get, f"/api/positions/{START}/moves"),
+}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("name", ENDPOINTS)
+def test_endpoint_stays_within_budget(name: str) -> None:
+    for _ in range(3):
+        _finished()
+    board_cache.clear()
+
+    response = ENDPOINTS[name](Client())
+
+    assert response.status_code < 400
+
+
+@pytest.mark.django_db
+def test_finishing_a_game_stays_within_budget() -> None:
+    game = Game.objects.create(black_smartness=0)
+    board = chess.Board()
+    for uci in ["e2e4", "f7f6", "d2d4", "g7g5"]:
+        board.push_uci(uci)
+    save_board(board=board, game=game)
+
+    response = budgets.assert_within_budget(
+        Client().post, f"/api/games/{game.pk}/moves/", {"move": "d1h5"}, content_type="application/json"
+    )
+
+    assert response.json()["game_state"]["in_progress"] is False
+
+
+@pytest.mark.django_db
+def test_middleware_logs_requests_over_budget(monkeypatch: pytest.MonkeyPatch, caplog: pytest.LogCaptureFixture) -> None:
+    game = _saved(10)
+    key = ("django_chess_query_budget_violations_total", (("route", "game"),), "")
+    before = metrics.REGISTRY.samples().get(key, 0.0)
+    monkeypatch.setattr(views.game, "query_budget", budgets.Budget(queries=0))
+
+    with caplog.at_level(logging.WARNING, logger="django_chess.app.middleware"):
+        response = Client().get(f"/game/{game.pk}/")
+
+    assert response.status_code == 200
+    assert f"GET /game/{game.pk}/ ran 1 queries (budget 0)" in caplog.messages
+    assert metrics.REGISTRY.samples()[key] == before + 1
+
+    with pytest.raises(AssertionError, match="1 queries"):
+        budgets.assert_within_budget(Client().get, f"/game/{game.pk}/")
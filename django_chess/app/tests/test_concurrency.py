@@ -0,0 +1,150 @@
+import json
+from typing import Any
+
+import chess
+import pytest
+
+from django.test import Client
+from rest_framework.test import APIClient
+
+from django_chess.app import recovery
+from django_chess.app.models import Game, StaleGameError
+from django_chess.app.utils import load_board, retry_if_stale, save_board
+
+
+def _game(*ucis: str, **fields: Any) -> Game:
+    game = Game.objects.create(**fields)
+    board = chess.Board()
+    for uci in ucis:
+        board.push_uci(uci)
+    save_board(board=board, game=game)
+    return game
+
+
+def _move_elsewhere(game_id: Any, uci: str) -> None:
+    """What another tab does: read the game, push a move, save."""
+    other = Game.objects.get(pk=game_id)
+    board = load_board(game=other, annotate=False)
+    board.push_uci(uci)
+    save_board(board=board, game=other)
+
+
+@pytest.mark.django_db
+def test_the_second_of_two_writers_at_the_same_ply_fails() -> None:
+    game = _game("e2e4")
+    first, second = Game.objects.get(pk=game.pk), Game.objects.get(pk=game.pk)
+
+    board = load_board(game=first, annotate=False)
+    board.push_uci("e7e5")
+    save_board(board=board, game=first)
+
+    board = load_board(game=second, annotate=False)
+    board.push_uci("c7c5")
+    with pytest.raises(StaleGameError):
+        save_board(board=board, game=second)
+
+    game.refresh_from_db()
+    assert json.loads(game.moves or "[]") == ["e2e4", "e7e5"]
+    assert game.ply == 2
+
+
+@pytest.mark.django_db
+def test_api_move_that_loses_a_race_gets_409(monkeypatch: pytest.MonkeyPatch) -> None:
+    from django_chess.api import views
+
+    game = _game(black_smartness=0)
+
+    def slow_reply(board: chess.Board, smartness: int) -> chess.Move:
+        # While "the engine thinks", the same player moves from another device.
+        _move_elsewhere(game.pk, "d2d4")
+        return chess.Move.from_uci("e7e5")
+
+    monkeypatch.setattr(views, "get_black_move", slow_reply)
+
+    response = APIClient().post(f"/api/games/{game.pk}/moves/", {"move": "e2e4"})
+
+    assert response.status_code == 409
+    assert response.json()["ply"] == 1
+    game.refresh_from_db()
+    assert json.loads(game.moves or "[]") == ["d2d4"]
+
+
+@pytest.mark.django_db
+def test_web_move_that_loses_a_race_gets_409(monkeypatch: pytest.MonkeyPatch) -> None:
+    from django_chess.app import engine
+
+    game = _game(black_smartness=10)
+
+    def slow_engine(board: chess.Board, *, smartness: int) -> None:
+        _move_elsewhere(game.pk, "d2d4")
+
+    monkeypatch.setattr(engine, "engine_play", slow_engine)
+
+    response = Client().post(f"/move/{game.pk}/", {"move": "e2e4"})
+
+    assert response.status_code == 409
+    game.refresh_from_db()
+    assert json.loads(game.moves or "[]") == ["d2d4"]
+
+
+@pytest.mark.django_db
+def test_recovery_retries_on_the_newer_position(monkeypatch: pytest.MonkeyPatch) -> None:
+    game = _game("e2e4", black_smartness=0)
+    calls = []
+
+    def reply(board: chess.Board, smartness: int) -> chess.Move:
+        calls.append(board.fen())
+        if len(calls) == 1:
+            # Meanwhile a live request answers for black, and white moves again.
+            _move_elsewhere(game.pk, "e7e5")
+            _move_elsewhere(game.pk, "g1f3")
+        return next(iter(board.legal_moves))
+
+    monkeypatch.setattr(recovery, "get_black_move", reply)
+
+    assert recovery.recover_game(game.pk) is not None
+    assert len(calls) == 2
+    game.refresh_from_db()
+    assert json.loads(game.moves or "[]")[:3] == ["e2e4", "e7e5", "g1f3"]
+    assert game.ply == 4
+
+
+def test_retry_if_stale_gives_up() -> None:
+    attempts = []
+
+    def always_stale() -> None:
+        attempts.append(1)
+        raise StaleGameError(Game().pk, 0)
+
+    with pytest.raises(StaleGameError):
+        retry_if_stale(always_stale)
+    assert len(attempts) == 3
+
+
+@pytest.mark.django_db
+def test_settings_updates_leave_the_moves_alone() -> None:
+    game = _game(black_smartness=5)
+    stale = Game.objects.get(pk=game.pk)
+    _move_elsewhere(game.pk, "e2e4")
+
+    APIClient().patch(f"/api/games/{game.pk}/", {"black_smartness": 2})
+    Client().post(f"/set-black-smartness/{stale.pk}/", {"smartness_tenths": 3})
+
+    game.refresh_from_db()
+    assert game.black_smartness == 3
+    assert game.ply == 1
+
+
+@pytest.mark.django_db
+def test_moves_leave_settings_changed_meanwhile_alone() -> None:
+    game = _game(black_smartness=5)
+    board = load_board(game=game, annotate=False)
+    board.push_uci("e2e4")
+
+    # While "the engine thinks" about black's reply, the player turns the smartness down.
+    Client().post(f"/set-black-smartness/{game.pk}/", {"smartness_tenths": 3})
+    save_board(board=board, game=game)
+
+    game.refresh_from_db()
+    assert game.black_smartness == 3
+    assert game.ply == 1
@@ -0,0 +1,140 @@
+import io
+import threading
+from pathlib import Path
+from typing import Any, Iterator
+
+import pytest
+
+from django.core.management import call_command
+from django.db import DatabaseError, connection, connections
+from django.db.utils import ConnectionHandler
+from django.test import override_settings
+
+from django_chess.app.database import ReadWriteRouter, read_alias
+from django_chess.app.models import Game
+from django_chess.app.utils import claim_game
+
+
+@pytest.fixture
+def file_databases(tmp_path: Path, django_db_blocker: Any) -> Iterator[ConnectionHandler]:
+    """A writer and a reader on one database file, configured as base_settings does."""
+    name = tmp_path / "db.sqlite3"
+    handler = ConnectionHandler({
+        "default": {"ENGINE": "django.db.backends.sqlite3", "NAME": name, "OPTIONS": {"transaction_mode": "IMMEDIATE"}},
+        "reader": {"ENGINE": "django.db.backends.sqlite3", "NAME": name},
+    })
+    with django_db_blocker.unblock():
+        yield handler
+        handler.close_all()
+
+
+@pytest.mark.django_db
+def test_new_connections_get_the_pragmas() -> None:
+    connection.ensure_connection()
+
+    def pragma(name: str) -> Any:
+        return connection.connection.execute(f"PRAGMA {name}").fetchone()[0]
+
+    assert pragma("busy_timeout") == 5000
+    assert pragma("synchronous") == 1  # NORMAL
+    assert pragma("cache_size") == -32 * 1024
+    assert pragma("temp_store") == 2  # MEMORY
+
+
+def test_file_databases_use_wal_and_a_read_only_reader(file_databases: ConnectionHandler) -> None:
+    with file_databases["default"].cursor() as cursor:
+        cursor.execute("CREATE TABLE t (n INTEGER)")
+        cursor.execute("INSERT INTO t VALUES (1)")
+        cursor.execute("PRAGMA journal_mode")
+        assert cursor.fetchone()[0] == "wal"
+
+    with file_databases["reader"].cursor() as cursor:
+        cursor.execute("SELECT n FROM t")
+        assert cursor.fetchall() == [(1,)]
+
+        with pytest.raises(DatabaseError, match="readonly"):
+            cursor.execute("INSERT INTO t VALUES (2)")
+
+
+def test_readers_see_the_last_commit_while_a_write_is_in_progress(file_databases: ConnectionHandler) -> None:
+    writer, reader = file_databases["default"], file_databases["reader"]
+    with writer.cursor() as cursor:
+        cursor.execute("CREATE TABLE t (n INTEGER)")
+        cursor.execute("INSERT INTO t VALUES (1)")
+
+    writer.set_autocommit(False)
+    with writer.cursor() as cursor:
+        cursor.execute("UPDATE t SET n = 2")
+
+        # Under the write lock, the reader neither waits nor sees the uncommitted write.
+        with reader.cursor() as read:
+            read.execute("SELECT n FROM t")
+            assert read.fetchall() == [(1,)]
+
+    writer.commit()
+    writer.set_autocommit(True)
+
+
+def test_reads_go_to_the_reader_only_for_a_file_database(monkeypatch: pytest.MonkeyPatch) -> None:
+    router = ReadWriteRouter()
+    writer = connections["default"]
+
+    assert writer.is_in_memory_db()  # type: ignore[attr-defined]
+    assert router.db_for_read(Game) == "default"
+
+    monkeypatch.setitem(writer.settings_dict, "NAME", "/srv/chess/db.sqlite3")
+    assert router.db_for_read(Game) == "reader"
+    assert router.db_for_write(Game) == "default"
+
+    # Inside a transaction, reads see the transaction's writes.
+    monkeypatch.setattr(writer, "in_atomic_block", True)
+    assert read_alias() == "default"
+    monkeypatch.setattr(writer, "in_atomic_block", False)
+
+    with override_settings(DATABASE_READ_ALIAS=None):
+        assert read_alias() == "default"
+
+
+def test_only_the_writer_gets_migrated() -> None:
+    router = ReadWriteRouter()
+
+    assert router.allow_migrate("default", "app")
+    assert not router.allow_migrate("reader", "app")
+
+
+@pytest.mark.django_db
+def test_models_match_the_migrations() -> None:
+    # The migrations themselves run, on whichever backend, when pytest creates its database.
+    call_command("makemigrations", "--check", "--dry-run", stdout=io.StringIO())
+
+
+@pytest.mark.skipif(connection.vendor == "postgresql", reason="SQLite only")
+@pytest.mark.django_db(transaction=True)
+def test_claiming_a_game_on_sqlite_takes_no_lock() -> None:
+    game = Game.objects.create()
+
+    with claim_game(Game.objects.filter(pk=game.pk)) as claimed:
+        assert claimed == game
+        assert not connection.in_atomic_block  # which would hold the database's write lock
+
+
+@pytest.mark.skipif(connection.vendor != "postgresql", reason="needs row locks")
+@pytest.mark.django_db(transaction=True)
+def test_a_claimed_game_is_skipped_by_other_claimants() -> None:
+    game = Game.objects.create()
+    claimed_elsewhere: list[Game | None] = []
+
+    def claim_from_another_connection() -> None:
+        try:
+            with claim_game(Game.objects.filter(pk=game.pk)) as other:
+                claimed_elsewhere.append(other)
+        finally:
+            connections.close_all()
+
+    with claim_game(Game.objects.filter(pk=game.pk)) as claimed:
+        thread = threading.Thread(target=claim_from_another_connection)
+        thread.start()
+        thread.join()
+
+    assert claimed == game
+    assert claimed_elsewhere == [None]
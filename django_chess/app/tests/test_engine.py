@@ -0,0 +1,131 @@
+import argparse
+import io
+import json
+import time
+
+import chess
+import pytest
+
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from django_chess.app import fake_engine
+from django_chess.app.engine import engine_command, engine_play, engine_slots, get_black_move
+from django_chess.app.models import Game
+
+
+def _after_e4() -> chess.Board:
+    board = chess.Board()
+    board.push(chess.Move.from_uci("e2e4"))
+    return board
+
+
+def test_fake_engine_speaks_enough_uci() -> None:
+    options = argparse.Namespace(
+        think_time=0.0, crash_after=None, hang_after=None, seed=0
+    )
+    out = io.StringIO()
+    lines = ["uci", "isready", "position startpos moves e2e4", "go movetime 0", "quit", "go"]
+
+    assert fake_engine.serve(options, lines, out) == 0
+
+    replies = out.getvalue().splitlines()
+    assert replies[-3:-1] == ["uciok", "readyok"]
+    expected = fake_engine.choose_move(_after_e4())
+    assert expected is not None
+    assert replies[-1] == f"bestmove {expected.uci()}"
+
+
+def test_fake_engine_moves_are_deterministic_and_legal() -> None:
+    board = _after_e4()
+
+    first = fake_engine.choose_move(board)
+    assert first is not None and first in board.legal_moves
+    assert fake_engine.choose_move(board) == first
+
+    board = chess.Board("7k/5Q2/6K1/8/8/8/8/8 b - - 0 1")  # stalemate
+    assert fake_engine.choose_move(board) is None
+
+
+def test_engine_command_prefers_the_setting() -> None:
+    command = fake_engine.command(think_time=0.01)
+    with override_settings(CHESS_ENGINE_COMMAND=command):
+        assert engine_command() == command
+
+
+def test_engine_play_uses_the_configured_engine() -> None:
+    board = _after_e4()
+    with override_settings(CHESS_ENGINE_COMMAND=fake_engine.command(seed=3)):
+        result = engine_play(board, smartness=10)
+
+    assert result is not None
+    assert result.move == fake_engine.choose_move(board, seed=3)
+
+
+def test_engine_play_times_out_on_a_hung_engine() -> None:
+    with override_settings(
+        CHESS_ENGINE_COMMAND=fake_engine.command(hang_after=0), CHESS_ENGINE_TIMEOUT_SECONDS=0.5
+    ):
+        started = time.monotonic()
+        with pytest.raises(TimeoutError):
+            engine_play(_after_e4(), smartness=10)
+
+    assert time.monotonic() - started < 5
+
+
+def test_engines_beyond_the_limit_wait_for_a_slot() -> None:
+    with override_settings(
+        CHESS_ENGINE_COMMAND=fake_engine.command(), CHESS_ENGINE_MAX_CONCURRENT=1, CHESS_ENGINE_TIMEOUT_SECONDS=0.2
+    ):
+        with engine_slots().hold(timeout=0):
+            assert engine_slots().in_flight == 1
+            with pytest.raises(TimeoutError):
+                engine_play(_after_e4(), smartness=10)
+
+        assert engine_slots().in_flight == 0
+
+
+@pytest.mark.django_db
+def test_web_moves_get_a_random_reply_when_no_engine_slot_frees_up() -> None:
+    game = Game.objects.create(black_smartness=10)
+
+    with override_settings(
+        CHESS_ENGINE_COMMAND=fake_engine.command(), CHESS_ENGINE_MAX_CONCURRENT=1, CHESS_ENGINE_TIMEOUT_SECONDS=0.2
+    ):
+        with engine_slots().hold(timeout=0):
+            response = Client().post(reverse("move", kwargs=dict(game_id=game.pk)), {"move": "e2e4"})
+
+    assert response.status_code == 302
+    game.refresh_from_db()
+    assert game.ply == 2
+
+
+@pytest.mark.parametrize(
+    "command",
+    [
+        fake_engine.command(crash_after=0),
+        fake_engine.command(hang_after=0),
+        fake_engine.command(startup_delay=2.0),
+    ],
+)
+def test_get_black_move_survives_a_broken_engine(command: list[str]) -> None:
+    board = _after_e4()
+    with override_settings(
+        CHESS_ENGINE_COMMAND=command, CHESS_ENGINE_TIMEOUT_SECONDS=0.5
+    ):
+        move = get_black_move(board, 10)
+
+    # Falls back to a random legal move.
+    assert move is not None and move in board.legal_moves
+
+
+@pytest.mark.django_db
+def test_move_view_plays_the_engines_reply() -> None:
+    game = Game.objects.create(black_smartness=10)
+    with override_settings(CHESS_ENGINE_COMMAND=fake_engine.command()):
+        Client().post(reverse("move", kwargs=dict(game_id=game.pk)), {"move": "e2e4"})
+
+    game.refresh_from_db()
+    expected = fake_engine.choose_move(_after_e4())
+    assert expected is not None
+    assert json.loads(game.moves or "[]") == ["e2e4", expected.uci()]
@@ -0,0 +1,262 @@
+import asyncio
+import json
+import threading
+import time
+import uuid
+from typing import Any
+
+import chess
+import pytest
+
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.test.utils import CaptureQueriesContext
+
+from django_chess.app.events import GameEventHub, hub, move_event
+from django_chess.app.models import Game
+from django_chess.app.utils import save_board
+
+
+def test_publish_reaches_only_that_games_subscribers() -> None:
+    local_hub = GameEventHub()
+    game_a, game_b = uuid.uuid4(), uuid.uuid4()
+
+    async def exercise() -> None:
+        sub_a = local_hub.subscribe(game_a)
+        sub_b = local_hub.subscribe(game_b)
+
+        local_hub.publish(game_a, {"ply": 1})
+        await asyncio.sleep(0)
+
+        assert sub_a.queue.get_nowait() == {"ply": 1}
+        assert sub_b.queue.empty()
+
+        local_hub.unsubscribe(game_a, sub_a)
+        local_hub.unsubscribe(game_b, sub_b)
+        assert local_hub.subscriber_count() == 0
+
+    asyncio.run(exercise())
+
+
+def test_slow_subscriber_keeps_only_the_latest_events() -> None:
+    local_hub = GameEventHub()
+    game_id = uuid.uuid4()
+
+    async def exercise() -> None:
+        sub = local_hub.subscribe(game_id)
+        for ply in range(100):
+            local_hub.publish(game_id, {"ply": ply})
+        await asyncio.sleep(0)
+
+        plies = []
+        while not sub.queue.empty():
+            event = sub.queue.get_nowait()
+            assert event is not None
+            plies.append(event["ply"])
+        assert plies[-1] == 99
+        assert len(plies) == sub.queue.maxsize
+
+    asyncio.run(exercise())
+
+
+def test_thousands_of_idle_subscribers() -> None:
+    """Load test: many idle streams cost nothing, and fan-out from another thread is quick."""
+    local_hub = GameEventHub()
+    idle_games = [uuid.uuid4() for _ in range(2_000)]
+    busy_game = uuid.uuid4()
+    received: list[float] = []
+
+    async def listener(game_id: uuid.UUID) -> None:
+        async for chunk in local_hub.stream(game_id, heartbeat=3600):
+            received.append(time.perf_counter())
+            return
+
+    async def exercise() -> float:
+        tasks = [asyncio.create_task(listener(g)) for g in idle_games for _ in range(2)]
+        tasks += [asyncio.create_task(listener(busy_game)) for _ in range(1_000)]
+        await asyncio.sleep(0.1)
+        assert local_hub.subscriber_count() == 5_000
+
+        # Publish from a foreign thread, the way a sync view does.
+        started = time.perf_counter()
+        publisher = threading.Thread(target=local_hub.publish, args=(busy_game, {"ply": 1}))
+        publisher.start()
+        publisher.join()
+
+        while len(received) < 1_000:
+            await asyncio.sleep(0.01)
+        elapsed = max(received) - started
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return elapsed
+
+    elapsed = asyncio.run(exercise())
+
+    assert len(received) == 1_000
+    assert local_hub.subscriber_count() == 0
+    assert elapsed < 2.0, f"fan-out to 1000 of 5000 subscribers took {elapsed:.3f}s"
+
+
+def test_close_all_ends_every_stream() -> None:
+    local_hub = GameEventHub()
+
+    async def exercise() -> None:
+        stream = local_hub.stream(uuid.uuid4(), initial={"ply": 0}, heartbeat=3600)
+        assert "data:" in await anext(stream)
+        waiting = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+
+        local_hub.close_all()
+        with pytest.raises(StopAsyncIteration):
+            await waiting
+        assert local_hub.subscriber_count() == 0
+
+    asyncio.run(exercise())
+
+
+@pytest.mark.django_db(transaction=True)
+def test_polling_publishes_moves_saved_by_other_processes() -> None:
+    local_hub = GameEventHub()
+    game = Game.objects.create(moves=json.dumps(["e2e4"]), ply=1)
+
+    async def exercise() -> list[dict[str, Any] | None]:
+        sub = local_hub.subscribe(game.pk)
+        sub.ply = 1
+        await asyncio.to_thread(local_hub.poll)  # nothing new yet
+
+        # Another process saves a move and its reply: this process's hub isn't told.
+        await Game.objects.filter(pk=game.pk).aupdate(moves=json.dumps(["e2e4", "e7e5", "g1f3"]), ply=3)
+        await asyncio.to_thread(local_hub.poll)
+        await asyncio.to_thread(local_hub.poll)
+        local_hub.publish(game.pk, {"ply": 3, "uci": "g1f3"})  # say, this process's own save, late
+        await asyncio.sleep(0)
+
+        events = []
+        while not sub.queue.empty():
+            events.append(sub.queue.get_nowait())
+        return events
+
+    events = asyncio.run(exercise())
+
+    assert len(events) == 1
+    assert events[0] is not None
+    assert (events[0]["ply"], events[0]["uci"], events[0]["in_progress"]) == (3, "g1f3", True)
+
+
+@pytest.mark.django_db
+def test_save_board_publishes_after_commit(
+    django_capture_on_commit_callbacks: Any, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    game = Game.objects.create()
+    board = chess.Board()
+    board.push(chess.Move.from_uci("e2e4"))
+    published: list[tuple[uuid.UUID, dict[str, Any]]] = []
+    monkeypatch.setattr(hub, "publish", lambda game_id, event: published.append((game_id, event)))
+
+    with django_capture_on_commit_callbacks(execute=False) as callbacks:
+        save_board(board=board, game=game)
+        assert published == []
+
+    for callback in callbacks:
+        callback()
+
+    assert published == [(game.pk, move_event(board=board, in_progress=True))]
+    assert published[0][1]["uci"] == "e2e4"
+
+
+@pytest.mark.django_db
+def test_a_move_and_its_reply_are_one_write_and_two_events(
+    django_capture_on_commit_callbacks: Any, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    game = Game.objects.create(black_smartness=0)
+    published: list[dict[str, Any]] = []
+    monkeypatch.setattr(hub, "publish", lambda game_id, event: published.append(event))
+
+    with django_capture_on_commit_callbacks(execute=True), CaptureQueriesContext(connection) as queries:
+        response = Client().post(f"/move/{game.pk}/", {"move": "e2e4"})
+
+    assert response.status_code == 302
+    assert [q["sql"].split()[0] for q in queries.captured_queries].count("UPDATE") == 1
+    assert [event["ply"] for event in published] == [1, 2]
+    assert published[0]["uci"] == "e2e4"
+    assert published[1]["fen"] == Game.objects.get(pk=game.pk).fen
+
+
+@pytest.mark.django_db
+def test_a_request_that_dies_before_blacks_reply_saves_nothing(monkeypatch: pytest.MonkeyPatch) -> None:
+    from django_chess.app import views
+
+    # Engine failures get a random reply instead; this is the request itself dying.
+    def crash(*args: Any, **kwargs: Any) -> None:
+        raise RuntimeError("the worker went away")
+
+    game = Game.objects.create(black_smartness=10)
+    monkeypatch.setattr(views, "get_black_move", crash)
+
+    response = Client(raise_request_exception=False).post(f"/move/{game.pk}/", {"move": "e2e4"})
+
+    game.refresh_from_db()
+    assert response.status_code == 500
+    assert (game.ply, game.awaiting_ai) == (0, False)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_events_endpoint_streams_snapshot_then_moves() -> None:
+    game = Game.objects.create(moves=json.dumps(["e2e4", "e7e5"]))
+
+    async def exercise() -> list[dict[str, Any]]:
+        response = await AsyncClient().get(f"/api/games/{game.id}/events/")
+        assert response.status_code == 200
+        assert response["Content-Type"] == "text/event-stream"
+
+        chunks = aiter(response.streaming_content)  # type: ignore[attr-defined]
+        events = [json.loads((await anext(chunks)).decode().split("data: ")[1])]
+
+        hub.publish(game.pk, {"ply": 3, "uci": "g1f3"})
+        events.append(json.loads((await anext(chunks)).decode().split("data: ")[1]))
+        await chunks.aclose()
+        return events
+
+    snapshot, update = asyncio.run(exercise())
+
+    assert snapshot["ply"] == 2
+    assert snapshot["uci"] == "e7e5"
+    assert update == {"ply": 3, "uci": "g1f3"}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_events_endpoint_keeps_moves_saved_before_the_stream_starts() -> None:
+    game = Game.objects.create(moves=json.dumps(["e2e4", "e7e5"]))
+
+    async def exercise() -> list[dict[str, Any]]:
+        response = await AsyncClient().get(f"/api/games/{game.id}/events/")
+
+        # The view has read the game; the stream hasn't been iterated yet.
+        hub.publish(game.pk, {"ply": 2, "uci": "e7e5"})  # already in the snapshot
+        hub.publish(game.pk, {"ply": 3, "uci": "g1f3"})
+
+        chunks = aiter(response.streaming_content)  # type: ignore[attr-defined]
+        events = []
+        for _ in range(2):
+            chunk = await asyncio.wait_for(anext(chunks), timeout=5)
+            events.append(json.loads(chunk.decode().split("data: ")[1]))
+        await chunks.aclose()
+        return events
+
+    snapshot, update = asyncio.run(exercise())
+
+    assert snapshot["ply"] == 2
+    assert update == {"ply": 3, "uci": "g1f3"}
+    assert hub.subscriber_count(game.pk) == 0
+
+
+@pytest.mark.django_db
+def test_events_endpoint_unknown_game() -> None:
+    async def exercise() -> int:
+        response = await AsyncClient().get(f"/api/games/{uuid.uuid4()}/events/")
+        return response.status_code
+
+    assert asyncio.run(exercise()) == 404
+    assert hub.subscriber_count() == 0
@@ -0,0 +1,140 @@
+import json
+
+import chess
+import pytest
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client
+
+from django_chess.app.explorer import moves_from, position_key, record_games
+from django_chess.app.models import Game, PositionMove
+from django_chess.app.utils import load_board, save_board
+
+SCHOLARS_MATE = ["e2e4", "e7e5", "f1c4", "b8c6", "d1h5", "g8f6", "h5f7"]
+
+
+def test_position_key_fits_in_a_signed_bigint() -> None:
+    for fen in [chess.STARTING_FEN, "8/8/8/8/8/8/8/K6k w - - 0 1"]:
+        key = position_key(chess.Board(fen))
+        assert -(1 << 63) <= key < (1 << 63)
+
+
+def test_position_key_ignores_move_counters() -> None:
+    assert position_key(chess.Board("8/8/8/8/8/8/8/K6k w - - 0 1")) == position_key(
+        chess.Board("8/8/8/8/8/8/8/K6k w - - 12 40")
+    )
+
+
+@pytest.mark.django_db
+def test_record_games_aggregates_counts_and_results() -> None:
+    record_games(
+        [
+            (SCHOLARS_MATE, "1-0"),
+            (["e2e4", "c7c5"], "0-1"),
+            (["d2d4"], "1/2-1/2"),
+            (["e2e4"], "*"),
+        ]
+    )
+
+    rows = {row.move: row for row in moves_from(chess.Board())}
+    assert rows["e2e4"].games == 3
+    assert (rows["e2e4"].white_wins, rows["e2e4"].draws, rows["e2e4"].black_wins) == (1, 0, 1)
+    assert rows["d2d4"].games == 1
+    assert rows["d2d4"].draws == 1
+
+    # Recording again increments rather than replacing.
+    record_games([(["d2d4"], "1-0")])
+    d4 = PositionMove.objects.get(zobrist_hash=position_key(chess.Board()), move="d2d4")
+    assert (d4.games, d4.white_wins, d4.draws) == (2, 1, 1)
+
+
+@pytest.mark.django_db
+def test_record_games_counts_repeated_positions_once_per_game() -> None:
+    knights_shuffle = ["g1f3", "g8f6", "f3g1", "f6g8"] * 2
+    record_games([(knights_shuffle, "1/2-1/2")])
+
+    (nf3,) = [row for row in moves_from(chess.Board()) if row.move == "g1f3"]
+    assert nf3.games == 1
+
+
+@pytest.mark.django_db
+def test_save_board_records_completed_game_once() -> None:
+    game = Game.objects.create()
+    game.moves = json.dumps(SCHOLARS_MATE[:-1])
+    game.save()
+
+    board = load_board(game=game)
+    board.push(chess.Move.from_uci(SCHOLARS_MATE[-1]))
+    save_board(board=board, game=game)
+    save_board(board=board, game=game)
+
+    game.refresh_from_db()
+    assert game.in_explorer
+    (e4,) = [row for row in moves_from(chess.Board()) if row.move == "e2e4"]
+    assert (e4.games, e4.white_wins) == (1, 1)
+
+
+@pytest.mark.django_db
+def test_save_board_ignores_games_in_progress() -> None:
+    game = Game.objects.create()
+    board = chess.Board()
+    board.push(chess.Move.from_uci("e2e4"))
+    save_board(board=board, game=game)
+
+    assert not PositionMove.objects.exists()
+
+
+@pytest.mark.django_db
+def test_rebuild_explorer_command() -> None:
+    Game.objects.create(in_progress=False, moves=json.dumps(SCHOLARS_MATE))
+    Game.objects.create(in_progress=True, moves=json.dumps(["d2d4"]))
+    record_games([(["c2c4"], "1-0")])  # stale data that the rebuild should discard
+
+    call_command("rebuild_explorer")
+
+    assert {row.move for row in moves_from(chess.Board())} == {"e2e4"}
+    assert Game.objects.filter(in_explorer=True).count() == 1
+
+
+def _explorer_counts() -> set[tuple[int, str, int, int, int, int]]:
+    return set(
+        PositionMove.objects.values_list("zobrist_hash", "move", "games", "white_wins", "draws", "black_wins")
+    )
+
+
+@pytest.mark.django_db
+def test_import_and_rebuild_agree() -> None:
+    pgn = (
+        '[Result "0-1"]\n\n1. f3 e5 2. g4 Qh4# 0-1\n\n'
+        '[Result "1-0"]\n\n1. e4 e5 2. Nf3 1-0\n\n'  # resigned: not an outcome on the board
+        '[Result "*"]\n\n1. d4 *\n'
+    )
+    response = Client().post("/pgn/", {"imported_pgn": SimpleUploadedFile("three.pgn", pgn.encode())})
+    assert response.status_code == 302
+
+    imported = _explorer_counts()
+    assert {row.move for row in moves_from(chess.Board())} == {"f2f3"}
+    assert Game.objects.filter(in_explorer=True, in_progress=False).count() == 1
+    assert Game.objects.filter(in_explorer=False, in_progress=True).count() == 2
+
+    call_command("rebuild_explorer")
+
+    assert _explorer_counts() == imported
+
+
+@pytest.mark.django_db
+def test_imported_game_joins_the_explorer_when_finished() -> None:
+    pgn = "1. e4 e5 2. Bc4 Nc6 3. Qh5 Nf6 *\n"
+    Client().post("/pgn/", {"imported_pgn": SimpleUploadedFile("unfinished.pgn", pgn.encode())})
+    game = Game.objects.get()
+    assert not PositionMove.objects.exists()
+
+    board = load_board(game=game)
+    board.push(chess.Move.from_uci(SCHOLARS_MATE[-1]))
+    save_board(board=board, game=game)
+
+    game.refresh_from_db()
+    assert game.in_explorer
+    (e4,) = [row for row in moves_from(chess.Board()) if row.move == "e2e4"]
+    assert (e4.games, e4.white_wins) == (1, 1)
@@ -0,0 +1,130 @@
+import concurrent.futures
+import threading
+import uuid
+from typing import Any, Callable
+
+import chess
+import pytest
+
+from django.db import transaction
+from django.test import override_settings
+
+from django_chess.app import group_commit, metrics
+from django_chess.app.group_commit import GroupCommitWriter
+from django_chess.app.models import Game, StaleGameError
+from django_chess.app.utils import save_board
+
+
+def _submit_together(writer: GroupCommitWriter, funcs: list[Callable[[], Any]]) -> list[concurrent.futures.Future[Any]]:
+    start = threading.Barrier(len(funcs))
+
+    def submit(func: Callable[[], Any]) -> Any:
+        start.wait()
+        return writer.submit(func)
+
+    with concurrent.futures.ThreadPoolExecutor(len(funcs)) as pool:
+        return [pool.submit(submit, func) for func in funcs]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_writes_arriving_together_commit_in_one_transaction() -> None:
+    writer = GroupCommitWriter(window=0.5, max_batch=4, timeout=10)
+    happened: list[str] = []
+
+    def write(n: int) -> Callable[[], int]:
+        def func() -> int:
+            happened.append(f"write {n}")
+            transaction.on_commit(lambda: happened.append(f"commit {n}"))
+            return n
+
+        return func
+
+    futures = _submit_together(writer, [write(n) for n in range(4)])
+
+    assert sorted(f.result() for f in futures) == [0, 1, 2, 3]
+    assert [h.split()[0] for h in happened] == ["write"] * 4 + ["commit"] * 4
+
+
+@pytest.mark.django_db(transaction=True)
+def test_one_failed_write_leaves_the_rest_of_the_batch_alone() -> None:
+    writer = GroupCommitWriter(window=0.5, max_batch=3, timeout=10)
+
+    def stale() -> None:
+        Game.objects.create(name="rolled back")
+        raise StaleGameError(uuid.uuid4(), 4)
+
+    futures = _submit_together(
+        writer, [lambda: Game.objects.create(name="first"), stale, lambda: Game.objects.create(name="second")]
+    )
+
+    outcomes = [f.exception() for f in futures]
+    assert sum(isinstance(e, StaleGameError) for e in outcomes) == 1
+    assert sorted(Game.objects.values_list("name", flat=True)) == ["first", "second"]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_writer_outlives_a_failed_batch(monkeypatch: pytest.MonkeyPatch) -> None:
+    writer = GroupCommitWriter(window=0, max_batch=1, timeout=10)
+    observe = metrics.group_commit_batch_size.observe
+    failures = [OSError("No space left on device")]
+
+    def flaky(value: float) -> None:
+        if failures:
+            raise failures.pop()
+        observe(value)
+
+    monkeypatch.setattr(metrics.group_commit_batch_size, "observe", flaky)
+
+    with pytest.raises(OSError):
+        writer.submit(lambda: Game.objects.create(name="lost"))
+    writer.submit(lambda: Game.objects.create(name="saved"))
+
+    assert list(Game.objects.values_list("name", flat=True)) == ["saved"]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_a_write_the_writer_doesnt_get_to_in_time_is_dropped() -> None:
+    writer = GroupCommitWriter(window=0, max_batch=1, timeout=0.5)
+    busy = threading.Event()
+    release = threading.Event()
+
+    def hold() -> None:
+        busy.set()
+        release.wait(10)
+
+    with concurrent.futures.ThreadPoolExecutor(1) as pool:
+        held = pool.submit(writer.submit, hold)
+        busy.wait(10)
+        with pytest.raises(TimeoutError):
+            writer.submit(lambda: Game.objects.create(name="too late"))
+        release.set()
+        held.result()
+
+    writer.submit(lambda: None)  # the writer has been past the dropped write
+    assert not Game.objects.exists()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_save_board_goes_through_the_writer_when_enabled(monkeypatch: pytest.MonkeyPatch) -> None:
+    threads: set[str] = set()
+    submit = GroupCommitWriter.submit
+
+    def spy(self: GroupCommitWriter, func: Callable[[], Any], **kwargs: Any) -> Any:
+        def noted() -> Any:
+            threads.add(threading.current_thread().name)
+            return func()
+
+        return submit(self, noted, **kwargs)
+
+    monkeypatch.setattr(GroupCommitWriter, "submit", spy)
+    game = Game.objects.create()
+    board = chess.Board()
+    board.push_uci("e2e4")
+
+    with override_settings(GROUP_COMMIT_ENABLED=True):
+        save_board(board=board, game=game)
+
+    game.refresh_from_db()
+    assert game.ply == 1
+    assert threads == {"group-commit"}
+    assert group_commit.writer() is group_commit.writer()
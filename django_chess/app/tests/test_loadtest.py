@@ -0,0 +1,105 @@
+import asyncio
+import io
+import socket
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from django.core.management import call_command
+from django.db import connections
+
+from django_chess.app.models import Game
+from django_chess.benchmarks import loadtest
+
+
+def test_percentile_is_nearest_rank() -> None:
+    ordered = [float(n) for n in range(1, 101)]
+
+    assert loadtest.percentile(ordered, 50) == 50.0
+    assert loadtest.percentile(ordered, 99) == 99.0
+    assert loadtest.percentile([7.0], 95) == 7.0
+
+
+def test_recorder_summary_counts_errors_and_lock_failures() -> None:
+    recorder = loadtest.Recorder()
+    recorder.record("GET /a", 0.010, 200, b"")
+    recorder.record("GET /a", 0.030, 500, b"OperationalError: database is locked")
+    recorder.record("POST /b", 0.020, 409, b"")
+    recorder.elapsed = 1.0
+
+    summary = recorder.summary()
+
+    assert summary["requests"] == 3
+    assert summary["requests_per_s"] == 3.0
+    assert summary["db_locked"] == 1
+    assert summary["errors"] == {"GET /a -> 500": 1, "POST /b -> 409": 1}
+    assert summary["endpoints"]["GET /a"]["p50_ms"] == 10.0
+    assert summary["endpoints"]["GET /a"]["max_ms"] == 30.0
+
+
+def test_dechunk() -> None:
+    assert loadtest._dechunk(b"4\r\nWiki\r\n5;ext=1\r\npedia\r\n0\r\n\r\n") == b"Wikipedia"
+
+
+@pytest.fixture
+def database_file(tmp_path: Path, django_db_blocker: Any) -> Iterator[Path]:
+    """Points every SQLite alias at a migrated file in tmp_path for the length of a test.
+
+    Django runs each ASGI request on its own thread, and concurrent writers to pytest's
+    shared-cache in-memory database fail with "table is locked" at once rather than queueing on
+    busy_timeout as they do on a database file.
+    """
+    path = tmp_path / "db.sqlite3"
+    saved = {alias: (connections[alias], connections.settings[alias]["NAME"]) for alias in connections}
+    with django_db_blocker.unblock():
+        for alias in connections:
+            # The in-memory database lives as long as its connection, so keep that one open.
+            connections.settings[alias]["NAME"] = str(path)
+            connections[alias] = connections.create_connection(alias)
+        call_command("migrate", verbosity=0, interactive=False)
+        try:
+            yield path
+        finally:
+            for alias, (connection, name) in saved.items():
+                connections[alias].close()
+                connections.settings[alias]["NAME"] = name
+                connections[alias] = connection
+
+
+@pytest.mark.django_db(transaction=True)
+def test_players_play_through_the_asgi_app(database_file: Path) -> None:
+    from django_chess.asgi import application
+
+    recorder = asyncio.run(
+        loadtest.run(
+            loadtest.ASGITransport(application),
+            players=3,
+            moves=4,
+            polls=2,
+            poll_interval=0,
+            think_time=0,
+            black_smartness=0,
+        )
+    )
+    summary = recorder.summary()
+
+    assert summary["errors"] == {}
+    assert summary["games"] == 3
+    assert Game.objects.count() == 3
+    assert summary["endpoints"]["POST /api/games/<id>/moves/"]["requests"] == summary["moves"]
+    assert summary["endpoints"]["GET /api/games/<id>/moves/?since="]["requests"] == 2 * summary["moves"]
+
+
+def test_command_reports_connection_errors() -> None:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]  # nothing listens here once the socket closes
+
+    stdout = io.StringIO()
+    call_command("loadtest", "--players", "2", "--url", f"http://127.0.0.1:{port}", stdout=stdout)
+
+    output = stdout.getvalue()
+    assert "0 game(s)" in output
+    assert "2 x GET /api/games/ -> connection error" in output
@@ -0,0 +1,63 @@
+import io
+import json
+from pathlib import Path
+
+import chess
+import pytest
+
+from django.core.management import call_command
+from django.test import override_settings
+
+from django_chess.benchmarks import memory
+
+
+def test_deep_sizeof_counts_shared_objects_once() -> None:
+    board = chess.Board()
+    for uci in ["e2e4", "e7e5", "g1f3"]:
+        board.push_uci(uci)
+
+    assert memory.deep_sizeof(board) > memory.deep_sizeof(chess.Board())
+    assert memory.deep_sizeof([board, board]) == memory.deep_sizeof([board]) + 8
+
+
+def test_board_sizes_grow_with_the_game() -> None:
+    rows = memory.board_sizes([10, 100])
+
+    assert rows[0]["board"] < rows[1]["board"]
+    assert rows[1]["board"] < rows[1]["annotated_board"] < rows[1]["cache_entry"]
+    assert rows[1]["bytes_per_ply"] > 0
+
+
+def test_measure_reports_what_the_call_keeps() -> None:
+    result = memory.measure(lambda: [bytearray(1000) for _ in range(100)])
+
+    assert result["retained_bytes"] >= 100_000
+    assert result["peak_bytes"] >= result["retained_bytes"]
+    assert "test_memory.py:" in result["top_retained"][0]["site"]
+
+
+@pytest.mark.django_db
+def test_memory_profile_command(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    # pytest-django has already set up the test environment and database.
+    from django_chess.app.management.commands import memory_profile
+
+    for name in ["setup_test_environment", "setup_databases", "teardown_databases", "teardown_test_environment"]:
+        monkeypatch.setattr(memory_profile, name, lambda *args, **kwargs: None)
+
+    output = tmp_path / "memory.json"
+    stdout = io.StringIO()
+    with override_settings(BOARD_CACHE_SIZE=16):
+        call_command(
+            "memory_profile",
+            "--games", "2",
+            "--workload", "load_board",
+            "--workload", "GameDetailSerializer",
+            "--output", str(output),
+            stdout=stdout,
+        )
+
+    report = json.loads(output.read_text())
+    assert list(report["workloads"]) == ["load_board", "GameDetailSerializer"]
+    assert report["workloads"]["load_board"]["board_cache"]["entries"] == 2
+    assert "load_board x 2 game(s)" in stdout.getvalue()
+    assert "cache entry" in stdout.getvalue()
@@ -0,0 +1,145 @@
+import os
+from pathlib import Path
+
+import chess
+import pytest
+
+from django.test import Client, override_settings
+
+from django_chess.app import metrics
+from django_chess.app.models import Game
+from django_chess.app.utils import board_cache, load_board, save_board
+
+hits = ("django_chess_cache_requests_total", (("cache", "board"), ("result", "hit")), "")
+misses = ("django_chess_cache_requests_total", (("cache", "board"), ("result", "miss")), "")
+
+
+def _value(key: metrics.Key) -> float:
+    return metrics.REGISTRY.samples().get(key, 0.0)
+
+
+def test_exposition_format() -> None:
+    requests = ("django_chess_requests_total", (("route", "t"), ("method", "GET"), ("status", "200")), "")
+    before = _value(requests)
+    metrics.requests_total.inc(route="t", method="GET", status=200)
+    metrics.request_seconds.observe(0.02, route="t", method="GET")
+    metrics.request_seconds.observe(30, route="t", method="GET")
+
+    text = metrics.exposition()
+
+    assert "# TYPE django_chess_request_duration_seconds histogram" in text
+    assert f'django_chess_requests_total{{route="t",method="GET",status="200"}} {int(before) + 1}' in text
+
+    buckets = [
+        line for line in text.splitlines()
+        if line.startswith('django_chess_request_duration_seconds_bucket{route="t"')
+    ]
+    counts = [float(line.split()[-1]) for line in buckets]
+    assert counts == sorted(counts)  # cumulative
+    assert buckets[-1].startswith('django_chess_request_duration_seconds_bucket{route="t",method="GET",le="+Inf"}')
+    assert counts[-1] - counts[-2] >= 1  # the 30s observation is only in +Inf
+
+
+def test_samples_sum_across_process_files(tmp_path: Path) -> None:
+    in_flight = ("django_chess_engines_in_flight", (), "")
+    games = ("django_chess_pgn_import_games_total", (), "")
+
+    with override_settings(METRICS_DIR=str(tmp_path)):
+        metrics.pgn_import_games.inc(2)
+        metrics.engines_in_flight.inc()
+
+        # A sibling worker that's still running, and one that has exited.
+        for pid in [os.getppid(), 2 ** 22 + 1]:
+            other = metrics._FileStore(tmp_path / f"{pid}.metrics")
+            other.add(games, 3)
+            other.add(in_flight, 1)
+            other.close()
+
+        samples = metrics.REGISTRY.samples()
+        metrics.engines_in_flight.dec()
+
+    assert samples[games] == 2 + 3 + 3
+    assert samples[in_flight] == 1 + 1  # the exited process's gauge is ignored
+
+
+def test_file_store_grows_and_reads_back(tmp_path: Path) -> None:
+    store = metrics._FileStore(tmp_path / "1.metrics")
+    keys = [("m", (("n", str(n)),), "") for n in range(3000)]
+    for n, key in enumerate(keys):
+        store.add(key, n)
+        store.add(key, 0.5)
+    store.close()
+
+    read = dict(metrics._FileStore.read(tmp_path / "1.metrics"))
+
+    assert len(read) == len(keys)
+    assert read[keys[2999]] == 2999.5
+
+
+def test_forked_worker_is_counted(tmp_path: Path) -> None:
+    key = ("django_chess_pgn_import_plies_total", (), "")
+
+    with override_settings(METRICS_DIR=str(tmp_path)):
+        metrics.pgn_import_plies.inc(1)
+
+        pid = os.fork()
+        if pid == 0:  # the child
+            metrics.pgn_import_plies.inc(10)
+            os._exit(0)
+        os.waitpid(pid, 0)
+
+        assert _value(key) == 11
+
+
+@pytest.mark.django_db
+def test_metrics_endpoint_reports_requests_by_route() -> None:
+    game = Game.objects.create()
+    client = Client()
+    client.get(f"/api/games/{game.pk}/")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response["Content-Type"].startswith("text/plain; version=0.0.4")
+    text = response.content.decode()
+    assert 'django_chess_request_duration_seconds_count{route="api-game-detail",method="GET"}' in text
+    assert 'django_chess_load_board_seconds_count{annotated="true"}' in text
+
+
+@pytest.mark.django_db
+@override_settings(BOARD_CACHE_SIZE=16)
+def test_board_cache_hands_out_independent_copies() -> None:
+    game = Game.objects.create()
+    board = chess.Board()
+    board.push(chess.Move.from_uci("e2e4"))
+    save_board(board=board, game=game)
+
+    before_hits, before_misses = _value(hits), _value(misses)
+    first = load_board(game=game)
+    first.push(chess.Move.from_uci("e7e5"))
+    second = load_board(game=game)
+    unannotated = load_board(game=game, annotate=False)
+
+    assert [m.uci() for m in second.move_stack] == ["e2e4"]
+    assert getattr(second, "sans") == ["e4"]
+    assert unannotated.move_stack == second.move_stack
+    assert _value(misses) - before_misses == 1
+    assert _value(hits) - before_hits == 2
+
+    # A move saved elsewhere makes the cached replay stale.
+    save_board(board=first, game=game)
+    assert [m.uci() for m in load_board(game=game).move_stack] == ["e2e4", "e7e5"]
+
+
+@pytest.mark.django_db
+def test_board_cache_size_zero_disables_it() -> None:
+    game = Game.objects.create()
+    board_cache.clear()
+
+    with override_settings(BOARD_CACHE_SIZE=0):
+        before = _value(hits) + _value(misses)
+        load_board(game=game)
+        load_board(game=game)
+
+    assert _value(hits) + _value(misses) == before
+    assert len(board_cache.boards) == 0
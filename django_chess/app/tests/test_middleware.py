@@ -0,0 +1,59 @@
+import importlib
+import os
+import subprocess
+import sys
+
+import pytest
+
+from django.conf import settings
+from django.test import Client
+from django.urls import reverse
+
+
+@pytest.mark.django_db
+def test_api_requests_skip_the_stateful_middleware() -> None:
+    page = Client().get(reverse("home"))
+    api = Client().get("/api/games/")
+
+    assert page.status_code == api.status_code == 200
+    assert "X-Frame-Options" in page
+    assert "X-Frame-Options" not in api
+    assert "X-Chess-API-Version" in api  # middleware outside the scoped ones still runs
+
+
+@pytest.mark.django_db
+def test_pages_are_still_csrf_protected() -> None:
+    client = Client(enforce_csrf_checks=True)
+
+    assert client.post(reverse("new-game")).status_code == 403
+    assert client.post("/api/games/", {}, content_type="application/json").status_code == 201
+
+
+@pytest.mark.django_db
+def test_admin_still_has_sessions_and_users() -> None:
+    response = Client().get("/admin/login/")
+
+    assert response.status_code == 200
+    assert "csrftoken" in response.cookies
+
+
+def test_production_drops_the_debug_toolbar() -> None:
+    prod_settings = importlib.import_module("django_chess.prod_settings")
+
+    assert "debug_toolbar" not in prod_settings.INSTALLED_APPS
+    assert not [name for name in prod_settings.MIDDLEWARE if "debug_toolbar" in name]
+    assert "django_chess.app.middleware.PathScopedMiddleware" in prod_settings.MIDDLEWARE
+
+
+def test_production_loads_without_the_debug_toolbar() -> None:
+    # In a process of its own: the app registry can't be loaded twice.
+    result = subprocess.run(
+        [sys.executable, str(settings.BASE_DIR / "manage.py"), "show_urls"],
+        env=dict(os.environ, DJANGO_SETTINGS_MODULE="django_chess.prod_settings"),
+        capture_output=True,
+        text=True,
+    )
+
+    assert result.returncode == 0, result.stderr
+    assert "django_chess.app.views.game" in result.stdout
+    assert "__debug__" not in result.stdout
@@ -0,0 +1,44 @@
+import importlib
+from pathlib import Path
+
+import pytest
+
+from django.core.management import call_command
+from django.templatetags.static import static
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from django_chess.app.models import Game
+from django_chess.app.utils import PIECE_SPRITE, piece_sprite
+
+SPRITE = Path(__file__).resolve().parents[1] / "static" / PIECE_SPRITE
+
+
+def test_sprite_is_up_to_date() -> None:
+    assert SPRITE.read_text() == piece_sprite(), 'Run "manage.py piece_sprite"'
+    assert piece_sprite().count("<symbol ") == 12
+
+
+@pytest.mark.django_db
+def test_squares_use_the_sprite() -> None:
+    game = Game.objects.create()
+
+    page = Client().get(reverse("game", kwargs=dict(game_id=game.pk))).content.decode()
+
+    assert page.count(f'<use href="{static(PIECE_SPRITE)}#white-pawn"/>') == 8
+    assert page.count(f'<use href="{static(PIECE_SPRITE)}#black-king"/>') == 1
+    assert "<path" not in page
+
+
+def test_production_caches_the_sprite_for_good(tmp_path: Path) -> None:
+    storages = importlib.import_module("django_chess.prod_settings").STORAGES
+
+    with override_settings(STORAGES=storages, STATIC_ROOT=tmp_path):
+        call_command("collectstatic", interactive=False, verbosity=0)
+        url = static(PIECE_SPRITE)
+        response = Client().get(url)
+
+    assert url != f"/static/{PIECE_SPRITE}"
+    assert response.status_code == 200
+    assert response["Content-Type"] == "image/svg+xml"
+    assert "immutable" in response["Cache-Control"]
@@ -0,0 +1,107 @@
+import collections
+import io
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import Client, override_settings
+
+from django_chess.app import profiling
+from django_chess.app.models import Game
+
+
+def _busy(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def test_sampler_sees_the_busy_function() -> None:
+    sampler = profiling.Sampler(threading.get_ident(), interval=0.001)
+    sampler.start()
+    _busy(0.1)
+    stacks = sampler.stop()
+
+    assert sum(stacks.values()) > 10
+    busy = sum(count for stack, count in stacks.items() if stack.endswith("test_profiling:_busy"))
+    assert busy > sum(stacks.values()) / 2
+
+
+def test_write_profile_keeps_the_newest(tmp_path: Path) -> None:
+    stacks = collections.Counter({"a;b": 2, "a": 1})
+    paths = [
+        profiling.write_profile(stacks, directory=tmp_path, label=f"GET/api/games/{n}/", max_files=3)
+        for n in range(5)
+    ]
+
+    assert sorted(tmp_path.iterdir()) == paths[2:]
+    assert profiling.read_profiles(paths[2:]) == collections.Counter({"a;b": 6, "a": 3})
+
+
+def test_focus_trims_to_the_outermost_matching_frame() -> None:
+    stacks = collections.Counter({
+        "daphne.server:run;django_chess.app.views:game;django_chess.app.utils:load_board;chess:push": 3,
+        "daphne.server:run;asyncio.events:run": 5,
+    })
+
+    assert profiling.focus(stacks, ["django_chess.app"]) == collections.Counter({
+        "django_chess.app.views:game;django_chess.app.utils:load_board;chess:push": 3,
+    })
+
+
+@pytest.mark.django_db
+def test_staff_can_ask_for_a_profile(tmp_path: Path) -> None:
+    game = Game.objects.create()
+    staff = User.objects.create(username="staff", is_staff=True)
+    nobody = User.objects.create(username="nobody")
+
+    with override_settings(PROFILING_DIR=tmp_path, PROFILING_SAMPLE_RATE=0):
+        client = Client()
+        client.force_login(nobody)
+        response = client.get(f"/game/{game.pk}/", headers={"X-Profile": "1"})
+        assert "X-Profile-File" not in response
+        assert list(tmp_path.iterdir()) == []
+
+        client.force_login(staff)
+        response = client.get(f"/game/{game.pk}/", headers={"X-Profile": "1"})
+
+    assert response.status_code == 200
+    profile = tmp_path / response["X-Profile-File"]
+    assert profile.name.endswith(f"-GET_game_{game.pk}_.collapsed")
+    assert list(tmp_path.iterdir()) == [profile]
+
+
+@pytest.mark.django_db
+def test_sample_rate_profiles_anonymous_requests(tmp_path: Path) -> None:
+    game = Game.objects.create()
+
+    with override_settings(PROFILING_DIR=tmp_path, PROFILING_SAMPLE_RATE=1.0):
+        response = Client().get(f"/api/games/{game.pk}/")
+
+    assert response.status_code == 200
+    assert "X-Profile-File" not in response
+    assert len(list(tmp_path.glob("*.collapsed"))) == 1
+
+
+def test_flamegraph_command(tmp_path: Path) -> None:
+    stacks = collections.Counter({
+        "daphne.server:run;django_chess.app.views:game;django_chess.app.utils:load_board": 30,
+        "daphne.server:run;django_chess.app.views:game;django_chess.app.utils:html_for_square": 10,
+    })
+    profiling.write_profile(stacks, directory=tmp_path, label="GET/game/x/", max_files=10)
+    profiling.write_profile(stacks, directory=tmp_path, label="POST/move/x/", max_files=10)
+    output = tmp_path / "out.svg"
+
+    stdout = io.StringIO()
+    call_command("flamegraph", "--dir", str(tmp_path), "--match", "GET", "--output", str(output), stdout=stdout)
+
+    svg = output.read_text()
+    assert svg.startswith("<svg")
+    assert "django_chess.app.utils:load_board (30 samples, 75.0%)" in svg
+    assert "daphne" not in svg
+    assert "40 samples from 1 profile(s)" in stdout.getvalue()
+    assert "75.0%  django_chess.app.utils:load_board" in stdout.getvalue()
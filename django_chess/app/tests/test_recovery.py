@@ -0,0 +1,91 @@
+import asyncio
+import datetime
+import json
+from typing import Any, Mapping
+
+import chess
+import pytest
+
+from django.test import Client, override_settings
+
+from django_chess.app import recovery
+from django_chess.app.models import Game
+from django_chess.app.utils import save_board
+
+
+def _stuck_game() -> Game:
+    game = Game.objects.create(black_smartness=0)
+    board = chess.Board()
+    board.push(chess.Move.from_uci("e2e4"))
+    save_board(board=board, game=game)
+    return game
+
+
+@pytest.mark.django_db
+def test_stuck_game_ids_honors_grace_period() -> None:
+    game = _stuck_game()
+
+    assert recovery.stuck_game_ids(grace=datetime.timedelta(seconds=30)) == []
+    assert recovery.stuck_game_ids(grace=datetime.timedelta(seconds=-1)) == [game.id]
+
+
+@pytest.mark.django_db
+def test_recover_game_makes_blacks_move_once() -> None:
+    game = _stuck_game()
+
+    assert recovery.recover_game(game.id) is not None
+    assert recovery.recover_game(game.id) is None
+
+    game.refresh_from_db()
+    assert len(json.loads(game.moves or "[]")) == 2
+    assert not game.awaiting_ai
+
+
+@pytest.mark.django_db(transaction=True)
+def test_sweep_recovers_games_and_reports_progress(monkeypatch: pytest.MonkeyPatch) -> None:
+    games = [_stuck_game() for _ in range(3)]
+    monkeypatch.setattr(recovery, "progress", recovery.RecoveryProgress())
+    sweeper = recovery.RecoverySweeper(interval=60, grace=-1, games_per_second=0)
+
+    asyncio.run(sweeper.sweep())
+
+    for game in games:
+        game.refresh_from_db()
+        assert not game.awaiting_ai
+    assert recovery.progress.recovered == 3
+    assert recovery.progress.pending == 0
+
+    response = Client().get("/ready/")
+    assert response.status_code == 200
+    assert response.json()["recovered"] == 3
+
+
+@override_settings(RECOVERY_SWEEPER_ENABLED=True, RECOVERY_SWEEP_INTERVAL_SECONDS=3600)
+def test_lifespan_starts_and_stops_sweeper(monkeypatch: pytest.MonkeyPatch) -> None:
+    async def no_sweep(self: recovery.RecoverySweeper) -> None:
+        pass
+
+    monkeypatch.setattr(recovery.RecoverySweeper, "sweep", no_sweep)
+
+    async def app(scope: Any, receive: Any, send: Any) -> None:
+        raise AssertionError("lifespan events shouldn't reach Django")
+
+    lifespan_app = recovery.LifespanApp(app)
+    sent: list[Mapping[str, Any]] = []
+
+    async def exercise() -> None:
+        messages = asyncio.Queue[Mapping[str, Any]]()
+        await messages.put({"type": "lifespan.startup"})
+        await messages.put({"type": "lifespan.shutdown"})
+
+        async def send(message: Mapping[str, Any]) -> None:
+            sent.append(message)
+            if message["type"] == "lifespan.startup.complete":
+                assert lifespan_app.task is not None
+
+        await lifespan_app({"type": "lifespan"}, messages.get, send)
+
+    asyncio.run(exercise())
+
+    assert [m["type"] for m in sent] == ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+    assert lifespan_app.task is None
@@ -4,8 +4,8 @@ import chess
 import chess.engine
 import pytest
 
+from django_chess.app.engine import GNUCHESS_EXECUTABLE
 from django_chess.app.models import Game
-from django_chess.app.views import GNUCHESS_EXECUTABLE
 from django_chess.app.tests import repro_moves
 
 
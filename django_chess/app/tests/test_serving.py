@@ -0,0 +1,107 @@
+import asyncio
+import concurrent.futures
+import json
+import os
+import shlex
+import signal
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Iterator
+
+import chess
+import pytest
+
+from django.conf import settings
+
+from django_chess.app import fake_engine
+from django_chess.benchmarks import loadtest
+
+
+@pytest.fixture
+def server(tmp_path: Path) -> Iterator[tuple[subprocess.Popen[bytes], loadtest.HTTPTransport]]:
+    """"manage.py serve" with one worker, on a scratch database, whose engine thinks for 5s."""
+    manage = [sys.executable, str(settings.BASE_DIR / "manage.py")]
+    env = dict(
+        os.environ,
+        SQLITE_DATA_DIR=str(tmp_path),
+        CHESS_ENGINE_COMMAND=shlex.join(fake_engine.command(think_time=5.0)),
+    )
+    subprocess.run([*manage, "migrate", "--noinput", "--verbosity", "0"], env=env, check=True)
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    process = subprocess.Popen(
+        [*manage, "serve", "--workers", "1", "--port", str(port)],
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        assert process.stdout is not None
+        assert process.stdout.readline().startswith(b"Serving on")
+        yield process, loadtest.HTTPTransport(f"http://127.0.0.1:{port}")
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+
+
+def _request(transport: loadtest.HTTPTransport, method: str, path: str, body: object = None) -> tuple[int, bytes]:
+    status, _, payload = asyncio.run(
+        transport.request(method, path, body=json.dumps(body).encode() if body is not None else b"")
+    )
+    return status, payload
+
+
+def test_a_rolling_restart_lets_engine_calls_finish(
+    server: tuple[subprocess.Popen[bytes], loadtest.HTTPTransport],
+) -> None:
+    process, transport = server
+    status, payload = _request(transport, "POST", "/api/games/", {"black_smartness": 10})
+    assert status == 201
+    game_id = json.loads(payload)["id"]
+
+    with concurrent.futures.ThreadPoolExecutor(1) as pool:
+        move = pool.submit(_request, transport, "POST", f"/api/games/{game_id}/moves/", {"move": "e2e4"})
+        while not move.running():
+            pass
+        # The old worker is drained once its replacement is listening, well inside the 5s.
+        process.send_signal(signal.SIGHUP)
+
+        status, payload = move.result(timeout=30)
+
+    assert status == 200
+    reply = fake_engine.choose_move(chess.Board("rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1"))
+    assert reply is not None
+    assert json.loads(payload)["ai_response"] == reply.uci()  # the engine's, not a random fallback
+    assert _request(transport, "GET", f"/api/games/{game_id}/")[0] == 200  # from the new worker
+
+    process.send_signal(signal.SIGTERM)
+    assert process.wait(timeout=30) == 0
+
+
+def test_draining_ends_event_streams(
+    server: tuple[subprocess.Popen[bytes], loadtest.HTTPTransport],
+) -> None:
+    process, transport = server
+    status, payload = _request(transport, "POST", "/api/games/", {"black_smartness": 0})
+    game_id = json.loads(payload)["id"]
+
+    with socket.create_connection((transport.host, transport.port), timeout=10) as stream:
+        stream.sendall(f"GET /api/games/{game_id}/events/ HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+        received = stream.recv(65536)
+        while b"data:" not in received:
+            received += stream.recv(65536)
+
+        # An open stream would otherwise hold the worker for all of SERVER_DRAIN_TIMEOUT_SECONDS.
+        started = time.monotonic()
+        process.send_signal(signal.SIGTERM)
+        while chunk := stream.recv(65536):
+            received += chunk
+
+    assert process.wait(timeout=30) == 0
+    assert time.monotonic() - started < 10
@@ -0,0 +1,114 @@
+import io
+import uuid
+from typing import Any, Iterator
+
+import chess
+import pytest
+
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import Client, override_settings
+
+from django_chess.app import sharding
+from django_chess.app.models import Game
+from django_chess.app.utils import save_board
+
+
+def _game_id(shard: int, count: int = 2) -> uuid.UUID:
+    """A UUID whose prefix puts it on ``shard`` of ``count``."""
+    while sharding.shard_index(game_id := uuid.uuid4(), count) != shard:
+        pass
+    return game_id
+
+
+@pytest.fixture(scope="module")
+def games1_database(
+    tmp_path_factory: pytest.TempPathFactory, django_db_setup: None, django_db_blocker: Any
+) -> Iterator[None]:
+    """A games1 shard in a file, next to pytest's "default" database (so, set up after it)."""
+    connections.settings["games1"] = dict(
+        connections.settings[DEFAULT_DB_ALIAS], NAME=tmp_path_factory.mktemp("shards") / "games1.sqlite3"
+    )
+    try:
+        with django_db_blocker.unblock(), override_settings(GAME_SHARDS=["default", "games1"]):
+            call_command("migrate", database="games1", verbosity=0)
+        yield
+    finally:
+        connections["games1"].close()
+        del connections["games1"]
+        del connections.settings["games1"]
+
+
+@pytest.fixture
+def two_shards(games1_database: None) -> Iterator[None]:
+    with override_settings(GAME_SHARD_COUNT=2, GAME_SHARDS=["default", "games1"]):
+        yield
+        # pytest-django's flush only empties the tables the routers allow on games1, and it
+        # runs once this override is gone.
+        Game.objects.using("games1").all().delete()
+
+
+sharded_db = pytest.mark.django_db(transaction=True, databases=["default", "games1"])
+
+
+def test_prefixes_split_evenly() -> None:
+    assert sharding.shard_index(uuid.UUID(int=0), 4) == 0
+    assert sharding.shard_index(uuid.UUID("3fffffff-ffff-4fff-bfff-ffffffffffff"), 4) == 0
+    assert sharding.shard_index(uuid.UUID("40000000-0000-4000-8000-000000000000"), 4) == 1
+    assert sharding.shard_index(uuid.UUID(int=2**128 - 1), 4) == 3
+
+
+def test_one_shard_routes_nothing() -> None:
+    assert sharding.shard_for(uuid.uuid4()) == "default"
+    assert Game.objects.filter(pk=uuid.uuid4())._db is None  # type: ignore[attr-defined]
+
+
+@sharded_db
+def test_games_are_saved_read_and_updated_on_their_shard(two_shards: None) -> None:
+    game = Game.objects.create(id=_game_id(1), black_smartness=0)
+    board = chess.Board()
+    board.push_uci("e2e4")
+    board.push_uci("e7e5")
+    save_board(board=board, game=game)
+
+    assert not Game.objects.using("default").filter(pk=game.pk).exists()
+    assert Game.objects.using("games1").get(pk=game.pk).ply == 2
+    assert Game.objects.get(pk=game.pk).ply == 2
+
+    response = Client().post(f"/move/{game.pk}/", {"move": "g1f3"})
+    assert response.status_code == 302
+    assert Game.objects.filter(pk=str(game.pk)).first().ply == 4  # type: ignore[union-attr]
+
+
+@sharded_db
+def test_listings_fan_out_across_shards(two_shards: None) -> None:
+    games = [Game(id=_game_id(n % 2), name=f"game {n}", in_progress=False) for n in range(6)]
+    Game.objects.bulk_create(games)
+
+    assert Game.objects.using("games1").count() == 3
+    assert sharding.count(Game.objects.all()) == 6
+    names = [game.name for game in sharding.fan_out(Game.objects.order_by("-name"))]
+    assert names == [f"game {n}" for n in reversed(range(6))]
+
+    response = Client().get("/api/games/")
+    assert len(response.json()) == 6
+
+
+@sharded_db
+def test_rebalance_moves_misplaced_games(two_shards: None) -> None:
+    stay, move = _game_id(0), _game_id(1)
+    with override_settings(GAME_SHARD_COUNT=1, GAME_SHARDS=["default"]):
+        Game.objects.create(id=stay)
+        Game.objects.create(id=move)
+    modified = Game.objects.using("default").get(pk=move).modified
+
+    stdout = io.StringIO()
+    call_command("rebalance_shards", "--dry-run", stdout=stdout)
+    assert "Would move 1 game(s) from default to games1" in stdout.getvalue()
+    assert Game.objects.using("default").count() == 2
+
+    call_command("rebalance_shards", stdout=io.StringIO())
+
+    assert list(Game.objects.using("default").values_list("pk", flat=True)) == [stay]
+    assert Game.objects.using("games1").get(pk=move).modified == modified
+    assert Game.objects.get(pk=move).pk == move
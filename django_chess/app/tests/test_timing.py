@@ -0,0 +1,75 @@
+import chess
+import pytest
+
+from django.test import Client, override_settings
+
+from django_chess.app import fake_engine, timing
+from django_chess.app.engine import engine_play
+from django_chess.app.models import Game
+from django_chess.app.utils import get_squares_none_selected, save_board
+
+
+def _metrics(header: str) -> dict[str, str]:
+    return {metric.split(";")[0]: metric for metric in header.split(", ")}
+
+
+def test_timed_is_a_no_op_outside_collect() -> None:
+    with timing.timed("replay"):
+        pass
+
+    with timing.collect() as timings:
+        pass
+
+    assert timings.seconds == {}
+
+
+def test_collect_accumulates_spans_and_formats_header() -> None:
+    with timing.collect() as timings:
+        for _ in range(3):
+            with timing.timed("render"):
+                pass
+        with timing.timed("db"):
+            pass
+
+    assert timings.counts == {"render": 3, "db": 1}
+
+    metrics = _metrics(timings.header(total=0.0125))
+    assert metrics["render"].endswith('desc="3 calls"')
+    assert metrics["db"].endswith('desc="1 query"')
+    assert metrics["total"] == "total;dur=12.50"
+
+
+def test_board_renderer_and_engine_spans() -> None:
+    board = chess.Board()
+    with timing.collect() as timings, override_settings(CHESS_ENGINE_COMMAND=fake_engine.command()):
+        list(get_squares_none_selected(board=board, game_id="00000000-0000-0000-0000-000000000000"))
+        board.push(chess.Move.from_uci("e2e4"))
+        engine_play(board, smartness=10)
+
+    assert timings.counts == {"render": 64, "engine": 1}
+
+
+@pytest.mark.django_db
+def test_api_response_has_server_timing() -> None:
+    game = Game.objects.create()
+    board = chess.Board()
+    board.push(chess.Move.from_uci("e2e4"))
+    save_board(board=board, game=game)
+
+    with override_settings(SERVER_TIMING_ENABLED=True):
+        response = Client().get(f"/api/games/{game.pk}/")
+
+    metrics = _metrics(response["Server-Timing"])
+    assert {"db", "replay", "serialize", "total"} <= set(metrics)
+    assert 'desc="1 query"' in metrics["db"]
+
+
+@pytest.mark.django_db
+def test_no_header_when_disabled() -> None:
+    game = Game.objects.create()
+
+    with override_settings(SERVER_TIMING_ENABLED=False):
+        response = Client().get(f"/api/games/{game.pk}/")
+
+    assert response.status_code == 200
+    assert "Server-Timing" not in response
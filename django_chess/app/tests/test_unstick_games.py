@@ -0,0 +1,98 @@
+import io
+import json
+import threading
+import time
+
+import chess
+import pytest
+
+from django.core.management import call_command
+
+from django_chess.app.management.commands import unstick_games
+from django_chess.app.models import Game
+from django_chess.app.utils import load_board, save_board
+
+
+def _game_with_moves(ucis: list[str], **kwargs: object) -> Game:
+    game = Game.objects.create(black_smartness=0, **kwargs)
+    board = chess.Board()
+    for uci in ucis:
+        board.push(chess.Move.from_uci(uci))
+    save_board(board=board, game=game)
+    return game
+
+
+@pytest.mark.django_db
+def test_save_board_tracks_awaiting_ai() -> None:
+    assert _game_with_moves(["e2e4"]).awaiting_ai
+    assert not _game_with_moves(["e2e4", "e7e5"]).awaiting_ai
+    # Fool's mate: black delivered mate, so nobody is waiting on anything.
+    assert not _game_with_moves(["f2f3", "e7e5", "g2g4", "d8h4"]).awaiting_ai
+
+
+@pytest.mark.django_db
+def test_unstick_games_replies_for_black() -> None:
+    stuck = [_game_with_moves(["e2e4"]) for _ in range(5)]
+    fine = _game_with_moves(["e2e4", "e7e5"])
+
+    call_command("unstick_games", "--workers", "3", stdout=io.StringIO())
+
+    for game in stuck:
+        game.refresh_from_db()
+        assert len(json.loads(game.moves or "[]")) == 2
+        assert not game.awaiting_ai
+        assert load_board(game=game).turn == chess.WHITE
+
+    fine.refresh_from_db()
+    assert json.loads(fine.moves or "[]") == ["e2e4", "e7e5"]
+
+
+@pytest.mark.django_db
+def test_unstick_games_dry_run_changes_nothing() -> None:
+    game = _game_with_moves(["e2e4"])
+    out = io.StringIO()
+
+    call_command("unstick_games", "--dry-run", stdout=out)
+
+    game.refresh_from_db()
+    assert game.awaiting_ai
+    assert str(game.id) in out.getvalue()
+
+
+@pytest.mark.django_db
+def test_unstick_games_respects_time_budget() -> None:
+    game = _game_with_moves(["e2e4"])
+    out = io.StringIO()
+
+    call_command("unstick_games", "--time-budget", "0", stdout=out)
+
+    game.refresh_from_db()
+    assert game.awaiting_ai
+    assert "1 game(s) left" in out.getvalue()
+
+
+@pytest.mark.django_db
+def test_unstick_games_doesnt_wait_out_running_engine_calls(monkeypatch: pytest.MonkeyPatch) -> None:
+    games = [_game_with_moves(["e2e4"]) for _ in range(2)]
+    release = threading.Event()
+
+    def slow_engine(board: chess.Board, smartness: int) -> chess.Move:
+        release.wait(10)
+        return next(iter(board.legal_moves))
+
+    monkeypatch.setattr(unstick_games, "get_black_move", slow_engine)
+    out = io.StringIO()
+
+    started = time.monotonic()
+    try:
+        call_command("unstick_games", "--workers", "2", "--time-budget", "0.2", stdout=out)
+        elapsed = time.monotonic() - started
+    finally:
+        release.set()
+
+    assert elapsed < 2
+    assert "2 game(s) left" in out.getvalue()
+    assert "recovery sweeper" in out.getvalue()
+    for game in games:
+        game.refresh_from_db()
+        assert game.awaiting_ai
@@ -0,0 +1,104 @@
+"""
+Per-request timing breakdown, sent to the client as a Server-Timing header.
+
+ServerTimingMiddleware (in middleware.py) collects a ``Timings`` for each request; the
+expensive layers mark themselves with ``timed(...)``, as a ``with`` block or a decorator:
+
+    db         every SQL statement, via a connection execute wrapper
+    replay     load_board
+    render     html_for_square, once per square drawn
+    serialize  the API serializers' to_representation
+    engine     engine_play, including process startup
+
+Spans may nest (serialize usually includes a replay), so they needn't add up to ``total``.
+Outside a collecting request -- SERVER_TIMING_ENABLED off, management commands, worker
+threads -- ``timed`` costs one context-variable lookup.
+"""
+import contextlib
+import contextvars
+import functools
+import time
+from typing import Any, Callable, Iterator, TypeVar, cast
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+_current: contextvars.ContextVar["Timings | None"] = contextvars.ContextVar("server_timing", default=None)
+
+
+class Timings:
+    """Accumulated seconds and call counts for each named span."""
+
+    def __init__(self) -> None:
+        self.seconds: dict[str, float] = {}
+        self.counts: dict[str, int] = {}
+
+    def add(self, name: str, seconds: float) -> None:
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    def header(self, *, total: float | None = None) -> str:
+        """Format as a Server-Timing header value; durations are in milliseconds."""
+        metrics = []
+        for name, seconds in self.seconds.items():
+            metric = f"{name};dur={seconds * 1000:.2f}"
+            count = self.counts[name]
+            if name == "db":
+                metric += f';desc="{count} {"query" if count == 1 else "queries"}"'
+            elif count > 1:
+                metric += f';desc="{count} calls"'
+            metrics.append(metric)
+
+        if total is not None:
+            metrics.append(f"total;dur={total * 1000:.2f}")
+
+        return ", ".join(metrics)
+
+
+@contextlib.contextmanager
+def collect() -> Iterator[Timings]:
+    """Collect the spans timed within this block (and any threads it hands its context to)."""
+    timings = Timings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+class timed:
+    """
+    Add the time spent in a block, or in calls to a decorated function, to span ``name`` --
+    if anyone is collecting.  A class rather than a @contextmanager, which would build a
+    generator on every call even when nobody is collecting.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.timings: Timings | None = None
+        self.started = 0.0
+
+    def __enter__(self) -> None:
+        self.timings = _current.get()
+        if self.timings is not None:
+            self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info: object) -> None:
+        if self.timings is not None:
+            self.timings.add(self.name, time.perf_counter() - self.started)
+
+    def __call__(self, func: F) -> F:
+        name = self.name
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            timings = _current.get()
+            if timings is None:
+                return func(*args, **kwargs)
+
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timings.add(name, time.perf_counter() - started)
+
+        return cast(F, wrapper)
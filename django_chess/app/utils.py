@@ -1,18 +1,33 @@
 import collections
+import contextlib
 import enum
+import functools
 import json
-from typing import Any, Iterable, Iterator
+import re
+import threading
+import time
+from typing import Any, Callable, Iterable, Iterator, TypeVar
 from uuid import UUID
 
 import chess
 import chess.svg
 
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import QuerySet
 from django.template.loader import render_to_string
+from django.templatetags.static import static
 from django.urls import reverse
 from django.utils.html import format_html
 from django.utils.safestring import SafeString
 
-from django_chess.app.models import Game
+from django_chess.app import group_commit, metrics, sharding
+from django_chess.app.events import hub, move_events
+from django_chess.app.explorer import record_games
+from django_chess.app.models import Game, StaleGameError
+from django_chess.app.timing import timed
+
+T = TypeVar("T")
 
 
 class SquareFlavor(enum.Enum):
@@ -34,6 +49,28 @@ class SquareFlavor(enum.Enum):
     CAPTURABLE_PIECE = enum.auto()
 
 
+# One <symbol> per piece, drawn by python-chess; squares <use> them by piece_symbol_id().
+# Regenerate it with "manage.py piece_sprite" after upgrading python-chess.
+PIECE_SPRITE = "app/pieces.svg"
+
+
+def piece_symbol_id(piece: chess.Piece) -> str:
+    """E.g. "white-king", as python-chess names its drawings."""
+    return f"{chess.COLOR_NAMES[piece.color]}-{chess.piece_name(piece.piece_type)}"
+
+
+def piece_sprite() -> str:
+    """The contents of PIECE_SPRITE."""
+    symbols = []
+    for color in chess.COLORS:
+        for piece_type in chess.PIECE_TYPES:
+            piece = chess.Piece(piece_type, color)
+            # Each drawing is a <g> with the same id as its symbol: drop that, ids being unique.
+            drawing = re.sub(r' id="[^"]*"', "", chess.svg.PIECES[piece.symbol()], count=1)
+            symbols.append(f'<symbol id="{piece_symbol_id(piece)}" viewBox="0 0 45 45">{drawing}</symbol>\n')
+    return '<svg xmlns="http://www.w3.org/2000/svg">\n' + "".join(symbols) + "</svg>\n"
+
+
 def move_button(*, game_id: UUID | str, from_: chess.Square, to: chess.Square) -> Any:
     the_move = chess.Move(from_square=from_, to_square=to)
     label = the_move.uci()
@@ -45,6 +82,7 @@ def move_button(*, game_id: UUID | str, from_: chess.Square, to: chess.Square) -
     )
 
 
+@timed("render")
 def html_for_square(
     *,
     board: chess.Board,
@@ -56,10 +94,15 @@ def html_for_square(
     piece = board.piece_map().get(square, None)
     css_class = "light" if (chess.square_rank(square) - chess.square_file(square)) % 2 else "dark"
 
-    svg_piece = """<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" viewBox="0 0 45 45"></svg>"""
+    # An empty drawing keeps blank squares the same size as the others.
+    svg_piece = SafeString("""<svg viewBox="0 0 45 45"></svg>""")
 
     if piece is not None:
-        svg_piece = chess.svg.piece(piece)
+        svg_piece = format_html(
+            """<svg viewBox="0 0 45 45"><use href="{}#{}"/></svg>""",
+            static(PIECE_SPRITE),
+            piece_symbol_id(piece),
+        )
 
     link_target = button_magic = None
     match flavor:
@@ -191,6 +234,24 @@ def get_squares_with_selection(
     yield from yield_me.items()
 
 
+def describe_outcome(*, winner: chess.Color | None, checkmate: bool) -> str:
+    if winner is None:
+        return "Draw"
+    elif winner:
+        return "White won by checkmate" if checkmate else "White won"
+    else:
+        return "Black won by checkmate" if checkmate else "Black won"
+
+
+def stored_outcome(game: Game) -> str | None:
+    """Describe a finished game's outcome from its stored result, without replaying it."""
+    if game.in_progress or game.result == "*":
+        return None
+
+    winner = {"1-0": chess.WHITE, "0-1": chess.BLACK}.get(game.result)
+    return describe_outcome(winner=winner, checkmate=game.termination == chess.Termination.CHECKMATE.name)
+
+
 def sort_upper_left_first(
     square_string_tuples: Iterable[tuple[chess.Square, str]],
 ) -> Iterable[tuple[chess.Square, str]]:
@@ -201,15 +262,160 @@ def sort_upper_left_first(
 
 
 def save_board(*, board: chess.Board, game: Game) -> None:
-    game.moves = json.dumps([m.uci() for m in board.move_stack])
+    """
+    Store the board's moves on the game in one UPDATE (and, if the game just ended, add it to
+    the explorer in the same transaction), then tell subscribers about each new ply.
+
+    Raises StaleGameError, and saves nothing, if someone else has saved a move since ``game``
+    was read; see Game.save_if_at.  With GROUP_COMMIT_ENABLED the writes are committed along
+    with other requests', by the group commit writer; either way this returns once they have.
+    """
+    previous_ply = game.ply
+    game.record_position(board)
 
     if board.outcome() is not None:
         game.in_progress = False
 
-    game.save()
+    game.awaiting_ai = game.in_progress and board.turn == chess.BLACK
+
+    add_to_explorer = not game.in_progress and not game.in_explorer
+    game.in_explorer = game.in_explorer or add_to_explorer
+    events = move_events(board=board, since=previous_ply, in_progress=game.in_progress)
+    shard = sharding.shard_for(game.pk)
+
+    def write() -> None:
+        # The explorer lives on "default"; only a finished game needs a transaction there too.
+        with sharding.atomic(shard, *([DEFAULT_DB_ALIAS] if add_to_explorer else [])):
+            if game._state.adding:
+                game.save()
+            else:
+                game.save_if_at(previous_ply)
+
+            if add_to_explorer:
+                record_games([([m.uci() for m in board.move_stack], board.result())])
+
+            for event in events:
+                transaction.on_commit(functools.partial(hub.publish, game.pk, event), using=shard)
+
+    group_commit.run(write, using=shard)
+
+
+STALE_GAME_ATTEMPTS = 3
+
+
+def retry_if_stale(func: Callable[[], T]) -> T:
+    """
+    Call ``func`` until it gets through without a StaleGameError, at most STALE_GAME_ATTEMPTS
+    times.  For writers acting on the game's own behalf (black's reply, recovery), whose work
+    is still worth doing on the newer position; ``func`` must re-read the game each time.
+    A person's move, on the other hand, was chosen for the position they saw, so those get a
+    409 instead.
+    """
+    for _ in range(STALE_GAME_ATTEMPTS - 1):
+        try:
+            return func()
+        except StaleGameError:
+            pass
+    return func()
+
+
+@contextlib.contextmanager
+def claim_game(queryset: QuerySet[Game]) -> Iterator[Game | None]:
+    """
+    The first game in ``queryset``, kept from other claimants until the block ends; None if
+    there's no such game, or no free one.
+
+    On PostgreSQL that's SELECT ... FOR UPDATE SKIP LOCKED, in a transaction around the block,
+    so that the stuck-game sweepers of several app servers never answer the same game at once.
+    SQLite has no row locks, and a transaction there would hold the whole database's write
+    lock while the engine thinks; so there, the block just gets the game, and save_if_at stops
+    the second of two writers as usual.
+    """
+    if not connections[queryset.db].features.has_select_for_update:
+        yield queryset.first()
+        return
+
+    with transaction.atomic(using=queryset.db):
+        yield queryset.select_for_update(skip_locked=True).first()
+
+
+def _copy_board(board: chess.Board) -> chess.Board:
+    copied = board.copy()
+    if hasattr(board, "sans"):
+        setattr(copied, "sans", list(getattr(board, "sans")))
+        setattr(copied, "captured_pieces", [list(side) for side in getattr(board, "captured_pieces")])
+    return copied
+
+
+class BoardCache:
+    """
+    The most recently replayed boards, per process, at most BOARD_CACHE_SIZE of them.
+
+    Entries are keyed by game and by whether they carry annotations, and are used only while
+    the game's moves still match what was replayed.  Copies go in and out, so callers are free
+    to push moves onto what they get back.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.boards: collections.OrderedDict[tuple[Any, bool], tuple[str | None, chess.Board]] = (
+            collections.OrderedDict()
+        )
+
+    def get(self, game: Game, *, annotate: bool) -> chess.Board | None:
+        found = None
+        with self.lock:
+            # An annotated board will do when an unannotated one was asked for.
+            for key in [(game.pk, annotate), (game.pk, True)]:
+                entry = self.boards.get(key)
+                if entry is not None and entry[0] == game.moves:
+                    self.boards.move_to_end(key)
+                    found = entry[1]
+                    break
+
+        metrics.cache_requests.inc(cache="board", result="miss" if found is None else "hit")
+        return None if found is None else _copy_board(found)
+
+    def put(self, game: Game, *, annotate: bool, board: chess.Board) -> None:
+        key = (game.pk, annotate)
+        with self.lock:
+            self.boards[key] = (game.moves, _copy_board(board))
+            self.boards.move_to_end(key)
+            while len(self.boards) > settings.BOARD_CACHE_SIZE:
+                self.boards.popitem(last=False)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.boards.clear()
+
+
+board_cache = BoardCache()
+
+
+@timed("replay")
+def load_board(*, game: Game, annotate: bool = True) -> chess.Board:
+    """
+    Replay the game's moves onto a fresh board, or copy a recent replay from the board cache.
+
+    With ``annotate``, the board also gets ``sans`` and ``captured_pieces`` attributes.  SAN
+    rendering is the expensive part of a replay, so callers that don't need either should
+    pass ``annotate=False``.
+    """
+    started = time.perf_counter()
+    use_cache = settings.BOARD_CACHE_SIZE > 0
+
+    board = board_cache.get(game, annotate=annotate) if use_cache else None
+    if board is None:
+        board = _replay(game=game, annotate=annotate)
+        if use_cache:
+            board_cache.put(game, annotate=annotate, board=board)
+
+    metrics.load_board_seconds.observe(time.perf_counter() - started, annotated=str(annotate).lower())
+    metrics.load_board_plies.observe(len(board.move_stack))
+    return board
 
 
-def load_board(*, game: Game) -> chess.Board:
+def _replay(*, game: Game, annotate: bool) -> chess.Board:
     board = chess.Board()
     captured_pieces: list[list[chess.Piece]] = [[], []]
     sans = []
@@ -217,12 +423,14 @@ def load_board(*, game: Game) -> chess.Board:
     if game.moves is not None:
         for m_uci_str in json.loads(game.moves):
             move = chess.Move.from_uci(m_uci_str)
-            if (captured_piece := board.piece_at(move.to_square)) is not None:
-                captured_pieces[captured_piece.color].append(captured_piece)
+            if annotate:
+                if (captured_piece := board.piece_at(move.to_square)) is not None:
+                    captured_pieces[captured_piece.color].append(captured_piece)
 
-            sans.append(board.san(move))
+                sans.append(board.san(move))
             game.promoting_push(board, move)
 
-    setattr(board, "sans", sans)
-    setattr(board, "captured_pieces", [[p.unicode_symbol() for p in l_] for l_ in captured_pieces])
+    if annotate:
+        setattr(board, "sans", sans)
+        setattr(board, "captured_pieces", [[p.unicode_symbol() for p in l_] for l_ in captured_pieces])
     return board
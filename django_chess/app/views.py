@@ -1,30 +1,31 @@
 import io
-import json
 import logging
-import os
-import pathlib
-import random
 
 from uuid import UUID
 
 import chess
-import chess.engine
 import chess.pgn
 
+from django.conf import settings
 from django.core.files.uploadedfile import UploadedFile
 from django.http import (
     HttpRequest,
     HttpResponse,
     HttpResponseNotFound,
     HttpResponseRedirect,
+    JsonResponse,
 )
 from django.shortcuts import get_object_or_404
 from django.template.response import TemplateResponse
 from django.urls import reverse
 from django.views.decorators.http import require_http_methods
 
+from django_chess.app.budgets import query_budget
+from django_chess.app.engine import get_black_move
+from django_chess.app.explorer import record_games
 from django_chess.app.forms import ImportPGNForm
-from django_chess.app.models import Game
+from django_chess.app.models import Game, StaleGameError
+from django_chess.app import metrics, recovery, sharding
 from django_chess.app.utils import (
     get_squares_none_selected,
     get_squares_with_selection,
@@ -37,25 +38,6 @@ from django_chess.app.utils import (
 logger = logging.getLogger(__name__)
 
 
-def _first_existing_executable(candidates: list[str]) -> pathlib.Path | None:
-    for c in candidates:
-        p = pathlib.Path(c)
-        if p.exists() and p.is_file() and os.access(p, os.X_OK):
-            return p
-
-    return None
-
-
-GNUCHESS_EXECUTABLE = _first_existing_executable(
-    [
-        # This works on Debian 12 ("bookworm")
-        "/usr/games/gnuchess",
-        # This works on MacOS with homebrew
-        "/opt/homebrew/bin/gnuchess",
-    ]
-)
-
-
 # If no square is selected:
 # - give each square that has a moveable piece a link that will select that piece.
 # Otherwise:
@@ -66,9 +48,10 @@ GNUCHESS_EXECUTABLE = _first_existing_executable(
 # - each legal destination of the selected piece gets a button that does a POST that actually makes the piece move to that destination.  This might overwrite the links from the previous step, in case of a capture.
 
 
+@query_budget(queries=len(settings.GAME_SHARDS))  # and a row per completed game
 @require_http_methods(["GET"])
 def home(request: HttpRequest) -> HttpResponse:
-    completed_games = list(Game.objects.ordered_queryset().filter(in_progress=False))
+    completed_games = sharding.fan_out(Game.objects.ordered_queryset().filter(in_progress=False))
 
     return TemplateResponse(
         request,
@@ -81,12 +64,14 @@ def home(request: HttpRequest) -> HttpResponse:
     )
 
 
+@query_budget(queries=1, rows=1)
 @require_http_methods(["POST"])
 def new_game(request: HttpRequest) -> HttpResponse:
     new_game = Game.objects.create()
     return HttpResponseRedirect(reverse("game", kwargs=dict(game_id=new_game.pk)))
 
 
+@query_budget(queries=1, rows=1)
 @require_http_methods(["GET"])
 def game(request: HttpRequest, game_id: UUID | str) -> HttpResponse:
     game = Game.objects.filter(pk=game_id).first()
@@ -127,9 +112,10 @@ def game(request: HttpRequest, game_id: UUID | str) -> HttpResponse:
     )
 
 
+@query_budget(queries=1, rows=1)
 @require_http_methods(["GET"])
 def pgn_game(request: HttpRequest, game_id: UUID | str) -> HttpResponse:
-    board = load_board(game=get_object_or_404(Game, pk=game_id))
+    board = load_board(game=get_object_or_404(Game, pk=game_id), annotate=False)
     game = chess.pgn.Game.from_board(board)
     exporter = chess.pgn.StringExporter(headers=True, variations=True, comments=True)
     pgn_string = game.accept(exporter)
@@ -148,6 +134,9 @@ def pgn_game(request: HttpRequest, game_id: UUID | str) -> HttpResponse:
             return HttpResponse("Sorry, we only serve text/plain and text/html here", status=400)
 
 
+# An INSERT per batch of games (per shard), an upsert per thousand explorer positions, and the
+# savepoint.
+@query_budget(queries=10)
 @require_http_methods(["POST"])
 def import_pgn(request: HttpRequest) -> HttpResponse:
     form = ImportPGNForm(request.POST, request.FILES)
@@ -166,21 +155,36 @@ def import_pgn(request: HttpRequest) -> HttpResponse:
         return HttpResponse(f"{uploaded_file.size} bytes is too large for a PGN", status=400)
 
     new_games = []
+    explorer_batch = []
     stringio = io.StringIO(uploaded_file.read().decode())
 
-    while True:
-        read_ = chess.pgn.read_game(stringio)
-
-        if read_ is None:
-            break
-
-        new_game = Game.objects.create()
-        new_game.moves = json.dumps([m.uci() for m in read_.mainline_moves()])
-        if read_.board().outcome() is not None:
-            new_game.in_progress = False
-        new_game.save()
-        new_games.append(new_game)
-
+    with metrics.pgn_import_seconds.time(), sharding.atomic(*settings.GAME_SHARDS):
+        while True:
+            read_ = chess.pgn.read_game(stringio)
+
+            if read_ is None:
+                break
+
+            ucis = [m.uci() for m in read_.mainline_moves()]
+            final_board = read_.end().board()
+            new_game = Game()
+            new_game.record_position(final_board)
+            # The same rule as save_board and rebuild_explorer: only a game that ended on the
+            # board goes in the explorer, under the board's result rather than the PGN's
+            # Result header.  The rest are in progress, and join the explorer when they end.
+            if final_board.outcome() is not None:
+                new_game.in_progress = False
+                new_game.in_explorer = True
+                explorer_batch.append((ucis, final_board.result()))
+            new_game.awaiting_ai = new_game.in_progress and len(ucis) % 2 == 1
+            new_game.fill_in_name()  # bulk_create doesn't call save()
+            new_games.append(new_game)
+
+        Game.objects.bulk_create(new_games)
+        record_games(explorer_batch)
+
+    metrics.pgn_import_games.inc(len(new_games))
+    metrics.pgn_import_plies.inc(sum(game.ply for game in new_games))
     logger.info("Read %d games from %s", len(new_games), uploaded_file)
 
     if len(new_games) == 1:
@@ -189,20 +193,16 @@ def import_pgn(request: HttpRequest) -> HttpResponse:
     return HttpResponseRedirect("/")
 
 
-def num_black_moves(board: chess.Board) -> int:
-    # Remember, len(board.move_stack) == the number of "half-moves".
-    total_moves, _ = divmod(len(board.move_stack), 2)
-
-    return total_moves
-
-
+# White's move and black's reply are saved together, in one UPDATE; the move that ends a game
+# also adds a row per position to the explorer.
+@query_budget(queries=5)
 @require_http_methods(["POST"])
 def move(request: HttpRequest, game_id: UUID | str) -> HttpResponse:
     game: Game | None = Game.objects.filter(pk=game_id).first()
     if game is None:
         return HttpResponseNotFound()
 
-    board = load_board(game=game)
+    board = load_board(game=game, annotate=False)
 
     # TODO -- error handling.  What if "move" isn't present?
     move = chess.Move.from_uci(request.POST["move"])
@@ -210,44 +210,43 @@ def move(request: HttpRequest, game_id: UUID | str) -> HttpResponse:
     # TODO -- check that the move is legal
     game.promoting_push(board, move)
 
-    if board.outcome() is not None:
-        game.in_progress = False
-
-    save_board(board=board, game=game)
-
-    if num_black_moves(board) % 10 < game.black_smartness and GNUCHESS_EXECUTABLE is not None:
-        with chess.engine.SimpleEngine.popen_uci([str(GNUCHESS_EXECUTABLE), "--uci"]) as engine:
-            result = engine.play(board, chess.engine.Limit(time=0))
+    # Like the API: the engine if the smartness calls for it, else (or if it fails, or is
+    # too busy to answer in time) a random move.
+    if game.in_progress and (black_move := get_black_move(board, game.black_smartness)) is not None:
+        game.promoting_push(board, black_move)
 
-            if result.move is not None:
-                if result.move == chess.Move.null():
-                    # not sure what this means but I'm gonna assume Black is resigned, or checkmated, or something.
-                    game.in_progress = False
-                else:
-                    game.promoting_push(board, result.move)
-                save_board(board=board, game=game)
-
-                # TODO -- check result.resigned; dunno what to do if it's True though
-    else:
-        legal_moves = list(board.legal_moves)
-        if legal_moves:
-            random.shuffle(legal_moves)
-            game.promoting_push(board, legal_moves[0])
-            save_board(board=board, game=game)
-
-    if board.outcome() is not None:
-        game.in_progress = False
+    # Nothing is written until black has replied, so a request that dies while the engine
+    # thinks leaves the game as it was, rather than stuck waiting for black.
+    try:
         save_board(board=board, game=game)
+    except StaleGameError:
+        # Another tab moved first; this move was meant for a position that's gone.
+        return HttpResponse("Someone else moved in this game; reload to see the new position", status=409)
 
     return HttpResponseRedirect(reverse("game", kwargs=dict(game_id=game_id)))
 
 
 # Meant for HTMX, which is why it returns just the slider, not a whole page.
+@query_budget(queries=2, rows=2)
 @require_http_methods(["POST"])
 def set_black_smartness(request: HttpRequest, game_id: UUID) -> TemplateResponse:
     game = get_object_or_404(Game, pk=game_id)
 
     game.black_smartness = request.POST["smartness_tenths"]
-    game.save()
+    game.save(update_fields=["black_smartness", "modified"])  # not the moves, which may be stale
 
     return TemplateResponse(request, "app/smartness-slider.html", context={"game": game})
+
+
+# The server takes traffic right away; this reports how far the stuck-game sweeper has got.
+@query_budget(queries=0, rows=0)
+@require_http_methods(["GET"])
+def ready(request: HttpRequest) -> JsonResponse:
+    return JsonResponse(recovery.progress.as_dict())
+
+
+# Prometheus scrapes this; see metrics.py.
+@query_budget(queries=0, rows=0)
+@require_http_methods(["GET"])
+def metrics_view(request: HttpRequest) -> HttpResponse:
+    return HttpResponse(metrics.exposition(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -13,4 +13,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "django_chess.prod_settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after Django is set up, since it pulls in models.
+from django_chess.app.recovery import LifespanApp  # noqa: E402
+
+application = LifespanApp(django_application)
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 import os
+import shlex
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -52,17 +53,31 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "debug_toolbar.middleware.DebugToolbarMiddleware",
+    "django_chess.app.middleware.ServerTimingMiddleware",
+    "django_chess.app.middleware.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django_chess.app.middleware.APIVersionMiddleware",
-    "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
+    "django_chess.app.middleware.PathScopedMiddleware",  # runs STATEFUL_MIDDLEWARE
+    "django_chess.app.middleware.ProfilingMiddleware",
+    "django_chess.app.middleware.QueryBudgetMiddleware",
+]
+
+# The API keeps no state between requests -- no sessions, cookies or logins -- so requests
+# under STATELESS_PATH_PREFIXES skip these; everything else runs them, in this order, at
+# PathScopedMiddleware's place in MIDDLEWARE.
+STATEFUL_MIDDLEWARE = [
+    "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
+STATELESS_PATH_PREFIXES = ["/api/"]
+# The admin's checks look for its middleware in MIDDLEWARE, not STATEFUL_MIDDLEWARE.
+SILENCED_SYSTEM_CHECKS = ["admin.E408", "admin.E409", "admin.E410"]
 
 INTERNAL_IPS = ["127.0.0.1"]
 
@@ -86,12 +101,102 @@ TEMPLATES = [
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+#
+# Both aliases are the one SQLite file: "default" writes, and DATABASE_READ_ALIAS gets the
+# reads, so that in WAL mode they don't wait on the writer; see django_chess/app/database.py.
+# Write transactions take the write lock when they begin ("IMMEDIATE"), so that they queue
+# on busy_timeout instead of failing when a read inside them can't be upgraded to a write.
+# Daphne runs each request on a new thread, and so gets a new connection per request whatever
+# DB_CONN_MAX_AGE says; it's worth raising for long-lived threads (the recovery sweeper,
+# management commands, WSGI servers).
 SQLITE_DATA_DIR = Path(os.environ.get("SQLITE_DATA_DIR", BASE_DIR))
+DB_CONN_MAX_AGE = int(os.environ.get("DB_CONN_MAX_AGE", "0"))
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": SQLITE_DATA_DIR / "db.sqlite3",
+        "CONN_MAX_AGE": DB_CONN_MAX_AGE,
+        "OPTIONS": {"transaction_mode": "IMMEDIATE"},
+    },
+    "reader": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": SQLITE_DATA_DIR / "db.sqlite3",
+        "CONN_MAX_AGE": DB_CONN_MAX_AGE,
+        "TEST": {"MIRROR": "default"},
+    },
+}
+DATABASE_READ_ALIAS: str | None = "reader"
+
+# Game shards
+# Games are spread over GAME_SHARD_COUNT SQLite files by the prefix of their UUID: "default"
+# and then games1.sqlite3, games2.sqlite3, ... in SQLITE_DATA_DIR.  See
+# django_chess/app/sharding.py; after changing the count, run "manage.py rebalance_shards".
+GAME_SHARD_COUNT = int(os.environ.get("GAME_SHARD_COUNT", "1"))
+GAME_SHARDS = ["default"] + [f"games{n}" for n in range(1, GAME_SHARD_COUNT)]
+DATABASES.update({
+    alias: {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": SQLITE_DATA_DIR / f"{alias}.sqlite3",
+        "CONN_MAX_AGE": DB_CONN_MAX_AGE,
+        "OPTIONS": {"transaction_mode": "IMMEDIATE"},
+    }
+    for alias in GAME_SHARDS[1:]
+})
+
+DATABASE_ROUTERS = [
+    "django_chess.app.sharding.GameShardRouter",
+    "django_chess.app.database.ReadWriteRouter",
+]
+
+# PostgreSQL
+# DATABASE_BACKEND=postgresql replaces the SQLite files above with one PostgreSQL database, for
+# running app servers on more than one machine.  It needs the "postgres" extra (psycopg and
+# its connection pool): uv sync --extra postgres.  Each process keeps a pool of between
+# POSTGRES_POOL_MIN_SIZE and POSTGRES_POOL_MAX_SIZE connections, which works for daphne's
+# thread-per-request where CONN_MAX_AGE can't; the two don't mix, so CONN_MAX_AGE stays 0.
+# "just postgres pytest" runs the tests against a throwaway local server.
+DATABASE_BACKEND = os.environ.get("DATABASE_BACKEND", "sqlite")
+if DATABASE_BACKEND == "postgresql":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.environ.get("POSTGRES_DB", "django_chess"),
+            "USER": os.environ.get("POSTGRES_USER", "django_chess"),
+            "PASSWORD": os.environ.get("POSTGRES_PASSWORD", ""),
+            "HOST": os.environ.get("POSTGRES_HOST", "localhost"),
+            "PORT": os.environ.get("POSTGRES_PORT", "5432"),
+            "OPTIONS": {
+                "pool": {
+                    "min_size": int(os.environ.get("POSTGRES_POOL_MIN_SIZE", "2")),
+                    "max_size": int(os.environ.get("POSTGRES_POOL_MAX_SIZE", "10")),
+                    "timeout": 10,
+                },
+            },
+        },
     }
+    # One database takes every game, and its readers never wait on writers anyway.
+    GAME_SHARD_COUNT = 1
+    GAME_SHARDS = ["default"]
+    DATABASE_READ_ALIAS = None
+
+# Group commit
+# When on, save_board's writes go through one writer thread per process, which commits those
+# arriving within GROUP_COMMIT_WINDOW_SECONDS of each other (up to GROUP_COMMIT_MAX_BATCH)
+# in a single transaction; see django_chess/app/group_commit.py.  A save_board that the
+# writer hasn't started on within GROUP_COMMIT_TIMEOUT_SECONDS fails with a TimeoutError.
+GROUP_COMMIT_ENABLED = os.environ.get("GROUP_COMMIT_ENABLED", "") == "1"
+GROUP_COMMIT_WINDOW_SECONDS = 0.002
+GROUP_COMMIT_MAX_BATCH = 64
+GROUP_COMMIT_TIMEOUT_SECONDS = 10.0
+
+# Applied, in this order, to every new SQLite connection.
+SQLITE_PRAGMAS: dict[str, str | int] = {
+    "busy_timeout": 5000,  # ms to wait for a lock before "database is locked"
+    "journal_mode": "wal",
+    "synchronous": "normal",  # in WAL mode, still safe against corruption; fsyncs at checkpoints
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -32 * 1024,  # negative: KiB, so 32 MiB
+    "temp_store": "memory",
 }
 
 
@@ -140,15 +245,103 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 # REST Framework settings
 # https://www.django-rest-framework.org/api-guide/settings/
 REST_FRAMEWORK = {
+    # Nothing to log in to; see STATELESS_PATH_PREFIXES.
+    "DEFAULT_AUTHENTICATION_CLASSES": [],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.AllowAny",
     ],
+    # orjson-backed if the "fast-json" extra is installed; see django_chess/api/renderers.py.
     "DEFAULT_RENDERER_CLASSES": [
-        "rest_framework.renderers.JSONRenderer",
+        "django_chess.api.renderers.FastJSONRenderer",
         "rest_framework.renderers.BrowsableAPIRenderer",
     ],
+    "DEFAULT_PARSER_CLASSES": [
+        "django_chess.api.renderers.FastJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
 }
 
+# Server-Timing
+# Adds a per-request breakdown (db, replay, render, serialize, engine) to every response; see
+# django_chess/app/timing.py.  When off, the middleware drops out of the stack altogether.
+SERVER_TIMING_ENABLED = True
+
+# Server processes
+# "manage.py serve" runs SERVER_WORKERS daphne processes on one listening socket, and tells
+# each its SERVER_WORKER_INDEX; see django_chess/app/serving.py.  The per-process sizes below
+# (BOARD_CACHE_SIZE, CHESS_ENGINE_MAX_CONCURRENT) are a share of the host's, so adding workers
+# doesn't multiply memory or engines.  On SIGHUP, workers are replaced one at a time; each old
+# one stops accepting connections and ends its event streams (browsers reconnect to the
+# others), then gets up to SERVER_DRAIN_TIMEOUT_SECONDS to finish its requests and engine calls.
+SERVER_WORKERS = int(os.environ.get("SERVER_WORKERS", "1"))
+SERVER_WORKER_INDEX = int(os.environ.get("SERVER_WORKER_INDEX", "0"))
+SERVER_DRAIN_TIMEOUT_SECONDS = 30.0
+
+# Game events
+# Each process's SSE hub hears only of the moves that process saves; with several processes
+# (or servers), each polls the database every GAME_EVENTS_POLL_SECONDS for moves saved by the
+# others, for the games it has subscribers to.  0 turns polling off.  See
+# django_chess/app/events.py.
+GAME_EVENTS_POLL_SECONDS = float(
+    os.environ.get("GAME_EVENTS_POLL_SECONDS", 1.0 if SERVER_WORKERS > 1 else 0)
+)
+
+# Metrics
+# Prometheus metrics are served at /metrics; see django_chess/app/metrics.py.  With several
+# server processes, set METRICS_DIR to a directory they share (and that's emptied at startup)
+# so that every scrape covers all of them.
+METRICS_DIR: str | None = os.environ.get("METRICS_DIR") or None
+
+# Board cache
+# Replayed boards kept so that requests for a game that hasn't moved since skip the replay;
+# see BoardCache in django_chess/app/utils.py.  The BOARD_CACHE_SIZE environment variable is
+# the host's total, and each of the SERVER_WORKERS processes keeps its share.  Off (0) unless
+# set: it trades memory (see "manage.py memory_profile") for replay time, and whether that pays
+# depends on the traffic.  /metrics reports its hit rate.
+BOARD_CACHE_SIZE = int(os.environ.get("BOARD_CACHE_SIZE", "0"))
+if BOARD_CACHE_SIZE:
+    BOARD_CACHE_SIZE = max(1, BOARD_CACHE_SIZE // SERVER_WORKERS)
+
+# Query budgets
+# Logs a warning for each request whose view runs more queries, or touches more rows, than its
+# declared budget; see django_chess/app/budgets.py.
+QUERY_BUDGETS_ENABLED = True
+
+# Sampling profiler
+# See django_chess/app/profiling.py.  Profiles a random PROFILING_SAMPLE_RATE (0 to 1) of
+# requests, plus staff requests that send the PROFILING_HEADER header, into PROFILING_DIR;
+# "manage.py flamegraph" renders them.
+PROFILING_SAMPLE_RATE = float(os.environ.get("PROFILING_SAMPLE_RATE", "0"))
+PROFILING_HEADER = "X-Profile"
+PROFILING_INTERVAL_SECONDS = 0.005
+PROFILING_DIR = SQLITE_DATA_DIR / "profiles"
+PROFILING_MAX_FILES = 500
+
+# Chess engine
+# The UCI engine that plays black, as an argv list.  Unset means gnuchess, if it's installed.
+# For tests and benchmarks, django_chess.app.fake_engine.command() gives a deterministic
+# stand-in.  CHESS_ENGINE_TIMEOUT_SECONDS bounds the wait for an engine, engine startup and
+# each move.  Each server process runs at most CHESS_ENGINE_MAX_CONCURRENT engines at once.
+CHESS_ENGINE_COMMAND: list[str] | None = (
+    shlex.split(os.environ["CHESS_ENGINE_COMMAND"]) if os.environ.get("CHESS_ENGINE_COMMAND") else None
+)
+CHESS_ENGINE_TIMEOUT_SECONDS = 10.0
+CHESS_ENGINE_MAX_CONCURRENT = int(
+    os.environ.get("CHESS_ENGINE_MAX_CONCURRENT", max(1, (os.cpu_count() or 1) // SERVER_WORKERS))
+)
+
+# Stuck-game recovery
+# See django_chess/app/recovery.py.  Games whose AI reply was interrupted are answered in the
+# background after startup, at most RECOVERY_GAMES_PER_SECOND of them, re-checking every
+# RECOVERY_SWEEP_INTERVAL_SECONDS.  Games modified within RECOVERY_GRACE_SECONDS are left alone,
+# since a live request is probably still waiting on the engine.  Only the first server worker
+# runs a sweeper.
+RECOVERY_SWEEPER_ENABLED = SERVER_WORKER_INDEX == 0
+RECOVERY_SWEEP_INTERVAL_SECONDS = 60.0
+RECOVERY_GRACE_SECONDS = 30.0
+RECOVERY_GAMES_PER_SECOND = 2.0
+
 # CORS settings
 # https://github.com/adamchainz/django-cors-headers
 # Allow all origins for development; restrict in production
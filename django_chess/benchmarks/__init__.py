@@ -0,0 +1 @@
+# Performance benchmarks for the request hot paths; run with "manage.py benchmark".
@@ -0,0 +1,48 @@
+"""Games to benchmark against: a real master game plus generated games of chosen lengths."""
+import io
+import random
+from pathlib import Path
+
+import chess
+import chess.pgn
+
+from django.conf import settings
+
+# Game lengths, in plies, that every per-game benchmark is run at.
+PLIES = [10, 40, 100, 200, 300]
+
+FISCHER_V_SPASSKY = Path(settings.BASE_DIR) / "fischer-v-spassky.pgn"
+
+
+def generated_game(plies: int, *, seed: int = 0) -> chess.Board:
+    """
+    Return a board after ``plies`` random legal moves that don't end the game.
+
+    The same ``plies`` and ``seed`` always produce the same game.
+    """
+    rng = random.Random(f"{seed}:{plies}")
+
+    while True:
+        board = chess.Board()
+        while len(board.move_stack) < plies:
+            moves = sorted(board.legal_moves, key=chess.Move.uci)
+            board.push(rng.choice(moves))
+            if board.is_game_over():
+                break
+        else:
+            return board
+
+
+def fischer_v_spassky() -> chess.Board:
+    with FISCHER_V_SPASSKY.open() as f:
+        game = chess.pgn.read_game(f)
+    assert game is not None
+    return game.end().board()
+
+
+def pgn_text(boards: list[chess.Board]) -> str:
+    """Render boards as a multi-game PGN file, as import_pgn would receive it."""
+    out = io.StringIO()
+    for board in boards:
+        print(chess.pgn.Game.from_board(board), file=out, end="\n\n")
+    return out.getvalue()
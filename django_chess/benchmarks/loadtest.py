@@ -0,0 +1,289 @@
+"""
+Load generator: simulated players playing whole games through the JSON API.
+
+Each player lists the games, creates one and opens it, then alternates white moves (picked at
+random from the legal moves the API hands back) with polls of ``moves/?since=<ply>``, as the
+Android client does, until the game ends or the player has made its quota of moves.
+
+Requests go either straight into an ASGI application in this process (``ASGITransport``) or
+over HTTP to a running server (``HTTPTransport``).  ``Recorder`` collects per-endpoint
+latencies, error statuses and "database is locked" failures.
+"""
+import asyncio
+import json
+import math
+import random
+import threading
+import time
+import urllib.parse
+from typing import Any, Awaitable, Callable, Mapping, Protocol
+
+# status, headers (lower-cased names), body
+Response = tuple[int, dict[str, str], bytes]
+
+ASGIApp = Callable[
+    [dict[str, Any], Callable[[], Awaitable[Mapping[str, Any]]], Callable[[Mapping[str, Any]], Awaitable[None]]],
+    Awaitable[None],
+]
+
+
+class Transport(Protocol):
+    async def request(
+        self, method: str, path: str, *, body: bytes = b"", headers: Mapping[str, str] | None = None
+    ) -> Response: ...
+
+
+class ASGITransport:
+    """Calls an ASGI application directly; no sockets involved."""
+
+    def __init__(self, app: ASGIApp, *, host: str = "testserver") -> None:
+        self.app = app
+        self.host = host
+
+    async def request(
+        self, method: str, path: str, *, body: bytes = b"", headers: Mapping[str, str] | None = None
+    ) -> Response:
+        path, _, query = path.partition("?")
+        raw_headers = [(b"host", self.host.encode())]
+        if body:
+            raw_headers += [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        raw_headers += [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query.encode(),
+            "root_path": "",
+            "headers": raw_headers,
+            "client": ("127.0.0.1", 0),
+            "server": (self.host, 80),
+        }
+        requests = [{"type": "http.request", "body": body, "more_body": False}]
+        status = 0
+        response_headers: dict[str, str] = {}
+        chunks: list[bytes] = []
+
+        async def receive() -> Mapping[str, Any]:
+            if requests:
+                return requests.pop()
+            await asyncio.Event().wait()  # the client never disconnects early
+            raise AssertionError("unreachable")
+
+        async def send(message: Mapping[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                response_headers.update((k.decode().lower(), v.decode()) for k, v in message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, send)
+        return status, response_headers, b"".join(chunks)
+
+
+class HTTPTransport:
+    """Plain HTTP/1.1 over a fresh connection per request, to a server such as daphne."""
+
+    def __init__(self, base_url: str) -> None:
+        url = urllib.parse.urlsplit(base_url)
+        if url.scheme != "http" or url.hostname is None:
+            raise ValueError(f"Expected an http:// URL, not {base_url!r}")
+        self.host = url.hostname
+        self.port = url.port or 80
+        self.prefix = url.path.rstrip("/")
+
+    async def request(
+        self, method: str, path: str, *, body: bytes = b"", headers: Mapping[str, str] | None = None
+    ) -> Response:
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            lines = [
+                f"{method} {self.prefix}{path} HTTP/1.1",
+                f"Host: {self.host}:{self.port}",
+                "Connection: close",
+                f"Content-Length: {len(body)}",
+            ]
+            if body:
+                lines.append("Content-Type: application/json")
+            lines += [f"{k}: {v}" for k, v in (headers or {}).items()]
+            writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + body)
+            await writer.drain()
+            raw = await reader.read()
+        finally:
+            writer.close()
+
+        head, _, payload = raw.partition(b"\r\n\r\n")
+        status_line, *header_lines = head.decode("latin-1").split("\r\n")
+        response_headers = {}
+        for line in header_lines:
+            name, _, value = line.partition(":")
+            response_headers[name.strip().lower()] = value.strip()
+
+        if response_headers.get("transfer-encoding") == "chunked":
+            payload = _dechunk(payload)
+
+        return int(status_line.split()[1]), response_headers, payload
+
+
+def _dechunk(payload: bytes) -> bytes:
+    body = []
+    while payload:
+        size_line, _, payload = payload.partition(b"\r\n")
+        size = int(size_line.split(b";")[0], 16)
+        if size == 0:
+            break
+        body.append(payload[:size])
+        payload = payload[size + 2:]
+    return b"".join(body)
+
+
+def percentile(ordered: list[float], p: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    return ordered[max(0, min(len(ordered) - 1, math.ceil(p / 100 * len(ordered)) - 1))]
+
+
+class Recorder:
+    """Latencies and failures, keyed by endpoint."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.latencies: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+        self.db_locked = 0
+        self.games = 0
+        self.moves = 0
+        self.elapsed = 0.0
+
+    def record(self, endpoint: str, seconds: float, status: int, body: bytes) -> None:
+        self.latencies.setdefault(endpoint, []).append(seconds)
+        if status == 0 or status >= 400:
+            key = f"{endpoint} -> {status or 'connection error'}"
+            self.errors[key] = self.errors.get(key, 0) + 1
+            if b"database is locked" in body:
+                self.note_db_locked()
+
+    def note_db_locked(self) -> None:
+        # May be called from a request thread, e.g. by a got_request_exception receiver.
+        with self._lock:
+            self.db_locked += 1
+
+    def summary(self) -> dict[str, Any]:
+        requests = sum(len(times) for times in self.latencies.values())
+        endpoints = {}
+        for endpoint, times in sorted(self.latencies.items()):
+            ordered = sorted(times)
+            endpoints[endpoint] = {
+                "requests": len(ordered),
+                **{f"p{p}_ms": round(percentile(ordered, p) * 1000, 2) for p in (50, 95, 99)},
+                "max_ms": round(ordered[-1] * 1000, 2),
+            }
+
+        return {
+            "elapsed_s": round(self.elapsed, 3),
+            "requests": requests,
+            "requests_per_s": round(requests / self.elapsed, 1) if self.elapsed else 0.0,
+            "games": self.games,
+            "moves": self.moves,
+            "errors": dict(sorted(self.errors.items())),
+            "db_locked": self.db_locked,
+            "endpoints": endpoints,
+        }
+
+
+async def _call(
+    transport: Transport,
+    recorder: Recorder,
+    endpoint: str,
+    method: str,
+    path: str,
+    *,
+    data: Any = None,
+    headers: Mapping[str, str] | None = None,
+) -> Response:
+    body = json.dumps(data).encode() if data is not None else b""
+    started = time.perf_counter()
+    try:
+        response = await transport.request(method, path, body=body, headers=headers)
+    except OSError:
+        response = (0, {}, b"")
+    recorder.record(endpoint, time.perf_counter() - started, response[0], response[2])
+    return response
+
+
+async def play(
+    transport: Transport,
+    recorder: Recorder,
+    *,
+    rng: random.Random,
+    moves: int,
+    polls: int,
+    poll_interval: float,
+    think_time: float,
+    black_smartness: int,
+) -> None:
+    """One simulated player's session; see the module docstring."""
+    await _call(transport, recorder, "GET /api/games/", "GET", "/api/games/")
+
+    status, _, body = await _call(
+        transport, recorder, "POST /api/games/", "POST", "/api/games/",
+        data={"black_smartness": black_smartness},
+    )
+    if status != 201:
+        return
+    state = json.loads(body)
+    game_url = f"/api/games/{state['id']}/"
+
+    status, _, body = await _call(transport, recorder, "GET /api/games/<id>/", "GET", game_url)
+    if status != 200:
+        return
+    state = json.loads(body)
+
+    for _ in range(moves):
+        if not state["in_progress"] or not state["legal_moves"]:
+            break
+
+        await asyncio.sleep(think_time)
+        ply = len(state["move_uci"])
+        status, _, body = await _call(
+            transport, recorder, "POST /api/games/<id>/moves/", "POST", f"{game_url}moves/",
+            data={"move": rng.choice(state["legal_moves"]), "ply": ply},
+        )
+        if status != 200:
+            return
+        recorder.moves += 1
+        state = json.loads(body)["game_state"]
+
+        etag: str | None = None
+        for _ in range(polls):
+            await asyncio.sleep(poll_interval)
+            _, headers, _ = await _call(
+                transport, recorder, "GET /api/games/<id>/moves/?since=", "GET",
+                f"{game_url}moves/?since={len(state['move_uci'])}",
+                headers={"If-None-Match": etag} if etag else None,
+            )
+            etag = headers.get("etag", etag)
+
+    recorder.games += 1
+
+
+async def run(
+    transport: Transport,
+    *,
+    players: int,
+    seed: int = 0,
+    recorder: Recorder | None = None,
+    **options: Any,
+) -> Recorder:
+    """Run ``players`` concurrent sessions to completion; ``options`` are passed to ``play``."""
+    recorder = recorder or Recorder()
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(play(transport, recorder, rng=random.Random(seed + i), **options) for i in range(players))
+    )
+    recorder.elapsed = time.perf_counter() - started
+    return recorder
@@ -0,0 +1,202 @@
+"""
+Memory measurements: allocations per call site for representative workloads, and the sizes of
+the objects we keep around (replayed boards and board cache entries).
+
+Workloads run under ``tracemalloc``; each reports the peak traced memory while it ran, what it
+still held once it returned (its result plus anything it left in caches), and the call sites
+responsible.  Like the timing suite they need a database; "manage.py memory_profile" supplies a
+throwaway one.
+"""
+import gc
+import sys
+import tracemalloc
+import types
+from typing import Any, Callable, Iterator
+
+import chess
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from django_chess.api.serializers import GameDetailSerializer
+from django_chess.app.models import Game
+from django_chess.app.utils import board_cache, load_board, save_board
+from django_chess.benchmarks import corpus
+
+# Allocations made by the measuring itself, or by imports the first run triggers.
+IGNORED = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+# Not part of any one object's size: they're shared by everything.
+_SHARED = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType)
+
+
+def deep_sizeof(root: object) -> int:
+    """Bytes held by ``root`` and everything reachable from it, each object counted once."""
+    seen: set[int] = set()
+    total = 0
+    pending = [root]
+    while pending:
+        obj = pending.pop()
+        if id(obj) in seen or isinstance(obj, _SHARED) or obj is None or isinstance(obj, bool):
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        pending.extend(_referents(obj))
+    return total
+
+
+def _referents(obj: object) -> Iterator[object]:
+    if isinstance(obj, dict):
+        yield from obj.keys()
+        yield from obj.values()
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        yield from obj
+    elif not isinstance(obj, (str, bytes, int, float)):
+        if hasattr(obj, "__dict__"):
+            yield vars(obj)
+        for cls in type(obj).__mro__:
+            for slot in getattr(cls, "__slots__", ()):
+                if slot not in ("__dict__", "__weakref__") and hasattr(obj, slot):
+                    yield getattr(obj, slot)
+
+
+def board_sizes(plies: list[int] | None = None) -> list[dict[str, Any]]:
+    """Bytes per replayed board, and per board cache entry, at each game length."""
+    rows = []
+    empty = deep_sizeof(chess.Board())
+    for n in plies or corpus.PLIES:
+        game = Game()  # never saved
+        game.record_position(corpus.generated_game(n))
+
+        with override_settings(BOARD_CACHE_SIZE=0):
+            annotated = load_board(game=game)
+            unannotated = load_board(game=game, annotate=False)
+
+        rows.append({
+            "plies": n,
+            "board": deep_sizeof(unannotated),
+            "annotated_board": deep_sizeof(annotated),
+            # What BoardCache keeps: the moves it replayed, and a copy of the board.
+            "cache_entry": deep_sizeof((game.moves, annotated)),
+            "bytes_per_ply": round((deep_sizeof(unannotated) - empty) / max(n, 1)),
+        })
+    return rows
+
+
+def cache_footprint() -> dict[str, int]:
+    """What the board cache in this process holds right now."""
+    with board_cache.lock:
+        entries = list(board_cache.boards.values())
+    return {"entries": len(entries), "bytes": deep_sizeof(entries)}
+
+
+# name -> setup; the setup takes the number of games and returns the callable to measure.
+Setup = Callable[[int], Callable[[], object]]
+WORKLOADS: dict[str, Setup] = {}
+
+
+def workload(name: str) -> Callable[[Setup], Setup]:
+    def register(setup: Setup) -> Setup:
+        WORKLOADS[name] = setup
+        return setup
+
+    return register
+
+
+def _saved_games(count: int) -> list[Game]:
+    games = []
+    for index in range(count):
+        game = Game.objects.create(black_smartness=0)
+        save_board(board=corpus.generated_game(corpus.PLIES[index % len(corpus.PLIES)], seed=index), game=game)
+        games.append(game)
+    return games
+
+
+@workload("load_board")
+def _load_boards(count: int) -> Callable[[], object]:
+    games = _saved_games(count)
+    return lambda: [load_board(game=game) for game in games]
+
+
+@workload("view:game")
+def _game_pages(count: int) -> Callable[[], object]:
+    client = Client()
+    urls = [reverse("game", kwargs=dict(game_id=game.pk)) for game in _saved_games(count)]
+    # The test client's responses keep their template context, boards included.
+    return lambda: [client.get(url) for url in urls]
+
+
+@workload("GameDetailSerializer")
+def _serialize(count: int) -> Callable[[], object]:
+    games = _saved_games(count)
+    return lambda: [GameDetailSerializer(game).data for game in games]
+
+
+@workload("view:import_pgn")
+def _import(count: int) -> Callable[[], object]:
+    client = Client()
+    url = reverse("import-pgn")
+    boards = [corpus.generated_game(corpus.PLIES[index % len(corpus.PLIES)], seed=index) for index in range(count)]
+    data = corpus.pgn_text(boards).encode()
+
+    def post() -> object:
+        response = client.post(url, {"imported_pgn": SimpleUploadedFile("memory.pgn", data)})
+        assert response.status_code == 302, response
+        return response
+
+    return post
+
+
+def measure(
+    func: Callable[[], object], *, frames: int = 1, group_by: str = "lineno", limit: int = 10
+) -> dict[str, Any]:
+    """
+    Run ``func`` once under tracemalloc.  Returns the peak traced memory during the call, the
+    memory still allocated afterwards (with the result kept alive), and the call sites holding
+    the most of that.
+    """
+    gc.collect()
+    tracemalloc.start(frames)
+    try:
+        before = tracemalloc.take_snapshot().filter_traces(IGNORED)
+        tracemalloc.reset_peak()
+        start, _ = tracemalloc.get_traced_memory()
+
+        result = func()
+
+        current, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot().filter_traces(IGNORED)
+    finally:
+        tracemalloc.stop()
+
+    retained = [
+        {"site": _site(stat.traceback), "bytes": stat.size_diff, "blocks": stat.count_diff}
+        for stat in after.compare_to(before, group_by)[:limit]
+        if stat.size_diff > 0
+    ]
+    del result
+
+    return {
+        "peak_bytes": peak - start,
+        "retained_bytes": current - start,
+        "top_retained": retained,
+    }
+
+
+def _site(traceback: tracemalloc.Traceback) -> str:
+    # Innermost frame first, then its callers.
+    return " <- ".join(f"{_short(frame.filename)}:{frame.lineno}" for frame in reversed(traceback))
+
+
+def _short(filename: str) -> str:
+    for prefix in sorted([str(settings.BASE_DIR), *sys.path], key=len, reverse=True):
+        if prefix and filename.startswith(prefix + "/"):
+            return filename[len(prefix) + 1:]
+    return filename
@@ -0,0 +1,110 @@
+"""Timing, result files and baseline comparison for the benchmark suite."""
+import json
+import platform
+import statistics
+import sys
+import time
+from importlib.metadata import version
+from pathlib import Path
+from typing import Any, Callable
+
+BASELINE = Path(__file__).parent / "baseline.json"
+
+Setup = Callable[[], Callable[[], object]]
+
+# name -> setup function; the setup does any fixture work and returns the callable to time.
+BENCHMARKS: dict[str, Setup] = {}
+
+
+def benchmark(name: str) -> Callable[[Setup], Setup]:
+    def register(setup: Setup) -> Setup:
+        assert name not in BENCHMARKS, f"{name} is registered twice"
+        BENCHMARKS[name] = setup
+        return setup
+
+    return register
+
+
+def measure(func: Callable[[], object], *, min_time: float, max_runs: int = 10_000) -> dict[str, Any]:
+    """
+    Call ``func`` repeatedly for at least ``min_time`` seconds; return per-call statistics in
+    µs, and the size of what it returns if that's bytes (a rendered payload, say).
+    """
+    returned = func()  # warm up caches, imports and the like
+
+    timings: list[float] = []
+    deadline = time.perf_counter() + min_time
+    while len(timings) < max_runs and (len(timings) < 3 or time.perf_counter() < deadline):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1e6)
+
+    result: dict[str, Any] = {
+        "median_us": round(statistics.median(timings), 2),
+        "min_us": round(min(timings), 2),
+        "mean_us": round(statistics.fmean(timings), 2),
+        "runs": len(timings),
+    }
+    if isinstance(returned, bytes):
+        result["bytes"] = len(returned)
+    return result
+
+
+def environment() -> dict[str, str]:
+    return {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "django": version("django"),
+        "chess": version("chess"),
+    }
+
+
+def run(*, name_filter: str = "", min_time: float = 0.2, log: Callable[[str], None] = print) -> dict[str, Any]:
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if name_filter not in name:
+            continue
+
+        results[name] = measure(setup(), min_time=min_time)
+        size = f", {results[name]['bytes']} bytes" if "bytes" in results[name] else ""
+        log(f"{name:<50} {results[name]['median_us']:>12.1f} µs  ({results[name]['runs']} runs{size})")
+
+    return {"environment": environment(), "results": results}
+
+
+def load(path: Path) -> dict[str, Any]:
+    with path.open() as f:
+        loaded: dict[str, Any] = json.load(f)
+    return loaded
+
+
+def save(report: dict[str, Any], path: Path) -> None:
+    with path.open("w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def compare(
+    current: dict[str, Any], baseline: dict[str, Any], *, threshold: float
+) -> tuple[list[str], list[str]]:
+    """
+    Compare median timings present in both reports.
+
+    Returns (regressions, improvements): one line per benchmark whose median moved by more
+    than ``threshold`` (0.25 == 25%) in that direction.
+    """
+    regressions, improvements = [], []
+
+    for name, result in current["results"].items():
+        if (before := baseline["results"].get(name)) is None:
+            continue
+
+        ratio = result["median_us"] / before["median_us"]
+        line = f"{name}: {before['median_us']:.1f} µs -> {result['median_us']:.1f} µs ({ratio:.2f}x)"
+        if ratio > 1 + threshold:
+            regressions.append(line)
+        elif ratio < 1 / (1 + threshold):
+            improvements.append(line)
+
+    return regressions, improvements
@@ -0,0 +1,236 @@
+"""
+The benchmark cases.  Importing this module registers them with the runner.
+
+Every per-game case runs against generated games of each length in corpus.PLIES plus the
+Fischer-Spassky game.  The cases need a database; "manage.py benchmark" supplies a
+throwaway test database.
+"""
+import json
+from typing import Callable
+
+import chess
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, override_settings
+from django.urls import reverse
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+from django_chess.api.renderers import MSGPACK_INSTALLED, FastJSONRenderer, MessagePackRenderer
+from django_chess.api.serializers import GameDetailSerializer, GameListSerializer
+from django_chess.app import fake_engine
+from django_chess.app.engine import get_black_move
+from django_chess.app.models import Game
+from django_chess.app.utils import (
+    get_squares_none_selected,
+    get_squares_with_selection,
+    load_board,
+    save_board,
+)
+from django_chess.benchmarks import corpus
+from django_chess.benchmarks.runner import benchmark
+
+BoardSource = Callable[[], chess.Board]
+
+# label -> board factory, for every per-game case
+GAMES: dict[str, BoardSource] = {
+    f"plies={plies}": (lambda plies=plies: corpus.generated_game(plies)) for plies in corpus.PLIES  # type: ignore[misc]
+}
+GAMES["fischer-v-spassky"] = corpus.fischer_v_spassky
+
+
+def saved_game(board: chess.Board) -> Game:
+    game = Game.objects.create(black_smartness=0)
+    save_board(board=board, game=game)
+    return game
+
+
+def per_game(name: str) -> Callable[[Callable[[chess.Board], Callable[[], object]]], None]:
+    """Register ``name[<game>]`` for every game in GAMES."""
+    def register(make: Callable[[chess.Board], Callable[[], object]]) -> None:
+        for label, source in GAMES.items():
+            benchmark(f"{name}[{label}]")(lambda make=make, source=source: make(source()))  # type: ignore[misc]
+
+    return register
+
+
+@per_game("load_board")
+def _load_board(board: chess.Board) -> Callable[[], object]:
+    game = saved_game(board)
+    return lambda: load_board(game=game)
+
+
+@per_game("load_board-unannotated")
+def _load_board_unannotated(board: chess.Board) -> Callable[[], object]:
+    game = saved_game(board)
+    return lambda: load_board(game=game, annotate=False)
+
+
+@per_game("load_board-cached")
+def _load_board_cached(board: chess.Board) -> Callable[[], object]:
+    game = saved_game(board)
+
+    def load() -> object:
+        with override_settings(BOARD_CACHE_SIZE=16):
+            return load_board(game=game)
+
+    return load
+
+
+@per_game("save_board")
+def _save_board(board: chess.Board) -> Callable[[], object]:
+    game = saved_game(board)
+    return lambda: save_board(board=board, game=game)
+
+
+@per_game("get_squares_none_selected")
+def _squares_none_selected(board: chess.Board) -> Callable[[], object]:
+    return lambda: list(get_squares_none_selected(board=board, game_id="00000000-0000-0000-0000-000000000000"))
+
+
+@per_game("get_squares_with_selection")
+def _squares_with_selection(board: chess.Board) -> Callable[[], object]:
+    selected = next(iter(board.legal_moves)).from_square
+    return lambda: list(
+        get_squares_with_selection(
+            board=board, game_id="00000000-0000-0000-0000-000000000000", selected_square=selected
+        )
+    )
+
+
+@per_game("view:game")
+def _game_view(board: chess.Board) -> Callable[[], object]:
+    client = Client()
+    url = reverse("game", kwargs=dict(game_id=saved_game(board).pk))
+    return lambda: client.get(url)
+
+
+@per_game("view:pgn_game")
+def _pgn_game_view(board: chess.Board) -> Callable[[], object]:
+    client = Client()
+    url = reverse("pgn-game", kwargs=dict(game_id=saved_game(board).pk))
+    return lambda: client.get(url, HTTP_ACCEPT="text/plain")
+
+
+@per_game("GameDetailSerializer")
+def _detail_serializer(board: chess.Board) -> Callable[[], object]:
+    game = saved_game(board)
+    return lambda: GameDetailSerializer(game).data
+
+
+# The same payloads rendered by DRF's renderer, on the json module, by FastJSONRenderer, which
+# uses orjson when it's installed, and in MessagePack; each result records the payload's size.
+RENDERERS: dict[str, BaseRenderer] = {"drf": JSONRenderer(), "fast": FastJSONRenderer()}
+if MSGPACK_INSTALLED:
+    RENDERERS["msgpack"] = MessagePackRenderer()
+
+
+def _render_detail(renderer: BaseRenderer) -> Callable[[chess.Board], Callable[[], object]]:
+    def make(board: chess.Board) -> Callable[[], object]:
+        data = GameDetailSerializer(saved_game(board)).data
+        return lambda: renderer.render(data, renderer.media_type)
+
+    return make
+
+
+def _render_list(renderer: BaseRenderer, *, games: int) -> Callable[[], object]:
+    # In progress, as most listed games are, so that serializing them needs no replays.
+    moves = [json.dumps([m.uci() for m in corpus.generated_game(plies).move_stack]) for plies in corpus.PLIES]
+    listed = [Game(name=f"game {n}", moves=moves[n % len(moves)]) for n in range(games)]
+    data = GameListSerializer(listed, many=True).data
+    return lambda: renderer.render(data, renderer.media_type)
+
+
+for _name, _renderer in RENDERERS.items():
+    per_game(f"GameDetailSerializer-render-{_name}")(_render_detail(_renderer))
+    benchmark(f"GameListSerializer-render-{_name}[2000 games]")(
+        lambda r=_renderer: _render_list(r, games=2000)  # type: ignore[misc]
+    )
+
+
+def _import(pgn: str) -> Callable[[], object]:
+    client = Client()
+    url = reverse("import-pgn")
+    data = pgn.encode()
+
+    def post() -> object:
+        response = client.post(url, {"imported_pgn": SimpleUploadedFile("bench.pgn", data)})
+        assert response.status_code == 302, response
+        return response
+
+    return post
+
+
+@benchmark("view:import_pgn[fischer-v-spassky]")
+def _import_fischer() -> Callable[[], object]:
+    return _import(corpus.FISCHER_V_SPASSKY.read_text())
+
+
+@benchmark("view:import_pgn[20 games, plies=10..300]")
+def _import_generated() -> Callable[[], object]:
+    boards = [corpus.generated_game(plies, seed=seed) for plies in corpus.PLIES for seed in range(4)]
+    return _import(corpus.pgn_text(boards))
+
+
+@benchmark("get_black_move[fake engine]")
+def _fake_engine_move() -> Callable[[], object]:
+    # Engine process startup plus one UCI round trip; the fake engine answers instantly, so
+    # this is the fixed cost every engine reply pays on top of thinking.
+    board = corpus.generated_game(41)
+
+    def play() -> object:
+        with override_settings(CHESS_ENGINE_COMMAND=fake_engine.command()):
+            return get_black_move(board, 10)
+
+    return play
+
+
+# MIDDLEWARE as it was before PathScopedMiddleware, and without the production profile.
+FULL_MIDDLEWARE = [
+    "debug_toolbar.middleware.DebugToolbarMiddleware",
+    "django_chess.app.middleware.ServerTimingMiddleware",
+    "django_chess.app.middleware.MetricsMiddleware",
+    "django.middleware.security.SecurityMiddleware",
+    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "corsheaders.middleware.CorsMiddleware",
+    "django_chess.app.middleware.APIVersionMiddleware",
+    "django.contrib.sessions.middleware.SessionMiddleware",
+    "django.middleware.common.CommonMiddleware",
+    "django.middleware.csrf.CsrfViewMiddleware",
+    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "django_chess.app.middleware.ProfilingMiddleware",
+    "django.contrib.messages.middleware.MessageMiddleware",
+    "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "django_chess.app.middleware.QueryBudgetMiddleware",
+]
+
+
+
+def _polled_game() -> tuple[str, dict[str, str]]:
+    # The Android client's poll when nothing has changed: a 304 after one indexed query, so
+    # nearly all of its time goes on middleware.
+    game = saved_game(corpus.generated_game(40))
+    return f"/api/games/{game.pk}/moves/?since={game.ply}", {"If-None-Match": f'"{game.ply}-json"'}
+
+
+def _ready() -> tuple[str, dict[str, str]]:
+    return reverse("ready"), {}
+
+
+def _request(request: Callable[[], tuple[str, dict[str, str]]], middleware: list[str]) -> Callable[[], object]:
+    path, headers = request()
+    with override_settings(MIDDLEWARE=middleware):
+        client = Client(headers=headers)
+        client.get(path)  # builds the client's middleware chain while the override is on
+
+    return lambda: client.get(path)
+
+
+for _label, _make_request in [("api poll", _polled_game), ("page: ready", _ready)]:
+    for _stack, _middleware in [
+        ("full", FULL_MIDDLEWARE),
+        ("lean", [name for name in settings.MIDDLEWARE if not name.startswith("debug_toolbar.")]),
+    ]:
+        benchmark(f"request[{_label}, {_stack} middleware]")(
+            lambda r=_make_request, m=_middleware: _request(r, m)  # type: ignore[misc]
+        )
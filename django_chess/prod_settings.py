@@ -1,3 +1,17 @@
 from django_chess.base_settings import *  # noqa
 
 DEBUG = False
+
+# The debug toolbar costs every request something even when it isn't showing.
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app != "debug_toolbar"]
+MIDDLEWARE = [name for name in MIDDLEWARE if not name.startswith("debug_toolbar.")]
+
+# JSON only: the browsable API is for poking at the API in development.
+REST_FRAMEWORK = dict(REST_FRAMEWORK, DEFAULT_RENDERER_CLASSES=["django_chess.api.renderers.FastJSONRenderer"])
+
+# Static files under content-hashed names, which whitenoise tells browsers to cache for good
+# (so the board's piece sprite, say, is fetched once); "collectstatic" writes them.
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage"},
+}
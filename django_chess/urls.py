@@ -1,7 +1,7 @@
+from django.apps import apps
 from django.contrib import admin
 from django.urls import path, include
 
-from debug_toolbar.toolbar import debug_toolbar_urls  # type: ignore [import-untyped]
 from django_chess.app import views
 
 urlpatterns = [
@@ -9,6 +9,8 @@ urlpatterns = [
     path("admin/", admin.site.urls),
     path("game/<uuid:game_id>/", views.game, name="game"),
     path("pgn/<uuid:game_id>/", views.pgn_game, name="pgn-game"),
+    path("ready/", views.ready, name="ready"),
+    path("metrics", views.metrics_view, name="metrics"),
 
     # POST-only urls
     path("move/<uuid:game_id>/", views.move, name="move"),
@@ -20,4 +22,10 @@ urlpatterns = [
 
     # REST API
     path("api/", include("django_chess.api.urls")),
-] + debug_toolbar_urls()
+]
+
+# Production leaves the toolbar out, and importing its urls would load its models regardless.
+if apps.is_installed("debug_toolbar"):
+    from debug_toolbar.toolbar import debug_toolbar_urls  # type: ignore [import-untyped]
+
+    urlpatterns += debug_toolbar_urls()
@@ -6,12 +6,22 @@ cd /chess
 
 export PYTHONUNBUFFERED=t       # https://github.com/django/daphne/pull/520
 
-# Unstick any games where AI was interrupted (e.g., by deployment)
-uv run --no-dev python manage.py unstick_games
+# manage.py defaults to dev_settings; daphne used to load asgi.py, which defaults to these.
+export DJANGO_SETTINGS_MODULE=${DJANGO_SETTINGS_MODULE:-django_chess.prod_settings}
 
-exec uv run --no-dev daphne                     \
+# Each server process keeps its metrics in a file here; start from empty counters.
+# See django_chess/app/metrics.py.
+export METRICS_DIR=${METRICS_DIR:-/tmp/django-chess-metrics}
+rm -rf "${METRICS_DIR}"
+mkdir -p "${METRICS_DIR}"
+
+# Games where the AI was interrupted (e.g., by deployment) are answered by a background
+# sweeper once daphne is up; see django_chess/app/recovery.py.
+
+# SERVER_WORKERS daphne processes share the port; "kill -HUP" this process to replace them
+# one at a time.  See django_chess/app/serving.py.
+exec uv run --no-dev python manage.py serve     \
+    --workers "${SERVER_WORKERS:-1}"            \
     --bind 0.0.0.0                              \
     --port 8000                                 \
-    --proxy-headers                             \
-    --verbosity  0                              \
-    django_chess.asgi:application
+    --proxy-headers